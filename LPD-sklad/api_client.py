@@ -1,15 +1,117 @@
 # api_client.py
+import copy
+import json
+import threading
+import time
 import requests
 import jwt
-from typing import Optional, Dict, Any, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Optional, Dict, Any, List, Iterator, Callable
 
-from config import API_BASE_URL
+from config import API_BASE_URL, HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_RETRY_BACKOFF, LOCAL_CACHE_PATH
+from local_cache import open_local_cache
+
+# Access token obnovujeme s předstihem, aby nevypršel uprostřed požadavku
+TOKEN_REFRESH_MARGIN = 120  # s
+
+def create_session() -> requests.Session:
+    """
+    Session s keep-alive poolem spojení, gzipem a opakováním přechodných chyb.
+    Opakují se jen chyby spojení (požadavek neodešel) a u idempotentních metod i 502–504,
+    POST/PATCH se tak nikdy neprovede dvakrát.
+    """
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
 
 class ApiClient:
     def __init__(self):
         self._token: Optional[str] = None
+        self._refresh_token: Optional[str] = None
+        self._token_expires_at: float = 0.0
+        self._auth_lock = threading.Lock()
+        # Jedna session pro všechny požadavky (i z pracovních vláken) – spojení se znovu používají
+        self.session = create_session()
         self.company_id: Optional[int] = None
         self.user_email: Optional[str] = None
+        # Volá se po každé změně tokenů (access, refresh), např. pro uložení do QSettings
+        self.on_tokens_changed: Optional[Callable[[str, Optional[str]], None]] = None
+        # Poslední odpovědi výpisů s ETagem pro podmíněný GET: (firma, název) -> (data, ETag)
+        self._etags: Dict[tuple, tuple] = {}
+        # Perzistentní cache na disku (None = nedostupná); viz local_cache
+        self.cache = open_local_cache(LOCAL_CACHE_PATH, API_BASE_URL)
+        # Lokální kopie skladu pro delta synchronizaci (/inventory/changes)
+        self._inventory_lock = threading.Lock()
+        self._inventory_cache: Dict[int, Dict[str, Any]] = {}
+        self._inventory_cursor: Optional[str] = None
+        self._inventory_company_id: Optional[int] = None
+
+    def _set_tokens(self, access_token: str, refresh_token: Optional[str]) -> Dict[str, Any]:
+        """Uloží pár tokenů a vrátí dekódovaný access token (podpis ověřuje server)."""
+        decoded_token = jwt.decode(access_token, options={"verify_signature": False}, algorithms=["HS256"])
+        self._token = access_token
+        self._refresh_token = refresh_token
+        self._token_expires_at = float(decoded_token.get("exp", 0))
+        if self.on_tokens_changed:
+            self.on_tokens_changed(access_token, refresh_token)
+        return decoded_token
+
+    def refresh_session(self, stale_token: Optional[str] = None) -> bool:
+        """
+        Obnoví access token pomocí refresh tokenu (bez hesla). Při odmítnutí relaci ukončí.
+        stale_token: token, se kterým volající pracoval – pokud ho mezitím obnovilo jiné vlákno, nic se neposílá.
+        """
+        with self._auth_lock:
+            if stale_token is not None and self._token and self._token != stale_token:
+                return True
+            if not self._refresh_token:
+                return False
+            try:
+                response = self.session.post(f"{API_BASE_URL}/auth/refresh", json={"refresh_token": self._refresh_token}, timeout=5)
+            except requests.exceptions.RequestException as e:
+                # Výpadek sítě – relaci ponecháme, zkusí se to při dalším požadavku
+                print(f"Obnovení tokenu selhalo: {e}")
+                return False
+            if response.status_code != 200:
+                print(f"Refresh token byl odmítnut ({response.status_code}), je nutné se znovu přihlásit.")
+                self._token = None
+                self._refresh_token = None
+                self._token_expires_at = 0.0
+                return False
+            data = response.json()
+            self._set_tokens(data["access_token"], data.get("refresh_token"))
+            return True
+
+    def _ensure_fresh_token(self) -> None:
+        if self._refresh_token and time.time() > self._token_expires_at - TOKEN_REFRESH_MARGIN:
+            self.refresh_session(stale_token=self._token)
+
+    def logout(self) -> None:
+        """Zneplatní relaci na serveru a zapomene tokeny."""
+        if self._refresh_token:
+            try:
+                self.session.post(f"{API_BASE_URL}/auth/logout", json={"refresh_token": self._refresh_token}, timeout=5)
+            except requests.exceptions.RequestException as e:
+                print(f"Odhlášení na serveru selhalo: {e}")
+        self._token = None
+        self._refresh_token = None
+        self._token_expires_at = 0.0
+        self.company_id = None
+        with self._inventory_lock:
+            self._inventory_cache = {}
+            self._inventory_cursor = None
+        self._etags.clear()
 
     def login(self, email: str, password: str) -> bool:
         try:
@@ -17,12 +119,11 @@ class ApiClient:
             payload = {"username": email, "password": password}
             
             # PŘIDÁN TIMEOUT 5 SEKUND
-            response = requests.post(f"{API_BASE_URL}/auth/login", data=payload, timeout=5)
+            response = self.session.post(f"{API_BASE_URL}/auth/login", data=payload, timeout=5)
 
             if response.status_code == 200:
-                self._token = response.json()["access_token"]
-                # PŘIDÁNY ALGORITMY (některé verze pyjwt to vyžadují i bez ověření)
-                decoded_token = jwt.decode(self._token, options={"verify_signature": False}, algorithms=["HS256"])
+                data = response.json()
+                decoded_token = self._set_tokens(data["access_token"], data.get("refresh_token"))
                 
                 print(f"Token dekódován: {decoded_token}") # LOG
                 
@@ -44,24 +145,34 @@ class ApiClient:
             print(f"KRITICKÁ CHYBA PŘI PŘIHLÁŠENÍ: {str(e)}") # Tohle uvidíte v konzoli
             return False
 
-    def try_login_with_token(self, token: str) -> bool:
+    def try_login_with_token(self, token: str, refresh_token: Optional[str] = None) -> bool:
         """
         NOVÁ METODA: Pokusí se ověřit existující token a nastavit session.
-        Využívá se pro automatické přihlášení.
+        Využívá se pro automatické přihlášení. S refresh tokenem se expirovaný
+        access token obnoví bez zadávání hesla.
         """
         try:
-            self._token = token
-            decoded_token = jwt.decode(self._token, options={"verify_signature": False})
-            
+            decoded_token = self._set_tokens(token, refresh_token)
             tenants = decoded_token.get("tenants")
             if not tenants:
                 print("Chyba: Token neobsahuje informace o firmě (tenants).")
                 self._token = None # Zneplatníme token
                 return False
-            
+            has_cache = self.cache is not None and self.cache.has_data(tenants[0])
+
+            if refresh_token and time.time() > self._token_expires_at - TOKEN_REFRESH_MARGIN:
+                # Při výpadku sítě refresh token zůstane – s lokální cache spustíme offline
+                if not self.refresh_session() and not (self._refresh_token and has_cache):
+                    return False
+
             self.company_id = tenants[0]
             self.user_email = decoded_token.get("sub") # 'sub' je standard pro subjekt/username v JWT
 
+            # S lokální cache se okno zobrazí hned a token ověří první požadavek na pozadí
+            if has_cache:
+                print(f"Automatické přihlášení pro {self.user_email} (data z lokální cache).")
+                return True
+
             # Ověříme token provedením jednoduchého autorizovaného požadavku
             if self.get_company_members() is not None:
                 print(f"Automatické přihlášení pro {self.user_email} úspěšné.")
@@ -87,25 +198,162 @@ class ApiClient:
         if not self._token or not self.company_id:
             raise PermissionError("Nejste přihlášeni nebo nemáte firmu.")
         
+        self._ensure_fresh_token()
+        token = self._token
         headers = kwargs.get("headers", {})
-        headers["Authorization"] = f"Bearer {self._token}"
+        headers["Authorization"] = f"Bearer {token}"
         kwargs["headers"] = headers
         
         url = f"{API_BASE_URL}{endpoint}"
-        return requests.request(method, url, **kwargs)
+        response = self.session.request(method, url, **kwargs)
+        # Token mohl být zneplatněn dřív (např. změna hodin) – jednou obnovíme a zopakujeme
+        if response.status_code == 401 and self.refresh_session(stale_token=token):
+            response.close()
+            headers["Authorization"] = f"Bearer {self._token}"
+            response = self.session.request(method, url, **kwargs)
+        return response
+
+
+    # --- STREAMOVANÝ EXPORT ---
+    def download_export(self, endpoint: str, file_path: str, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Stáhne exportní endpoint přímo do souboru po blocích (bez načtení celé odpovědi do paměti)."""
+        try:
+            with self._make_request("GET", endpoint, params=params, stream=True) as response:
+                response.raise_for_status()
+                with open(file_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"Chyba při stahování exportu: {e}")
+            return False
+
+    def iter_export_rows(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iteruje řádky NDJSON exportu tak, jak přicházejí ze serveru.
+        Chyby spojení propagují výjimku requests.exceptions.RequestException volajícímu.
+        """
+        params = dict(params or {}, format="ndjson")
+        with self._make_request("GET", endpoint, params=params, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
 
+    def inventory_export_endpoint(self) -> str:
+        return f"/companies/{self.company_id}/inventory/export"
+
+    def audit_logs_export_endpoint(self) -> str:
+        return f"/companies/{self.company_id}/audit-logs/export"
 
     # --- INVENTORY ITEMS ---
     def get_inventory_items(self, category_id: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Celý sklad z lokální kopie (delta synchronizace), s kategorií dotaz na server."""
+        if category_id is None or category_id == -1:
+            return self.sync_inventory_items()
         try:
-            endpoint = f"/companies/{self.company_id}/inventory?limit=1000"
+            endpoint = f"/companies/{self.company_id}/inventory"
+            params = {"limit": 1000, "category_id": category_id}
+            return self._get_conditional(f"inventory:{category_id}", endpoint, params=params, persist=False)
+        except requests.exceptions.RequestException as e:
+            print(f"Chyba při načítání skladu: {e}")
+            return None
+
+    # --- LOKÁLNÍ CACHE ---
+    def cached(self, name: str) -> Optional[Any]:
+        """Poslední uložený seznam (categories, locations, members, picking_orders) nebo None."""
+        if self.cache is None or not self.company_id:
+            return None
+        return self.cache.load_dataset(self.company_id, name)
+
+    def _get_conditional(self, name: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                         persist: bool = True) -> Any:
+        """
+        Podmíněný GET výpisu: pošle ETag posledně stažených dat (z paměti, po startu
+        z lokální cache) a při 304 Not Modified vrátí je – server nic nenačítá ani
+        neserializuje. persist=True data i s ETagem uloží do lokální cache pod `name`.
+        Volající dostává vždy vlastní kopii, takže úpravou výsledku cache nepoškodí.
+        Chyby spojení a HTTP propouští jako RequestException.
+        """
+        key = (self.company_id, name)
+        entry = self._etags.get(key)
+        if entry is None and persist and self.cache is not None:
+            entry = self.cache.load_dataset_entry(self.company_id, name)
+        headers = {"If-None-Match": entry[1]} if entry and entry[1] else {}
+        response = self._make_request("GET", endpoint, params=params, headers=headers)
+        if response.status_code == 304 and entry:
+            self._etags[key] = entry
+            return copy.deepcopy(entry[0])
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        self._etags[key] = (data, etag)
+        if persist and self.cache is not None:
+            self.cache.save_dataset(self.company_id, name, data, etag)
+        return copy.deepcopy(data)
+
+    def _store(self, name: str, data: Any) -> Any:
+        if self.cache is not None and self.company_id and data is not None:
+            self.cache.save_dataset(self.company_id, name, data)
+        return data
+
+    def _load_inventory_cache(self) -> None:
+        """Naplní kopii skladu z disku, pokud je prázdná nebo patří jiné firmě. Volat pod _inventory_lock."""
+        if self._inventory_company_id == self.company_id and self._inventory_cursor is not None:
+            return
+        self._inventory_cache = {}
+        self._inventory_cursor = None
+        self._inventory_company_id = self.company_id
+        if self.cache is not None and self.company_id:
+            self._inventory_cursor, self._inventory_cache = self.cache.load_inventory(self.company_id)
+
+    def cached_inventory_items(self) -> Optional[List[Dict[str, Any]]]:
+        """Sklad z lokální cache bez dotazu na server (None = nic uloženo)."""
+        with self._inventory_lock:
+            self._load_inventory_cache()
+            if self._inventory_cursor is None:
+                return None
+            return sorted(self._inventory_cache.values(), key=lambda item: item["id"])
+
+    def sync_inventory_items(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Stáhne jen změny skladu od posledního kurzoru a aplikuje je na lokální kopii.
+        První volání (nebo full=True ze serveru) kopii naplní celou. Vrací všechny položky
+        seřazené podle ID, při chybě spojení None.
+        """
+        with self._inventory_lock:
+            self._load_inventory_cache()
+            try:
+                params = {"since": self._inventory_cursor} if self._inventory_cursor else None
+                response = self._make_request("GET", f"/companies/{self.company_id}/inventory/changes", params=params)
+                response.raise_for_status()
+                changes = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Chyba při synchronizaci skladu: {e}")
+                return None
+            if changes["full"]:
+                self._inventory_cache = {}
+            for item_id in changes.get("deleted_ids", []):
+                self._inventory_cache.pop(item_id, None)
+            for item in changes["items"]:
+                self._inventory_cache[item["id"]] = item
+            self._inventory_cursor = changes["cursor"]
+            if self.cache is not None:
+                self.cache.save_inventory_changes(self.company_id, changes["cursor"], changes["full"],
+                                                  changes["items"], changes.get("deleted_ids", []))
+            return sorted(self._inventory_cache.values(), key=lambda item: item["id"])
+
+    def search_inventory_items(self, query: str, category_id: Optional[int] = None, limit: int = 200) -> Optional[List[Dict[str, Any]]]:
+        """Hledání na serveru (název, SKU, alt. SKU, EAN), výsledky seřazené podle relevance."""
+        try:
+            params: Dict[str, Any] = {"q": query, "limit": limit}
             if category_id is not None and category_id != -1:
-                endpoint += f"&category_id={category_id}"
-            response = self._make_request("GET", endpoint)
+                params["category_id"] = category_id
+            response = self._make_request("GET", f"/companies/{self.company_id}/inventory/search", params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"Chyba při načítání skladu: {e}")
+            print(f"Chyba při hledání '{query}': {e}")
             return None
 
     def find_item_by_ean(self, ean: str) -> Optional[Dict[str, Any]]:
@@ -117,7 +365,14 @@ class ApiClient:
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Chyba při hledání EAN {ean}: {e}")
+            # Server nedostupný – zkusíme poslední známý stav skladu
+            return self.find_cached_item_by_ean(ean)
+
+    def find_cached_item_by_ean(self, ean: str) -> Optional[Dict[str, Any]]:
+        """Hledání EAN v lokální cache (bez sítě)."""
+        if self.cache is None or not self.company_id:
             return None
+        return self.cache.find_item_by_ean(self.company_id, ean)
 
     def create_inventory_item(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         try:
@@ -151,10 +406,11 @@ class ApiClient:
                 
                 # Zde nepoužíváme _make_request, protože requests si Content-Type pro multipart
                 # nastavuje sám (včetně boundary). Jen přidáme auth token.
+                self._ensure_fresh_token()
                 headers = {"Authorization": f"Bearer {self._token}"}
                 
                 print(f"Nahrávám obrázek na: {url}")
-                response = requests.post(url, files=files, headers=headers, timeout=30)
+                response = self.session.post(url, files=files, headers=headers, timeout=30)
                 
             response.raise_for_status()
             return response.json()
@@ -165,9 +421,7 @@ class ApiClient:
     def get_categories(self) -> Optional[List[Dict[str, Any]]]:
         try:
             endpoint = f"/companies/{self.company_id}/categories"
-            response = self._make_request("GET", endpoint)
-            response.raise_for_status()
-            return response.json()
+            return self._get_conditional("categories", endpoint)
         except requests.exceptions.RequestException as e:
             print(f"Chyba při načítání kategorií: {e}")
             return None
@@ -219,9 +473,7 @@ class ApiClient:
     def get_locations(self) -> Optional[List[Dict[str, Any]]]:
         try:
             endpoint = f"/companies/{self.company_id}/locations"
-            response = self._make_request("GET", endpoint)
-            response.raise_for_status()
-            return response.json()
+            return self._get_conditional("locations", endpoint)
         except requests.exceptions.RequestException as e:
             print(f"Chyba při načítání lokací: {e}")
             return None
@@ -282,9 +534,7 @@ class ApiClient:
     def get_company_members(self) -> Optional[List[Dict[str, Any]]]:
         try:
             endpoint = f"/companies/{self.company_id}/members"
-            response = self._make_request("GET", endpoint)
-            response.raise_for_status()
-            return response.json()
+            return self._get_conditional("members", endpoint)
         except requests.exceptions.RequestException as e:
             print(f"Chyba při načítání členů firmy: {e}")
             return None
@@ -330,7 +580,9 @@ class ApiClient:
                 params['status'] = status
             response = self._make_request("GET", endpoint, params=params)
             response.raise_for_status()
-            return response.json()
+            orders = response.json()
+            # Do cache jde jen úplný seznam (hlavní okno načítá vše a filtruje lokálně)
+            return self._store("picking_orders", orders) if status == "all" else orders
         except requests.exceptions.RequestException as e:
             print(f"Chyba při načítání požadavků: {e}")
             return None
@@ -0,0 +1,123 @@
+# api_worker.py
+"""
+Volání ApiClient mimo GUI vlákno.
+
+ApiRequestQueue spouští metody ApiClient na sdíleném QThreadPool a výsledek předá
+callbacku zpět v GUI vlákně. Každý požadavek má klíč (např. "inventory"):
+- stejný požadavek (klíč, funkce i argumenty), který už běží, se nespouští znovu,
+  callback se jen připojí k běžícímu,
+- nový požadavek se stejným klíčem, ale jinými argumenty (změna filtru), ten starý
+  zruší – pokud ještě nezačal, vůbec se neodešle, jinak se jeho výsledek zahodí.
+
+Okna si vytváří vlastní frontu s rodičem = okno; po zavření okna se výsledky
+nedoručí do již zrušených widgetů.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from config import HTTP_POOL_SIZE
+
+_thread_pool: Optional[QThreadPool] = None
+
+
+def thread_pool() -> QThreadPool:
+    """Sdílený pool vláken pro API (velikost odpovídá poolu HTTP spojení)."""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(HTTP_POOL_SIZE)
+    return _thread_pool
+
+
+class _TaskSignals(QObject):
+    # (úloha, výsledek, výjimka nebo None)
+    finished = pyqtSignal(object, object, object)
+
+
+class _ApiTask(QRunnable):
+    def __init__(self, signals: _TaskSignals, fn: Callable, args: tuple, kwargs: dict):
+        super().__init__()
+        self.signals = signals
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.callbacks: List[Tuple[Optional[Callable], Optional[Callable]]] = []
+        self._cancelled = threading.Event()
+
+    def signature(self) -> tuple:
+        return (self.fn, self.args, tuple(sorted(self.kwargs.items())))
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self):
+        if self.cancelled:
+            return
+        result, error = None, None
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            error = e
+        try:
+            self.signals.finished.emit(self, result, error)
+        except RuntimeError:
+            # Fronta (okno) už byla zrušena
+            pass
+
+
+class ApiRequestQueue(QObject):
+    """Fronta API požadavků jednoho okna, viz popis modulu."""
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._signals = _TaskSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._pending: Dict[Hashable, _ApiTask] = {}
+
+    def submit(self, key: Hashable, fn: Callable, *args,
+               on_result: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None, **kwargs) -> None:
+        """Spustí fn(*args, **kwargs) na pozadí; on_result/on_error se zavolají v GUI vlákně."""
+        task = _ApiTask(self._signals, fn, args, kwargs)
+        running = self._pending.get(key)
+        if running is not None and not running.cancelled:
+            if running.signature() == task.signature():
+                running.callbacks.append((on_result, on_error))
+                return
+            running.cancel()
+        task.callbacks.append((on_result, on_error))
+        self._pending[key] = task
+        thread_pool().start(task)
+
+    def cancel(self, key: Hashable) -> None:
+        task = self._pending.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self) -> None:
+        for key in list(self._pending):
+            self.cancel(key)
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    def _on_finished(self, task: _ApiTask, result: Any, error: Optional[Exception]) -> None:
+        if task.cancelled:
+            return
+        for key, pending in list(self._pending.items()):
+            if pending is task:
+                del self._pending[key]
+        for on_result, on_error in task.callbacks:
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Chyba při volání API ({getattr(task.fn, '__name__', task.fn)}): {error}")
+            elif on_result:
+                on_result(result)
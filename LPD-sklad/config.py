@@ -1,2 +1,12 @@
 # config.py
-API_BASE_URL = "http://192.168.88.118:8001" # Nebo adresa vašeho serveru
\ No newline at end of file
+import os
+
+API_BASE_URL = "http://192.168.88.118:8001" # Nebo adresa vašeho serveru
+
+# HTTP spojení na API (sdílená requests.Session s keep-alive)
+HTTP_POOL_SIZE = 10        # počet udržovaných spojení (souběžné požadavky z vláken)
+HTTP_RETRIES = 3           # opakování při chybě spojení / 502–504 (jen idempotentní metody)
+HTTP_RETRY_BACKOFF = 0.3   # s, exponenciální čekání mezi opakováními
+
+# Lokální cache dat pro okamžitý start a práci při výpadku sítě (SQLite)
+LOCAL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".skladnikplus", "cache.sqlite3")
@@ -0,0 +1,160 @@
+# local_cache.py
+"""
+Lokální SQLite cache dat ze serveru (sklad, kategorie, lokace, členové firmy, požadavky).
+
+Hlavní okno se po startu vykreslí z cache a se serverem se dorovná na pozadí; při
+výpadku sítě ve skladu zůstanou k dispozici poslední známá data (např. hledání EAN
+v automatu). Sklad se ukládá po položkách s indexem na EAN spolu s kurzorem delta
+synchronizace (/inventory/changes), ostatní seznamy jako celé JSON dokumenty s časem
+stažení a ETagem (další start se serveru zeptá podmíněným GET). Data jsou oddělená
+podle firmy; změna schématu (SCHEMA_VERSION) nebo adresy serveru cache zahodí.
+
+Chyba SQLite nikdy neshodí aplikaci – cache se pak chová jako prázdná.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    """CREATE TABLE IF NOT EXISTS datasets (
+        company_id INTEGER NOT NULL, name TEXT NOT NULL, payload TEXT NOT NULL, etag TEXT, fetched_at REAL NOT NULL,
+        PRIMARY KEY (company_id, name))""",
+    """CREATE TABLE IF NOT EXISTS inventory_items (
+        company_id INTEGER NOT NULL, id INTEGER NOT NULL, ean TEXT, payload TEXT NOT NULL,
+        PRIMARY KEY (company_id, id))""",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_ean ON inventory_items (company_id, ean)",
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        company_id INTEGER NOT NULL, name TEXT NOT NULL, cursor TEXT, synced_at REAL NOT NULL,
+        PRIMARY KEY (company_id, name))""",
+]
+_TABLES = ("meta", "datasets", "inventory_items", "sync_state")
+
+
+class LocalCache:
+    def __init__(self, path: str, server_url: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Jedno spojení sdílené vlákny API fronty, přístup serializuje zámek
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._migrate(server_url)
+
+    def _migrate(self, server_url: str) -> None:
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            for table in _TABLES:
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for sql in _SCHEMA:
+            self._conn.execute(sql)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'server_url'").fetchone()
+        if row is None or row[0] != server_url:
+            for table in _TABLES:
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('server_url', ?)", (server_url,))
+
+    def has_data(self, company_id: int) -> bool:
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT EXISTS (SELECT 1 FROM datasets WHERE company_id = ?)"
+                    " OR EXISTS (SELECT 1 FROM sync_state WHERE company_id = ?)",
+                    (company_id, company_id)
+                ).fetchone()[0] == 1
+        except sqlite3.Error as e:
+            print(f"Chyba lokální cache: {e}")
+            return False
+
+    # --- CELÉ SEZNAMY (kategorie, lokace, členové, požadavky) ---
+    def load_dataset(self, company_id: int, name: str) -> Optional[Any]:
+        entry = self.load_dataset_entry(company_id, name)
+        return entry[0] if entry else None
+
+    def load_dataset_entry(self, company_id: int, name: str) -> Optional[Tuple[Any, Optional[str]]]:
+        """Vrací (data, ETag) nebo None."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT payload, etag FROM datasets WHERE company_id = ? AND name = ?", (company_id, name)
+                ).fetchone()
+            return (json.loads(row[0]), row[1]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Chyba lokální cache ({name}): {e}")
+            return None
+
+    def save_dataset(self, company_id: int, name: str, data: Any, etag: Optional[str] = None) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO datasets (company_id, name, payload, etag, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (company_id, name, json.dumps(data), etag, time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"Chyba zápisu do lokální cache ({name}): {e}")
+
+    # --- SKLAD (po položkách + kurzor delta synchronizace) ---
+    def load_inventory(self, company_id: int) -> Tuple[Optional[str], Dict[int, Dict[str, Any]]]:
+        """Vrací (kurzor, {id: položka}); bez uložených dat (None, {})."""
+        try:
+            with self._lock:
+                state = self._conn.execute(
+                    "SELECT cursor FROM sync_state WHERE company_id = ? AND name = 'inventory'", (company_id,)
+                ).fetchone()
+                if state is None:
+                    return None, {}
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM inventory_items WHERE company_id = ?", (company_id,)
+                ).fetchall()
+            return state[0], {item_id: json.loads(payload) for item_id, payload in rows}
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Chyba lokální cache (sklad): {e}")
+            return None, {}
+
+    def save_inventory_changes(self, company_id: int, cursor: str, full: bool,
+                               items: Iterable[Dict[str, Any]], deleted_ids: List[int]) -> None:
+        """Zapíše jednu dávku z /inventory/changes i s novým kurzorem v jedné transakci."""
+        try:
+            with self._lock, self._conn:
+                if full:
+                    self._conn.execute("DELETE FROM inventory_items WHERE company_id = ?", (company_id,))
+                self._conn.executemany(
+                    "DELETE FROM inventory_items WHERE company_id = ? AND id = ?",
+                    ((company_id, item_id) for item_id in deleted_ids)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO inventory_items (company_id, id, ean, payload) VALUES (?, ?, ?, ?)",
+                    ((company_id, item['id'], item.get('ean') or None, json.dumps(item)) for item in items)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (company_id, name, cursor, synced_at) VALUES (?, 'inventory', ?, ?)",
+                    (company_id, cursor, time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"Chyba zápisu do lokální cache (sklad): {e}")
+
+    def find_item_by_ean(self, company_id: int, ean: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT payload FROM inventory_items WHERE company_id = ? AND ean = ? LIMIT 1", (company_id, ean)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Chyba lokální cache (EAN {ean}): {e}")
+            return None
+
+
+def open_local_cache(path: str, server_url: str) -> Optional[LocalCache]:
+    """Otevře cache; pokud to nejde (práva, poškozený soubor), aplikace běží bez ní."""
+    try:
+        return LocalCache(path, server_url)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Lokální cache není k dispozici ({path}): {e}")
+        return None
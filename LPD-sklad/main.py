@@ -19,14 +19,33 @@ if __name__ == '__main__':
     # ZMĚNA: Blok pro pokus o automatické přihlášení
     settings = QSettings() 
     token = settings.value("user/token", None)
+    refresh_token = settings.value("user/refresh_token", None)
+
+    def save_tokens(access_token, new_refresh_token):
+        # Obnovené tokeny ukládáme jen při zapnutém "Zapamatovat si mě".
+        # Vlastní instance QSettings – obnova může proběhnout i ve vlákně na pozadí.
+        token_settings = QSettings()
+        if token_settings.contains("user/token"):
+            token_settings.setValue("user/token", access_token)
+            token_settings.setValue("user/refresh_token", new_refresh_token)
+    # Tokeny obnovené během běhu (i při automatickém přihlášení níže) se hned uloží,
+    # jinak by se při příštím startu použil už vyměněný refresh token
+    api.on_tokens_changed = save_tokens
+
+    def end_session():
+        # Bez "Zapamatovat si mě" se refresh token už nikdy nepoužije – zneplatníme ho na serveru
+        if not QSettings().contains("user/token"):
+            api.logout()
+    app.aboutToQuit.connect(end_session)
     
     auto_login_successful = False
     if token:
-        if api.try_login_with_token(token):
+        if api.try_login_with_token(token, refresh_token):
             auto_login_successful = True
         else:
             # Token byl neplatný (např. expirovaný), tak ho smažeme
             settings.remove("user/token")
+            settings.remove("user/refresh_token")
 
     # ZMĚNA: Logika spuštění aplikace
     if auto_login_successful:
@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QMe
                              QComboBox, QLabel, QDateEdit, QDialogButtonBox, QFileDialog)
 from PyQt6.QtCore import QDate, QDateTime, Qt
 from xls_exporter import export_audit_logs_to_xls
+from api_worker import ApiRequestQueue
 
 # Slovník pro převod technických názvů akcí na čitelné
 ACTION_MAP = {
@@ -21,6 +22,7 @@ class AuditLogDialog(QDialog):
     def __init__(self, api_client, inventory_data, company_members, parent=None):
         super().__init__(parent)
         self.api_client = api_client
+        self.api_queue = ApiRequestQueue(self)
         self.inventory_data = inventory_data
         self.company_members = company_members
         self.audit_logs = []
@@ -124,15 +126,19 @@ class AuditLogDialog(QDialog):
         self.filter_button.setEnabled(False)
         self.filter_button.setText("Načítám...")
         
-        self.audit_logs = self.api_client.get_audit_logs(
+        self.api_queue.submit(
+            "audit_logs", self.api_client.get_audit_logs,
             item_id=item_id,
             user_id=user_id,
             action=action,
             start_date=start_date,
             end_date=end_date,
-            limit=5000
+            limit=5000,
+            on_result=self._show_data
         )
-        
+
+    def _show_data(self, audit_logs):
+        self.audit_logs = audit_logs
         self.filter_button.setEnabled(True)
         self.filter_button.setText("Filtrovat")
 
@@ -175,19 +181,29 @@ class AuditLogDialog(QDialog):
             QMessageBox.warning(self, "Export", "Nejsou žádná data k exportu.")
             return
 
-        path, _ = QFileDialog.getSaveFileName(self, "Uložit historii jako...", "historie_pohybu.xlsx", "Excel soubory (*.xlsx)")
+        path, _ = QFileDialog.getSaveFileName(self, "Uložit historii jako...", "historie_pohybu.xlsx", "Excel soubory (*.xlsx);;CSV soubory (*.csv)")
         if not path:
             return
         
+        # Export stahuje kompletní historii podle aktuálních filtrů (bez limitu tabulky)
+        params = {
+            'start_date': self.date_from.date().toString("yyyy-MM-dd"),
+            'end_date': self.date_to.date().toString("yyyy-MM-dd"),
+        }
+        for key, combo in (('item_id', self.item_filter), ('user_id', self.user_filter), ('action', self.action_filter)):
+            value = combo.currentData()
+            if value is not None and value != -1:
+                params[key] = value
+        endpoint = self.api_client.audit_logs_export_endpoint()
+
         try:
-            # Před exportem můžeme vylepšit data o čitelné názvy akcí
-            export_data = self.audit_logs.copy()
-            reverse_action_map = {v: k for k, v in ACTION_MAP.items()}
-            for log in export_data:
-                action_key = log.get('action')
-                log['action'] = reverse_action_map.get(action_key, action_key)
-
-            export_audit_logs_to_xls(export_data, path)
+            if path.lower().endswith(".csv"):
+                if not self.api_client.download_export(endpoint, path, params=dict(params, format="csv")):
+                    raise RuntimeError("Server export nevrátil.")
+            else:
+                # Čitelné názvy akcí místo technických
+                reverse_action_map = {v: k for k, v in ACTION_MAP.items() if v}
+                export_audit_logs_to_xls(self.api_client.iter_export_rows(endpoint, params=params), path, reverse_action_map)
             QMessageBox.information(self, "Úspěch", f"Historie byla úspěšně uložena do souboru:\n{path}")
         except Exception as e:
-            QMessageBox.critical(self, "Chyba exportu", f"Při exportu nastala chyba: {e}")
\ No newline at end of file
+            QMessageBox.critical(self, "Chyba exportu", f"Při exportu nastala chyba: {e}")
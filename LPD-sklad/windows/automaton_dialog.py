@@ -60,8 +60,9 @@ class AutomatonDialog(QDialog):
             QMessageBox.warning(self, "Chyba", "Není vybrána cílová lokace!")
             return
 
-        # 1. Pokus o vyhledání položky podle EAN
-        item = self.api_client.find_item_by_ean(ean)
+        # 1. Pokus o vyhledání položky podle EAN – nejdřív v lokální cache (okamžitě, funguje
+        #    i při výpadku sítě), server se ptá jen na EAN, který cache nezná
+        item = self.api_client.find_cached_item_by_ean(ean) or self.api_client.find_item_by_ean(ean)
 
         if item:
             # Položka nalezena -> Naskladnit +1
@@ -1,11 +1,13 @@
 # windows/category_dialog.py
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QPushButton, QMessageBox, 
                              QTreeWidget, QTreeWidgetItem, QLineEdit, QHBoxLayout, QLabel, QDialogButtonBox)
+from api_worker import ApiRequestQueue
 
 class CategoryDialog(QDialog):
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
         self.api_client = api_client
+        self.api_queue = ApiRequestQueue(self)
         self.setWindowTitle("Správa kategorií")
         self.setMinimumSize(400, 500)
         
@@ -40,8 +42,10 @@ class CategoryDialog(QDialog):
         self.load_categories()
 
     def load_categories(self):
+        self.api_queue.submit("categories", self.api_client.get_categories, on_result=self._show_categories)
+
+    def _show_categories(self, categories):
         self.tree.clear()
-        categories = self.api_client.get_categories()
         if categories is not None:
             self._populate_tree(categories, self.tree)
         else:
@@ -5,14 +5,15 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit,
                              QComboBox, QInputDialog, QFileDialog, QFrame) # Přidáno QFileDialog, QFrame
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap, QImage # Přidáno pro práci s obrázky
-import requests # Potřebujeme pro stažení obrázku (nebo použít api_client helper, ale tady je to specifické)
 import qtawesome as qta
 from config import API_BASE_URL # Potřebujeme pro sestavení URL obrázku
+from api_worker import ApiRequestQueue
 
 class ItemDialog(QDialog):
     def __init__(self, api_client, categories_tree, item_data=None, prefill_data=None):
         super().__init__()
         self.api_client = api_client
+        self.api_queue = ApiRequestQueue(self)
         self.categories_tree = categories_tree or []
         self.item_data = item_data
         self.created_item = None
@@ -146,12 +147,36 @@ class ItemDialog(QDialog):
     # ZKOPÍROVAT PŮVODNÍ METODY SEM
     
     def _load_partners_data(self):
-        self.manufacturers = self.api_client.get_manufacturers() or []
-        self.suppliers = self.api_client.get_suppliers() or []
+        # Výrobci a dodavatelé se načítají na pozadí; do té doby nelze uložit (combo by bylo prázdné)
+        # ani zakládat nové (naplnění comba by je z výběru vyhodilo)
+        self.save_button.setEnabled(False)
+        self.add_manufacturer_btn.setEnabled(False)
+        self.add_supplier_btn.setEnabled(False)
+        self.api_queue.submit("partners", self._fetch_partners, on_result=self._show_partners)
+
+    def _fetch_partners(self):
+        """Běží v pracovním vlákně."""
+        return self.api_client.get_manufacturers() or [], self.api_client.get_suppliers() or []
+
+    def _show_partners(self, partners):
+        self.manufacturers, self.suppliers = partners
         self.manufacturer_combo.clear(); self.manufacturer_combo.addItem("--- Neurčeno ---", -1)
         for m in self.manufacturers: self.manufacturer_combo.addItem(m['name'], m['id'])
         self.supplier_combo.clear(); self.supplier_combo.addItem("--- Neurčeno ---", -1)
         for s in self.suppliers: self.supplier_combo.addItem(s['name'], s['id'])
+        if self.is_edit_mode:
+            self._select_partners()
+        self.save_button.setEnabled(True)
+        self.add_manufacturer_btn.setEnabled(True)
+        self.add_supplier_btn.setEnabled(True)
+
+    def _select_partners(self):
+        if self.item_data.get('manufacturer'):
+            idx = self.manufacturer_combo.findData(self.item_data['manufacturer']['id'])
+            if idx >= 0: self.manufacturer_combo.setCurrentIndex(idx)
+        if self.item_data.get('supplier'):
+            idx = self.supplier_combo.findData(self.item_data['supplier']['id'])
+            if idx >= 0: self.supplier_combo.setCurrentIndex(idx)
 
     def create_new_manufacturer(self):
         name, ok = QInputDialog.getText(self, "Nový výrobce", "Název:")
@@ -197,13 +222,7 @@ class ItemDialog(QDialog):
         self.ean_input.setText(self.item_data.get('ean', ''))
         self.description_input.setText(self.item_data.get('description', ''))
         self.price_input.setValue(self.item_data.get('price') or 0.0)
-        
-        if self.item_data.get('manufacturer'):
-            idx = self.manufacturer_combo.findData(self.item_data['manufacturer']['id'])
-            if idx >= 0: self.manufacturer_combo.setCurrentIndex(idx)
-        if self.item_data.get('supplier'):
-            idx = self.supplier_combo.findData(self.item_data['supplier']['id'])
-            if idx >= 0: self.supplier_combo.setCurrentIndex(idx)
+        # Výrobce a dodavatele vybere _show_partners, až se načtou
             
         cids = [c['id'] for c in self.item_data.get('categories', [])]
         def ch(item):
@@ -229,21 +248,29 @@ class ItemDialog(QDialog):
         else:
             full_url = image_url
 
-        try:
-            # Stáhneme obrázek (synchronně, pro jednoduchost)
-            response = requests.get(full_url, timeout=5)
-            if response.status_code == 200:
-                pixmap = QPixmap()
-                pixmap.loadFromData(response.content)
-                if not pixmap.isNull():
-                    self.image_label.setPixmap(pixmap)
-                else:
-                    self.image_label.setText("Chyba formátu")
-            else:
-                self.image_label.setText("Nelze načíst")
-        except Exception as e:
-            print(f"Chyba při stahování obrázku: {e}")
-            self.image_label.setText("Chyba spojení")
+        self.image_label.setText("Načítám obrázek...")
+        self.api_queue.submit("image", self._download_image, full_url,
+                             on_result=self._show_image, on_error=self._show_image_error)
+
+    def _download_image(self, url):
+        """Běží v pracovním vlákně, vrací data obrázku nebo None."""
+        response = self.api_client.session.get(url, timeout=5)
+        return response.content if response.status_code == 200 else None
+
+    def _show_image(self, data):
+        if data is None:
+            self.image_label.setText("Nelze načíst")
+            return
+        pixmap = QPixmap()
+        pixmap.loadFromData(data)
+        if not pixmap.isNull():
+            self.image_label.setPixmap(pixmap)
+        else:
+            self.image_label.setText("Chyba formátu")
+
+    def _show_image_error(self, e):
+        print(f"Chyba při stahování obrázku: {e}")
+        self.image_label.setText("Chyba spojení")
 
     def select_and_upload_image(self):
         """Otevře dialog, vybere soubor a pošle na API."""
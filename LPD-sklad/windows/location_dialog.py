@@ -3,11 +3,13 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QLi
                              QPushButton, QMessageBox, QLineEdit, QFormLayout, QGroupBox,
                              QSplitter, QTextEdit, QWidget, QDialogButtonBox, QComboBox, QLabel)
 from PyQt6.QtCore import Qt
+from api_worker import ApiRequestQueue
 
 class LocationDialog(QDialog):
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
         self.api_client = api_client
+        self.api_queue = ApiRequestQueue(self)
         self.locations = []
         self.company_members = []
         self.selected_location_id = None
@@ -98,8 +100,12 @@ class LocationDialog(QDialog):
         self.clear_form_for_new()
 
     def load_initial_data(self):
-        # Načteme všechny členy firmy pro dropdown
-        self.company_members = self.api_client.get_company_members()
+        # Členy firmy (pro dropdown) a lokace načítáme souběžně na pozadí
+        self.api_queue.submit("members", self.api_client.get_company_members, on_result=self._show_members)
+        self.load_locations()
+
+    def _show_members(self, members):
+        self.company_members = members
         if self.company_members is None:
             QMessageBox.critical(self, "Chyba", "Nepodařilo se načíst seznam členů firmy. Správa oprávnění nebude funkční.")
             self.company_members = []
@@ -110,12 +116,12 @@ class LocationDialog(QDialog):
             user = member.get('user', {})
             self.add_user_combo.addItem(user.get('email'), user.get('id'))
 
-        # Načteme lokace
-        self.load_locations()
-
     def load_locations(self):
+        self.api_queue.submit("locations", self.api_client.get_locations, on_result=self._show_locations)
+
+    def _show_locations(self, locations):
         current_id = self.selected_location_id
-        self.locations = self.api_client.get_locations() or []
+        self.locations = locations or []
         self.location_list.blockSignals(True)
         self.location_list.clear()
         
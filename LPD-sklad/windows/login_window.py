@@ -88,6 +88,8 @@ class LoginWindow(QDialog):
         if self.remember_me_checkbox.isChecked():
             settings.setValue("user/email", self.api_client.user_email)
             settings.setValue("user/token", self.api_client._token)
+            settings.setValue("user/refresh_token", self.api_client._refresh_token)
         else:
             settings.remove("user/email")
-            settings.remove("user/token")
\ No newline at end of file
+            settings.remove("user/token")
+            settings.remove("user/refresh_token")
\ No newline at end of file
@@ -1,13 +1,14 @@
 # windows/main_window.py
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,
-                             QPushButton, QHBoxLayout, QLineEdit, QLabel, QAbstractItemView, 
+                             QPushButton, QHBoxLayout, QLineEdit, QLabel, 
                              QMessageBox, QFileDialog, QComboBox, QGroupBox, QSplitter, 
                              QTabWidget, QToolBar, QSizePolicy, QMenu)
 from PyQt6.QtGui import QAction, QKeySequence
-from PyQt6.QtCore import Qt, QDateTime, QSize
+from PyQt6.QtCore import Qt, QDateTime, QSize, QTimer, QRegularExpression
 import qtawesome as qta
 
 from styling import MAIN_STYLESHEET
+from api_worker import ApiRequestQueue
 from .item_dialog import ItemDialog
 from .category_dialog import CategoryDialog
 from .location_dialog import LocationDialog
@@ -17,12 +18,43 @@ from .audit_log_dialog import AuditLogDialog
 from .picking_order_create_dialog import PickingOrderCreateDialog
 from .picking_order_fulfill_dialog import PickingOrderFulfillDialog
 from .import_dialog import ImportDialog
+from .table_models import Column, RowTableModel, create_table_view, selected_item, select_item_id
 from xls_exporter import export_inventory_to_xls
 
+def _price(value):
+    return f"{value:.2f}" if value is not None else ""
+
+INVENTORY_COLUMNS = [
+    Column("ID", lambda i: i['id']),
+    Column("Název", lambda i: i['name']),
+    Column("SKU", lambda i: i['sku']),
+    Column("Alt. SKU", lambda i: i.get('alternative_sku') or ""),
+    Column("EAN", lambda i: i.get('ean') or ""),
+    Column("Celkem", lambda i: i.get('total_quantity', 0)),
+    Column("Nákup", lambda i: i.get('price') or 0.0, _price),
+    Column("Prodej (MOC)", lambda i: i.get('retail_price'), _price),
+    Column("Kategorie", lambda i: ", ".join(c['name'] for c in i.get('categories', []))),
+    Column("Výrobce", lambda i: (i.get('manufacturer') or {}).get('name') or ""),
+    Column("Dodavatel", lambda i: (i.get('supplier') or {}).get('name') or ""),
+]
+
+PICKING_ORDER_COLUMNS = [
+    Column("ID", lambda o: o['id']),
+    Column("Stav", lambda o: o['status']),
+    Column("Z", lambda o: (o.get('source_location') or {}).get('name', 'N/A')),
+    Column("Do", lambda o: (o.get('destination_location') or {}).get('name', 'N/A')),
+    Column("Uživatel", lambda o: (o.get('created_by') or {}).get('email', 'N/A')),
+    Column("Datum", lambda o: o['created_at']),
+    Column("Poznámka", lambda o: o.get('notes') or ""),
+]
+PICKING_STATUS_COLUMN = 1
+
 class MainWindow(QMainWindow):
     def __init__(self, api_client):
         super().__init__()
         self.api_client = api_client
+        # Všechna načítání běží na pozadí, GUI nečeká na síť
+        self.api_queue = ApiRequestQueue(self)
         self.setWindowTitle("Skladník Plus")
         self.setWindowIcon(qta.icon('fa5s.warehouse'))
         self.setGeometry(100, 100, 1400, 800)
@@ -31,17 +63,24 @@ class MainWindow(QMainWindow):
         
         # Datové zásobníky
         self.inventory_data = []
+        self.all_inventory_items = []
         self.picking_orders = []
         self.categories_flat = []
+        self.categories_tree = []
         self.locations = []
         self.company_members = []
+        # Hledání se na server posílá až po krátké pauze v psaní
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
 
         # Inicializace UI
         self._create_actions()
         self._create_menubar()
         self._setup_ui()
         
-        # Načtení dat
+        # Načtení dat: okamžitě z lokální cache, se serverem se dorovná na pozadí
+        self.load_cached_data()
         self.load_initial_data()
         self.statusBar().showMessage(f"Přihlášen jako: {api_client.user_email}")
 
@@ -145,16 +184,9 @@ class MainWindow(QMainWindow):
         
         splitter = QSplitter(Qt.Orientation.Vertical)
         
-        # ZMĚNA: Zvýšen počet sloupců ze 7 na 9 a přidány hlavičky
-        self.inventory_table = QTableWidget(); self.inventory_table.setColumnCount(11)
-        self.inventory_table.setHorizontalHeaderLabels([
-            "ID", "Název", "SKU", "Alt. SKU", "EAN", "Celkem", 
-            "Nákup", "Prodej (MOC)", "Kategorie", "Výrobce", "Dodavatel"
-        ])
-        
-        self.inventory_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self.inventory_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.inventory_table.setAlternatingRowColors(True)
+        # Model nad seznamem položek – vykreslují se jen viditelné řádky
+        self.inventory_model = RowTableModel(INVENTORY_COLUMNS, self)
+        self.inventory_table, self.inventory_proxy = create_table_view(self.inventory_model, self)
         
         ldg = QGroupBox("Rozpis lokací"); ldl = QVBoxLayout(ldg)
         self.location_detail_table = QTableWidget(); self.location_detail_table.setColumnCount(2)
@@ -166,41 +198,58 @@ class MainWindow(QMainWindow):
         return tab
 
     def load_inventory_data(self):
+        # Stahují se jen změny od minulého načtení (delta synchronizace), opakované F5 se sloučí.
+        # Filtr kategorie se aplikuje lokálně, jeho změna tak nepotřebuje server.
+        self.statusBar().showMessage("Načítám skladové položky…")
+        self.api_queue.submit("inventory", self.api_client.sync_inventory_items,
+                             on_result=self._show_inventory_data)
+
+    def _category_subtree_ids(self, category_id):
+        """ID kategorie a všech jejích podkategorií (server filtruje stejně)."""
+        def find(nodes):
+            for node in nodes:
+                if node['id'] == category_id:
+                    return node
+                found = find(node.get('children') or [])
+                if found:
+                    return found
+            return None
+
+        ids, stack = set(), [find(self.categories_tree)]
+        while stack:
+            node = stack.pop()
+            if node:
+                ids.add(node['id'])
+                stack.extend(node.get('children') or [])
+        return ids
+
+    def _show_inventory_data(self, items):
+        if items is None:
+            if self.all_inventory_items:
+                self.statusBar().showMessage("Server je nedostupný, zobrazena data z lokální cache.")
+            else:
+                self.statusBar().showMessage("Sklad se nepodařilo načíst.", 5000)
+            return
+        self.all_inventory_items = items
+        self.apply_category_filter()
+
+    def apply_category_filter(self):
         cat_id = self.category_filter_combo.currentData()
-        self.inventory_data = self.api_client.get_inventory_items(category_id=cat_id) or []
-        self.inventory_table.setRowCount(0)
-        self.inventory_table.setRowCount(len(self.inventory_data))
-        
-        for r, item in enumerate(self.inventory_data):
-            cats = ", ".join([c['name'] for c in item.get('categories', [])])
-            man_name = item.get('manufacturer', {}).get('name') if item.get('manufacturer') else ""
-            sup_name = item.get('supplier', {}).get('name') if item.get('supplier') else ""
-
-            # --- NOVÉ: Zformátování dat ---
-            alt_sku = item.get('alternative_sku') or ""
-            retail_price = item.get('retail_price')
-            retail_price_str = f"{retail_price:.2f}" if retail_price is not None else ""
-            # ------------------------------
-
-            self.inventory_table.setItem(r, 0, QTableWidgetItem(str(item['id'])))
-            self.inventory_table.setItem(r, 1, QTableWidgetItem(item['name']))
-            self.inventory_table.setItem(r, 2, QTableWidgetItem(item['sku']))
-            
-            # --- NOVÝ SLOUPEC (index 3) ---
-            self.inventory_table.setItem(r, 3, QTableWidgetItem(alt_sku))
-            
-            self.inventory_table.setItem(r, 4, QTableWidgetItem(item.get('ean', '')))
-            self.inventory_table.setItem(r, 5, QTableWidgetItem(str(item['total_quantity'])))
-            self.inventory_table.setItem(r, 6, QTableWidgetItem(f"{item.get('price', 0):.2f}"))
-            
-            # --- NOVÝ SLOUPEC (index 7) ---
-            self.inventory_table.setItem(r, 7, QTableWidgetItem(retail_price_str))
-            
-            # --- POSUNUTÉ SLOUPCE ---
-            self.inventory_table.setItem(r, 8, QTableWidgetItem(cats))
-            self.inventory_table.setItem(r, 9, QTableWidgetItem(man_name))
-            self.inventory_table.setItem(r, 10, QTableWidgetItem(sup_name))
-            
+        items = self.all_inventory_items
+        if cat_id is not None and cat_id != -1:
+            subtree = self._category_subtree_ids(cat_id)
+            items = [i for i in items if any(c['id'] in subtree for c in i.get('categories') or [])]
+        self.inventory_data = items
+        self.statusBar().showMessage(f"Načteno položek: {len(self.inventory_data)}", 5000)
+        if self.search_input.text().strip():
+            self.run_inventory_search()
+        else:
+            self._populate_inventory_table(self.inventory_data)
+
+    def _populate_inventory_table(self, items):
+        self.location_detail_table.setRowCount(0)
+        self.inventory_model.set_items(items)
+        # Šířky sloupců podle vzorku řádků (setResizeContentsPrecision), ne podle celého skladu
         self.inventory_table.resizeColumnsToContents()
 
     def _create_picking_orders_tab(self):
@@ -211,9 +260,10 @@ class MainWindow(QMainWindow):
         fl.addWidget(self.picking_status_filter); fl.addStretch()
         
         splitter = QSplitter(Qt.Orientation.Vertical)
-        self.picking_orders_table = QTableWidget(); self.picking_orders_table.setColumnCount(7)
-        self.picking_orders_table.setHorizontalHeaderLabels(["ID", "Stav", "Z", "Do", "Uživatel", "Datum", "Poznámka"])
-        self.picking_orders_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.picking_orders_model = RowTableModel(PICKING_ORDER_COLUMNS, self)
+        self.picking_orders_table, self.picking_orders_proxy = create_table_view(self.picking_orders_model, self)
+        # Filtr stavu se aplikuje lokálně v proxy, bez nového dotazu na server
+        self.picking_orders_proxy.setFilterKeyColumn(PICKING_STATUS_COLUMN)
         
         dg = QGroupBox("Položky"); dl = QVBoxLayout(dg)
         self.picking_order_detail_table = QTableWidget(); self.picking_order_detail_table.setColumnCount(4)
@@ -241,14 +291,15 @@ class MainWindow(QMainWindow):
         self.export_inventory_action.triggered.connect(self.export_inventory_xls)
 
         # Interakce v tabulce skladu
-        self.inventory_table.itemSelectionChanged.connect(self.update_location_details_view)
+        self.inventory_table.selectionModel().selectionChanged.connect(self.update_location_details_view)
         self.inventory_table.doubleClicked.connect(self.edit_selected_item) # <--- TENTO ŘÁDEK
         
         # Filtry a hledání
-        self.search_input.textChanged.connect(self.filter_inventory_table)
-        self.category_filter_combo.currentIndexChanged.connect(self.load_inventory_data)
-        self.picking_status_filter.currentIndexChanged.connect(self.load_picking_orders)
-        self.picking_orders_table.itemSelectionChanged.connect(self.update_picking_order_detail_view)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.run_inventory_search)
+        self.category_filter_combo.currentIndexChanged.connect(self.apply_category_filter)
+        self.picking_status_filter.currentIndexChanged.connect(self.apply_picking_status_filter)
+        self.picking_orders_table.selectionModel().selectionChanged.connect(self.update_picking_order_detail_view)
         self.ean_search_input.returnPressed.connect(self.process_ean_search)
 
     # --- METODY PRO NAČÍTÁNÍ A ZOBRAZENÍ ---
@@ -260,30 +311,60 @@ class MainWindow(QMainWindow):
         self.load_inventory_data()
         self.load_picking_orders()
 
-    def load_company_members(self): self.company_members = self.api_client.get_company_members() or []
-    def load_locations(self): self.locations = self.api_client.get_locations() or []
+    def load_cached_data(self):
+        """Vykreslí poslední známá data z lokální cache (bez sítě)."""
+        self._show_company_members(self.api_client.cached("members"))
+        self._show_locations(self.api_client.cached("locations"))
+        self._show_categories(self.api_client.cached("categories"))
+        self._show_picking_orders(self.api_client.cached("picking_orders"))
+        items = self.api_client.cached_inventory_items()
+        if items is not None:
+            self.all_inventory_items = items
+            self.apply_category_filter()
+
+    # Výsledek None (server nedostupný) ponechá zobrazená data z cache
+    def load_company_members(self):
+        self.api_queue.submit("members", self.api_client.get_company_members, on_result=self._show_company_members)
+
+    def _show_company_members(self, members):
+        if members is not None:
+            self.company_members = members
+
+    def load_locations(self):
+        self.api_queue.submit("locations", self.api_client.get_locations, on_result=self._show_locations)
+
+    def _show_locations(self, locations):
+        if locations is not None:
+            self.locations = locations
     
     def load_categories(self):
-        tree = self.api_client.get_categories() or []
+        self.api_queue.submit("categories", self.api_client.get_categories, on_result=self._show_categories)
+
+    def _show_categories(self, tree):
+        if tree is None:
+            return
+        self.categories_tree = tree
         self.categories_flat = []
         def flatten(items, prefix=""):
             for i in items:
                 self.categories_flat.append({'id': i['id'], 'name': prefix + i['name']})
                 if i.get('children'): flatten(i['children'], prefix + "  ↳ ")
         flatten(tree)
+        # Výběr filtru zachováme; filtr se aplikuje lokálně, s novým stromem ho přepočítáme
+        current = self.category_filter_combo.currentData()
         self.category_filter_combo.blockSignals(True)
         self.category_filter_combo.clear()
         self.category_filter_combo.addItem("Všechny", -1)
         for c in self.categories_flat: self.category_filter_combo.addItem(c['name'], c['id'])
+        self.category_filter_combo.setCurrentIndex(max(0, self.category_filter_combo.findData(current)))
         self.category_filter_combo.blockSignals(False)
+        if self.category_filter_combo.currentData() != -1:
+            self.apply_category_filter()
 
 
     def update_location_details_view(self):
         self.location_detail_table.setRowCount(0)
-        sel = self.inventory_table.selectionModel().selectedRows()
-        if not sel: return
-        iid = int(self.inventory_table.item(sel[0].row(), 0).text())
-        item = next((i for i in self.inventory_data if i['id'] == iid), None)
+        item = self._selected_inventory_item()
         if item and 'locations' in item:
             self.location_detail_table.setRowCount(len(item['locations']))
             for r, ls in enumerate(item['locations']):
@@ -291,24 +372,33 @@ class MainWindow(QMainWindow):
                 self.location_detail_table.setItem(r, 1, QTableWidgetItem(str(ls['quantity'])))
 
     def load_picking_orders(self):
+        # Načítáme vše, stav filtruje proxy (přepnutí filtru je okamžité)
+        self.api_queue.submit("picking_orders", self.api_client.get_picking_orders, status="all",
+                             on_result=self._show_picking_orders)
+
+    def _show_picking_orders(self, orders):
+        if orders is None:
+            return
+        self.picking_orders = orders
+        self.picking_order_detail_table.setRowCount(0)
+        self.picking_orders_model.set_items(self.picking_orders)
+        self.apply_picking_status_filter()
+        self.picking_orders_table.resizeColumnsToContents()
+
+    def apply_picking_status_filter(self):
         status = self.picking_status_filter.currentData()
-        self.picking_orders = self.api_client.get_picking_orders(status=status) or []
-        self.picking_orders_table.setRowCount(len(self.picking_orders))
-        for r, o in enumerate(self.picking_orders):
-            self.picking_orders_table.setItem(r, 0, QTableWidgetItem(str(o['id'])))
-            self.picking_orders_table.setItem(r, 1, QTableWidgetItem(o['status']))
-            self.picking_orders_table.setItem(r, 2, QTableWidgetItem(o.get('source_location', {}).get('name', 'N/A')))
-            self.picking_orders_table.setItem(r, 3, QTableWidgetItem(o.get('destination_location', {}).get('name', 'N/A')))
-            self.picking_orders_table.setItem(r, 4, QTableWidgetItem(o.get('created_by', {}).get('email', 'N/A')))
-            self.picking_orders_table.setItem(r, 5, QTableWidgetItem(o['created_at']))
-            self.picking_orders_table.setItem(r, 6, QTableWidgetItem(o.get('notes', '')))
+        pattern = "" if status in (None, "all") else f"^{QRegularExpression.escape(status)}$"
+        self.picking_orders_proxy.setFilterRegularExpression(pattern)
+
+    def _selected_inventory_item(self):
+        return selected_item(self.inventory_table, self.inventory_proxy, self.inventory_model)
+
+    def _selected_picking_order(self):
+        return selected_item(self.picking_orders_table, self.picking_orders_proxy, self.picking_orders_model)
 
     def update_picking_order_detail_view(self):
         self.picking_order_detail_table.setRowCount(0)
-        sel = self.picking_orders_table.selectionModel().selectedRows()
-        if not sel: return
-        oid = int(self.picking_orders_table.item(sel[0].row(), 0).text())
-        order = next((o for o in self.picking_orders if o['id'] == oid), None)
+        order = self._selected_picking_order()
         if order:
             self.picking_order_detail_table.setRowCount(len(order['items']))
             for r, it in enumerate(order['items']):
@@ -318,35 +408,54 @@ class MainWindow(QMainWindow):
                 self.picking_order_detail_table.setItem(r, 2, QTableWidgetItem(str(it['requested_quantity'])))
                 self.picking_order_detail_table.setItem(r, 3, QTableWidgetItem(str(it.get('picked_quantity', 0))))
 
-    def filter_inventory_table(self):
-        txt = self.search_input.text().lower()
-        for r in range(self.inventory_table.rowCount()):
-            # Prohledáváme Název (sloupec 1), SKU (2) a nově Alt SKU (3)
-            name_match = txt in self.inventory_table.item(r, 1).text().lower()
-            sku_match = txt in self.inventory_table.item(r, 2).text().lower()
-            alt_sku_match = txt in self.inventory_table.item(r, 3).text().lower()
-            
-            match = name_match or sku_match or alt_sku_match
-            self.inventory_table.setRowHidden(r, not match)
+    def run_inventory_search(self):
+        """Hledá na serveru (název, SKU, alt. SKU, EAN); prázdný dotaz zobrazí celý načtený sklad."""
+        query = self.search_input.text().strip()
+        if not query:
+            self.api_queue.cancel("search")
+            self._populate_inventory_table(self.inventory_data)
+            return
+        self.api_queue.submit("search", self.api_client.search_inventory_items, query,
+                              category_id=self.category_filter_combo.currentData(),
+                              on_result=self._show_search_results)
+
+    def _show_search_results(self, items):
+        if items is None:
+            self.statusBar().showMessage("Hledání selhalo.", 5000)
+            return
+        self.statusBar().showMessage(f"Nalezeno položek: {len(items)}", 5000)
+        self._populate_inventory_table(items)
 
     def process_ean_search(self):
         ean = self.ean_search_input.text().strip(); self.ean_search_input.clear()
-        for r in range(self.inventory_table.rowCount()):
-            if self.inventory_table.item(r, 3).text() == ean: self.inventory_table.selectRow(r); return
+        if not ean: return
+        self.api_queue.submit("ean", self.api_client.find_item_by_ean, ean,
+                              on_result=lambda item: self._select_item_by_ean(ean, item))
+
+    def _select_item_by_ean(self, ean, item):
+        if not item:
+            self.statusBar().showMessage(f"Položka s EAN {ean} nebyla nalezena.", 5000)
+            return
+        if not select_item_id(self.inventory_table, self.inventory_proxy, self.inventory_model, item['id']):
+            # Položka je mimo aktuální filtr – zobrazíme ji samostatně
+            self._populate_inventory_table([item])
+            select_item_id(self.inventory_table, self.inventory_proxy, self.inventory_model, item['id'])
 
     # --- CHYBĚJÍCÍ METODY PRO DIALOGY ---
 
     def add_new_item(self):
-        tree = self.api_client.get_categories() or []
-        if ItemDialog(self.api_client, tree).exec(): self.load_inventory_data()
+        # Čerstvý strom kategorií se načte na pozadí, dialog se otevře až s ním
+        if self.api_queue.is_pending("item_dialog_categories"): return
+        def open_dialog(tree):
+            if ItemDialog(self.api_client, tree or []).exec(): self.load_inventory_data()
+        self.api_queue.submit("item_dialog_categories", self.api_client.get_categories, on_result=open_dialog)
 
     def edit_selected_item(self):
-        sel = self.inventory_table.selectionModel().selectedRows()
-        if not sel: return
-        iid = int(self.inventory_table.item(sel[0].row(), 0).text())
-        item = next((i for i in self.inventory_data if i['id'] == iid), None)
-        tree = self.api_client.get_categories() or []
-        if item and ItemDialog(self.api_client, tree, item_data=item).exec(): self.load_inventory_data()
+        item = self._selected_inventory_item()
+        if not item or self.api_queue.is_pending("item_dialog_categories"): return
+        def open_dialog(tree):
+            if ItemDialog(self.api_client, tree or [], item_data=item).exec(): self.load_inventory_data()
+        self.api_queue.submit("item_dialog_categories", self.api_client.get_categories, on_result=open_dialog)
 
     def manage_locations(self):
         if LocationDialog(self.api_client, self).exec(): self.load_initial_data()
@@ -358,8 +467,8 @@ class MainWindow(QMainWindow):
         if MovementDialog(self.api_client, self.inventory_data, self.locations, self).exec(): self.load_inventory_data()
 
     def open_write_off_dialog(self):
-        sel = self.inventory_table.selectionModel().selectedRows()
-        sid = int(self.inventory_table.item(sel[0].row(), 0).text()) if sel else None
+        selected = self._selected_inventory_item()
+        sid = selected['id'] if selected else None
         stock = [i for i in self.inventory_data if i.get('total_quantity', 0) > 0]
         if WriteOffDialog(self.api_client, stock, self, sid).exec(): self.load_inventory_data()
 
@@ -372,19 +481,16 @@ class MainWindow(QMainWindow):
         if PickingOrderCreateDialog(self.api_client, self.inventory_data, self.locations, self).exec(): self.load_picking_orders()
 
     def open_fulfill_picking_order_dialog(self):
-        sel = self.picking_orders_table.selectionModel().selectedRows()
-        if not sel: return
-        oid = int(self.picking_orders_table.item(sel[0].row(), 0).text())
-        order = next((o for o in self.picking_orders if o['id'] == oid), None)
+        order = self._selected_picking_order()
         if order: 
             dlg = PickingOrderFulfillDialog(self.api_client, order, self.inventory_data, self)
             dlg.inventory_updated.connect(self.load_inventory_data)
             if dlg.exec(): self.load_picking_orders()
 
     def delete_selected_picking_order(self):
-        sel = self.picking_orders_table.selectionModel().selectedRows()
-        if not sel: return
-        oid = int(self.picking_orders_table.item(sel[0].row(), 0).text())
+        order = self._selected_picking_order()
+        if not order: return
+        oid = order['id']
         if QMessageBox.question(self, "Smazat?", f"Smazat požadavek {oid}?", QMessageBox.StandardButton.Yes|QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
             if self.api_client.delete_picking_order(oid): self.load_picking_orders()
 
@@ -392,5 +498,18 @@ class MainWindow(QMainWindow):
         if ImportDialog(self.api_client, self).exec(): self.load_initial_data()
     
     def export_inventory_xls(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Export", "inventura.xlsx", "Excel (*.xlsx)")
-        if path: export_inventory_to_xls(self.inventory_data, path)
\ No newline at end of file
+        path, _ = QFileDialog.getSaveFileName(self, "Export", "inventura.xlsx", "Excel (*.xlsx);;CSV (*.csv)")
+        if not path: return
+        # Export se streamuje ze serveru, nezávisle na tom, co je právě načteno v tabulce
+        params = {}
+        cat_id = self.category_filter_combo.currentData()
+        if cat_id is not None and cat_id != -1: params['category_id'] = cat_id
+        endpoint = self.api_client.inventory_export_endpoint()
+        try:
+            if path.lower().endswith(".csv"):
+                if not self.api_client.download_export(endpoint, path, params=dict(params, format="csv")):
+                    raise RuntimeError("Server export nevrátil.")
+            else:
+                export_inventory_to_xls(self.api_client.iter_export_rows(endpoint, params=params), path)
+        except Exception as e:
+            QMessageBox.critical(self, "Chyba exportu", f"Při exportu nastala chyba: {e}")
@@ -0,0 +1,112 @@
+# windows/table_models.py
+"""
+Modely pro velké tabulky hlavního okna (sklad, požadavky).
+
+Místo QTableWidget (jedna QTableWidgetItem na buňku) drží RowTableModel jen seznam
+n-tic se surovými hodnotami sloupců. Text se formátuje až v data(), které QTableView
+volá jen pro viditelné řádky. Řazení a filtrování obstarává QSortFilterProxyModel
+nad SORT_ROLE (surové hodnoty, čísla se tak řadí číselně).
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtWidgets import QTableView, QAbstractItemView, QHeaderView
+
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+# Kolik řádků se projde při výpočtu šířky sloupců
+COLUMN_WIDTH_SAMPLE_ROWS = 200
+
+
+class Column(NamedTuple):
+    title: str
+    value: Callable[[Dict[str, Any]], Any]           # surová hodnota z položky API
+    fmt: Callable[[Any], str] = lambda v: "" if v is None else str(v)
+
+
+class RowTableModel(QAbstractTableModel):
+    def __init__(self, columns: List[Column], parent=None):
+        super().__init__(parent)
+        self._columns = columns
+        self._items: List[Dict[str, Any]] = []
+        self._rows: List[tuple] = []
+        self._row_by_id: Dict[Any, int] = {}
+
+    def set_items(self, items: List[Dict[str, Any]]) -> None:
+        """Nahradí obsah modelu; hodnoty sloupců se vyčíslí jednou, text až při vykreslení."""
+        self.beginResetModel()
+        self._items = list(items)
+        self._rows = [tuple(column.value(item) for column in self._columns) for item in self._items]
+        self._row_by_id = {item.get('id'): r for r, item in enumerate(self._items)}
+        self.endResetModel()
+
+    def item_at(self, row: int) -> Optional[Dict[str, Any]]:
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def row_of_id(self, item_id) -> Optional[int]:
+        return self._row_by_id.get(item_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._columns[index.column()].fmt(value)
+        if role == SORT_ROLE:
+            # None = neplatný QVariant, proxy ho řadí na okraj
+            return value
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._columns[section].title
+        return None
+
+
+def create_table_view(model: RowTableModel, parent=None):
+    """QTableView s proxy pro řazení/filtrování, pevnou výškou řádků a vzorkovanou šířkou sloupců."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    view = QTableView(parent)
+    view.setModel(proxy)
+    view.setSortingEnabled(True)
+    view.sortByColumn(-1, Qt.SortOrder.AscendingOrder)  # výchozí pořadí = pořadí ze serveru
+    view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+    view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    view.setAlternatingRowColors(True)
+    view.setWordWrap(False)
+    # Výška řádků se nepočítá z obsahu (to by znamenalo projít všechny řádky)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 8)
+    view.horizontalHeader().setResizeContentsPrecision(COLUMN_WIDTH_SAMPLE_ROWS)
+    return view, proxy
+
+
+def selected_item(view: QTableView, proxy: QSortFilterProxyModel, model: RowTableModel):
+    """Položka API pro vybraný řádek (nebo None)."""
+    rows = view.selectionModel().selectedRows()
+    if not rows:
+        return None
+    return model.item_at(proxy.mapToSource(rows[0]).row())
+
+
+def select_item_id(view: QTableView, proxy: QSortFilterProxyModel, model: RowTableModel, item_id) -> bool:
+    row = model.row_of_id(item_id)
+    if row is None:
+        return False
+    proxy_index = proxy.mapFromSource(model.index(row, 0))
+    if not proxy_index.isValid():
+        return False
+    view.selectRow(proxy_index.row())
+    view.scrollTo(proxy_index)
+    return True
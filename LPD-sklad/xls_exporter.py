@@ -1,62 +1,85 @@
 # xls_exporter.py
-import pandas as pd
+import itertools
+import os
 from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
 
-# xls_exporter.py
+from openpyxl import Workbook
+
+# Řádky přicházejí jako iterátor (streamovaný NDJSON export ze serveru) a zapisují se
+# do write-only sešitu openpyxl, takže paměť nezávisí na počtu exportovaných řádků.
 
-def export_inventory_to_xls(inventory_data: list, file_path: str):
-    if not inventory_data:
-        raise ValueError("Seznam položek pro export je prázdný.")
+INVENTORY_COLUMNS = [
+    ('id', 'ID Položky'), ('name', 'Název'), ('sku', 'SKU'), ('ean', 'EAN'),
+    ('total_quantity', 'Celkem kusů'), ('price', 'Cena'), ('categories', 'Kategorie'),
+    ('description', 'Popis'),
+]
 
-    df = pd.DataFrame(inventory_data)
+AUDIT_LOG_COLUMNS = [
+    ('timestamp', 'Datum a čas'), ('action', 'Akce'), ('item_sku', 'SKU Položky'),
+    ('item_name', 'Název Položky'), ('user_email', 'Uživatel'), ('details', 'Detail Změny'),
+]
 
-    # ZMĚNA: Převod seznamu kategorií na jeden řetězec
-    def format_categories(cats):
-        if isinstance(cats, list):
-            return ", ".join([c['name'] for c in cats if isinstance(c, dict)])
-        return ""
 
-    df['category_names'] = df['categories'].apply(format_categories)
+def _write_sheet(rows: Iterable[Dict[str, Any]], file_path: str, sheet_name: str, columns: list,
+                 empty_message: str) -> int:
+    """
+    Zapíše řádky do nového XLSX souboru a vrátí jejich počet. Prázdný vstup se pozná
+    před vytvořením souboru; sešit se ukládá vedle cíle a na jeho místo se přesune až
+    po úspěšném zápisu, takže chyba uprostřed streamu nenechá neúplný soubor.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        raise ValueError(empty_message)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append([header for _, header in columns])
+    count = 0
+    for row in itertools.chain([first], rows):
+        ws.append([row.get(key) for key, _ in columns])
+        count += 1
+    part_path = f"{file_path}.part"
+    try:
+        wb.save(part_path)
+        os.replace(part_path, file_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return count
 
-    df_export = df[[
-        'id', 'name', 'sku', 'ean', 'total_quantity', 'price', 'category_names', 'description'
-    ]]
-    df_export.columns = [
-        'ID Položky', 'Název', 'SKU', 'EAN', 'Celkem kusů', 'Cena', 'Kategorie', 'Popis'
-    ]
 
-    df_export.to_excel(file_path, index=False, sheet_name='Inventura')
+def export_inventory_to_xls(inventory_rows: Iterable[Dict[str, Any]], file_path: str) -> int:
+    return _write_sheet(inventory_rows, file_path, 'Inventura', INVENTORY_COLUMNS,
+                        "Seznam položek pro export je prázdný.")
 
 
-def export_audit_logs_to_xls(audit_logs: list, file_path: str):
+def export_audit_logs_to_xls(audit_logs: Iterable[Dict[str, Any]], file_path: str,
+                             action_labels: Optional[Dict[str, str]] = None) -> int:
     """
     Vygeneruje XLS soubor s historií pohybů ve skladu.
+    action_labels převádí technický název akce na čitelný popisek.
     """
-    if not audit_logs:
-        raise ValueError("Seznam pohybů pro export je prázdný.")
-        
-    df = pd.DataFrame(audit_logs)
-
-    # Rozbalíme vnořené slovníky do samostatných sloupců
-    df['user_email'] = df['user'].apply(lambda u: u['email'] if isinstance(u, dict) else 'N/A')
-    df['item_sku'] = df['inventory_item'].apply(lambda i: i['sku'] if isinstance(i, dict) else 'N/A')
-    df['item_name'] = df['inventory_item'].apply(lambda i: i['name'] if isinstance(i, dict) else 'Smazaná položka')
+    action_labels = action_labels or {}
 
     # Převedeme časové značky na lépe čitelný formát
     def format_timestamp(ts):
         try:
-            return pd.to_datetime(ts).strftime('%d.%m.%Y %H:%M:%S')
+            return datetime.fromisoformat(ts).strftime('%d.%m.%Y %H:%M:%S')
         except (ValueError, TypeError):
             return ts
-    
-    df['timestamp'] = df['timestamp'].apply(format_timestamp)
-
 
-    # Vybereme a přejmenujeme sloupce
-    df_export = df[['timestamp', 'action', 'item_sku', 'item_name', 'user_email', 'details']]
-    df_export.columns = [
-        'Datum a čas', 'Akce', 'SKU Položky', 'Název Položky', 'Uživatel', 'Detail Změny'
-    ]
+    def readable(rows):
+        for log in rows:
+            yield dict(
+                log,
+                timestamp=format_timestamp(log.get('timestamp')),
+                action=action_labels.get(log.get('action'), log.get('action')),
+                item_sku=log.get('item_sku') or 'N/A',
+                item_name=log.get('item_name') or 'Smazaná položka',
+                user_email=log.get('user_email') or 'N/A',
+            )
 
-    # Zápis do XLS souboru
-    df_export.to_excel(file_path, index=False, sheet_name='Pohyby ve skladu')
\ No newline at end of file
+    return _write_sheet(readable(audit_logs), file_path, 'Pohyby ve skladu', AUDIT_LOG_COLUMNS,
+                        "Seznam pohybů pro export je prázdný.")
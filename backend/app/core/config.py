@@ -7,8 +7,46 @@ class Settings:
     JWT_SECRET: str = os.getenv("JWT_SECRET", "dev-secret-change-me")
     JWT_ALG: str = "HS256"
     JWT_EXPIRE_MINUTES: int = int(os.getenv("JWT_EXPIRE_MINUTES", "60"))
+    # Platnost refresh tokenu (každé použití ho rotuje a prodlouží relaci)
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    # Cena bcryptu (log2 počtu iterací) a počet vláken pro hashování hesel
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
     DEFAULT_USER_EMAIL: str = os.getenv("DEFAULT_USER_EMAIL", "admin@local.cz")
     DEFAULT_USER_PASSWORD: str = os.getenv("DEFAULT_USER_PASSWORD", "admin123")
+    # In-process cache (strom kategorií, marže klientů) – počet záznamů a platnost v sekundách
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    # Cache ověřených JWT a rolí členů – kratší TTL, aby se odebraná práva projevila i v ostatních workerech
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    # Hromadný import skladu – počet řádků v jedné dávce (jeden commit)
+    IMPORT_CHUNK_ROWS: int = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+    # Úlohy na pozadí – souběžně běžící úlohy, úložiště výsledků
+    JOB_MAX_CONCURRENT: int = int(os.getenv("JOB_MAX_CONCURRENT", "2"))
+    JOB_RESULTS_DIR: str = os.getenv("JOB_RESULTS_DIR", "/app/job_results")
+    JOB_RESULT_RETENTION_DAYS: int = int(os.getenv("JOB_RESULT_RETENTION_DAYS", "7"))
+    # Lease běžící úlohy: worker ho průběžně obnovuje, po vypršení úlohu převezme úklid jako přerušenou
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+    # SMTP – nečinná spojení na firmu, jak dlouho je držet, opakování při přechodné chybě
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_POOL_IDLE_SECONDS: int = int(os.getenv("SMTP_POOL_IDLE_SECONDS", "60"))
+    SMTP_SEND_RETRIES: int = int(os.getenv("SMTP_SEND_RETRIES", "3"))
+    SMTP_RETRY_BACKOFF_SECONDS: float = float(os.getenv("SMTP_RETRY_BACKOFF_SECONDS", "1.0"))
+    # Outbox e-mailů – interval workeru, velikost dávky, souběh firem, limit na firmu/minutu, opakování
+    OUTBOX_POLL_SECONDS: int = int(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_CONCURRENCY: int = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+    OUTBOX_RATE_PER_MINUTE: int = int(os.getenv("OUTBOX_RATE_PER_MINUTE", "60"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    OUTBOX_RETRY_BASE_SECONDS: int = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "60"))
+    OUTBOX_RETENTION_DAYS: int = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+    # Jak dlouho se drží tombstony smazaných položek pro feed /inventory/changes (starší kurzor = plná synchronizace)
+    INVENTORY_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("INVENTORY_TOMBSTONE_RETENTION_DAYS", "30"))
+    # Interval periodické kontroly triggerů; nízký stav skladu se hlídá hlavně událostmi
+    TRIGGER_SWEEP_INTERVAL_MINUTES: int = int(os.getenv("TRIGGER_SWEEP_INTERVAL_MINUTES", "60"))
+    # Pool pro CPU náročnou práci (openpyxl, reportlab) – "process" nebo "thread"
+    EXECUTOR_KIND: str = os.getenv("EXECUTOR_KIND", "process")
+    EXECUTOR_WORKERS: int = int(os.getenv("EXECUTOR_WORKERS", "2"))
     # --- OPRAVENÝ ŘÁDEK ---
     # Klíč nyní pouze čteme z prostředí. Pokud není nastaven, os.getenv vrátí None.
     _encryption_key_str = os.getenv("ENCRYPTION_KEY")
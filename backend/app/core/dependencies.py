@@ -1,17 +1,38 @@
 # backend/app/core/dependencies.py
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import jwt, JWTError
-from typing import Dict
+from typing import Dict, Optional
+import time
 
 from app.core.config import settings
 from app.db.database import get_db
 from app.db.models import Membership, RoleEnum
+from app.services.cache_service import TTLCache
+from app.services.list_version_service import get_list_version, make_etag, etag_matches
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Dekódované tokeny (klíč: token) a role uživatelů ve firmách (klíč: (user_id, company_id)).
+# Cache je per proces; změny rolí invaliduje router members, TTL omezuje zastarání v ostatních workerech.
+_token_cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+_role_cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def _decode_token(token: str) -> Dict:
+    """Ověří podpis a platnost JWT; již ověřený token vrátí z cache (hlídá jen expiraci)."""
+    payload = _token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.invalidate(token)
+    payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+    _token_cache.set(token, payload)
+    return payload
+
+
 def require_company_access(
     company_id: int,
     token: str = Depends(oauth2_scheme)
@@ -21,7 +42,7 @@ def require_company_access(
     Vrací dekódovaný payload tokenu.
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        payload = _decode_token(token)
         user_id = payload.get("sub")
         tenants = payload.get("tenants", [])
         
@@ -35,25 +56,52 @@ def require_company_access(
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
-async def require_admin_access(
+
+async def get_company_role(db: AsyncSession, user_id: int, company_id: int) -> Optional[RoleEnum]:
+    """Role uživatele ve firmě (None = není členem). Členství se cachuje, nečlenství ne."""
+    key = (user_id, company_id)
+    role = _role_cache.get(key)
+    if role is None:
+        stmt = select(Membership.role).where(
+            Membership.user_id == user_id,
+            Membership.company_id == company_id
+        )
+        role = (await db.execute(stmt)).scalar_one_or_none()
+        if role is not None:
+            _role_cache.set(key, role)
+    return role
+
+
+def invalidate_company_role(user_id: int, company_id: int) -> None:
+    """Volat po změně role nebo odebrání člena firmy."""
+    _role_cache.invalidate((user_id, company_id))
+
+
+async def get_current_role(
     company_id: int,
-    payload: dict = Depends(require_company_access), 
+    payload: dict = Depends(require_company_access),
     db: AsyncSession = Depends(get_db)
+) -> Optional[RoleEnum]:
+    """
+    Role přihlášeného uživatele v dané firmě. FastAPI výsledek závislosti v rámci
+    jednoho požadavku cachuje, takže se role zjišťuje nejvýše jednou na požadavek.
+    """
+    return await get_company_role(db, int(payload.get("sub")), company_id)
+
+
+def is_admin_role(role: Optional[RoleEnum]) -> bool:
+    return role in [RoleEnum.owner, RoleEnum.admin]
+
+
+async def require_admin_access(
+    payload: dict = Depends(require_company_access), 
+    role: Optional[RoleEnum] = Depends(get_current_role)
 ) -> Dict:
     """
     Závislost, která ověří, že uživatel je 'owner' nebo 'admin' v dané společnosti.
     Vrací dekódovaný payload tokenu.
     """
-    user_id = int(payload.get("sub"))
-    
-    stmt = select(Membership.role).where(
-        Membership.user_id == user_id, 
-        Membership.company_id == company_id
-    )
-    result = await db.execute(stmt)
-    role = result.scalar_one_or_none()
-
-    if role not in [RoleEnum.owner, RoleEnum.admin]:
+    if not is_admin_role(role):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin or owner access required for this operation."
@@ -61,3 +109,31 @@ async def require_admin_access(
     
     return payload
 
+
+def conditional_list(resource: str):
+    """
+    Závislost pro podmíněný GET výpisu (viz list_version_service). Spočítá ETag z otisku
+    dat firmy a parametrů požadavku; shoduje-li se s If-None-Match, odpoví 304 dřív,
+    než endpoint spustí dotaz a serializaci. Jinak ETag přidá do odpovědi a vrátí ho
+    endpointu (např. jako verzi pro in-process cache).
+
+    V signatuře endpointu musí být až za závislostí na oprávnění, aby 304 nedostal
+    nepřihlášený uživatel.
+    """
+    async def dependency(
+        company_id: int,
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db)
+    ) -> str:
+        version = await get_list_version(db, resource, company_id)
+        query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+        etag = make_etag(resource, company_id, version, query)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return etag
+
+    return dependency
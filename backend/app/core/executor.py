@@ -0,0 +1,156 @@
+# backend/app/core/executor.py
+"""
+Sdílený pool pro synchronní CPU náročnou práci (openpyxl, reportlab).
+
+Async endpointy a úlohy na pozadí volají `await run_blocking(func, *args)` místo přímého
+volání, takže generování dokumentů neblokuje event loop workeru. Typ poolu (process/thread)
+a počet workerů se nastavují přes EXECUTOR_KIND a EXECUTOR_WORKERS.
+U process poolu musí být func i argumenty picklovatelné (funkce na úrovni modulu, čistá data).
+Procesy se startují metodou spawn: fork vícevláknového workeru (event loop, pool spojení)
+by zdědil i zámky držené jinými vlákny a mohl se zaseknout.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+# Vlákna pro streamované čtení u process poolu (stav generátoru nejde přenést mezi procesy)
+_stream_executor: Optional[ThreadPoolExecutor] = None
+
+
+class _ExecutorMetrics:
+    """Počítadla jednoho poolu pro /healthz: kolik práce čeká ve frontě a jak dlouho."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed - self.failed
+
+    def snapshot(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            # Odhad: co se nevejde do workerů tohoto poolu, čeká ve frontě
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / finished * 1000, 1) if finished else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_run_ms": round(self.total_run / finished * 1000, 1) if finished else 0.0,
+        }
+
+
+metrics = _ExecutorMetrics(settings.EXECUTOR_WORKERS)
+# Samostatný pool vláken pro streamované čtení existuje jen u process poolu
+stream_metrics = _ExecutorMetrics(settings.EXECUTOR_WORKERS)
+
+
+def _timed_call(func: Callable, args: tuple):
+    """Běží ve workeru; vrací i okamžik skutečného startu, aby šlo změřit čekání ve frontě."""
+    return time.time(), func(*args)
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.EXECUTOR_KIND == "thread":
+            _executor = ThreadPoolExecutor(max_workers=settings.EXECUTOR_WORKERS, thread_name_prefix="blocking")
+        else:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.EXECUTOR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    return _executor
+
+
+def _get_stream_executor() -> Tuple[Executor, _ExecutorMetrics]:
+    """U thread poolu sdílený pool, jinak omezený pool vláken stejné velikosti (s vlastními metrikami)."""
+    global _stream_executor
+    if settings.EXECUTOR_KIND == "thread":
+        return _get_executor(), metrics
+    if _stream_executor is None:
+        _stream_executor = ThreadPoolExecutor(max_workers=settings.EXECUTOR_WORKERS, thread_name_prefix="stream")
+    return _stream_executor, stream_metrics
+
+
+async def run_blocking(func: Callable, *args) -> Any:
+    """Spustí synchronní funkci ve sdíleném poolu a počká na výsledek bez blokování event loopu."""
+    return await _run_measured(_get_executor(), metrics, func, *args)
+
+
+async def _run_measured(executor: Executor, pool_metrics: _ExecutorMetrics, func: Callable, *args) -> Any:
+    submitted_at = time.time()
+    pool_metrics.submitted += 1
+    try:
+        started_at, result = await asyncio.get_running_loop().run_in_executor(
+            executor, _timed_call, func, args
+        )
+    except Exception:
+        pool_metrics.failed += 1
+        pool_metrics.total_run += time.time() - submitted_at
+        raise
+    finished_at = time.time()
+    wait = max(0.0, started_at - submitted_at)
+    pool_metrics.completed += 1
+    pool_metrics.total_wait += wait
+    pool_metrics.total_run += finished_at - started_at
+    pool_metrics.max_wait = max(pool_metrics.max_wait, wait)
+    return result
+
+
+async def stream_blocking(make_iter: Callable[..., Iterator], *args, batch_size: int = 1000) -> AsyncIterator[List[Any]]:
+    """
+    Postupně čte synchronní generátor (např. řádky XLS v read-only režimu) po dávkách.
+    Stav generátoru nelze přenést mezi procesy, proto dávky běží ve vláknech: u thread
+    poolu ve sdíleném poolu, u process poolu v omezeném poolu vláken (_get_stream_executor).
+    Dávky jednoho proudu jdou po sobě, takže generátor nikdy neběží ve dvou vláknech
+    současně. Každá dávka se započítá do metrik svého poolu. V paměti je vždy jen jedna dávka.
+    """
+    pool, pool_metrics = _get_stream_executor()
+    it = await _run_measured(pool, pool_metrics, lambda: iter(make_iter(*args)))
+    try:
+        while True:
+            batch = await _run_measured(pool, pool_metrics, lambda: list(itertools.islice(it, batch_size)))
+            if not batch:
+                break
+            yield batch
+    finally:
+        # Uzavře generátor (spustí jeho finally, např. wb.close())
+        close = getattr(it, "close", None)
+        if close:
+            await _run_measured(pool, pool_metrics, close)
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """Metriky sdíleného poolu; u process poolu navíc zvlášť pool vláken pro streamované čtení."""
+    stats = {"kind": settings.EXECUTOR_KIND, **metrics.snapshot()}
+    if settings.EXECUTOR_KIND != "thread":
+        stats["stream"] = stream_metrics.snapshot()
+    return stats
+
+
+def shutdown_executor() -> None:
+    global _executor, _stream_executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _stream_executor is not None:
+        _stream_executor.shutdown(wait=False, cancel_futures=True)
+        _stream_executor = None
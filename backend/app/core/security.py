@@ -1,16 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Tuple
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cena bcryptu je nastavitelná; hesla se starší cenou se při přihlášení přehashují (verify_and_update)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def hash_password(p: str) -> str:
-    return pwd_context.hash(p)
+# Vlastní omezený pool pro bcrypt (knihovna uvolňuje GIL), aby nápor přihlášení neblokoval
+# event loop a nečekal ve frontě za generováním dokumentů v app.core.executor
+_hash_executor: Optional[ThreadPoolExecutor] = None
 
-def verify_password(p: str, h: str) -> bool:
-    return pwd_context.verify(p, h)
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+async def hash_password_async(p: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_get_hash_executor(), pwd_context.hash, p)
+
+async def verify_and_update_password_async(p: str, h: str) -> Tuple[bool, Optional[str]]:
+    """Ověří heslo mimo event loop. Vrací (platné, nový hash nebo None, pokud přehash není potřeba)."""
+    return await asyncio.get_running_loop().run_in_executor(_get_hash_executor(), pwd_context.verify_and_update, p, h)
 
 def create_access_token(sub: str, extra: Optional[Dict[str, Any]] = None, expires_minutes: int = None) -> str:
     exp = datetime.utcnow() + timedelta(minutes=expires_minutes or settings.JWT_EXPIRE_MINUTES)
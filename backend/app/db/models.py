@@ -1,9 +1,9 @@
 from datetime import datetime, timezone, timedelta, date
 from enum import Enum
 from sqlalchemy import (
-    String, Integer, ForeignKey, DateTime, Boolean,
+    String, Integer, BigInteger, ForeignKey, DateTime, Boolean,
     UniqueConstraint, Enum as SAEnum, Text, Float, Date, TIMESTAMP, JSON,
-    Table, Column
+    Table, Column, Index
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.database import Base
@@ -67,6 +67,18 @@ class TriggerCondition(str, Enum):
     PERCENTAGE_REACHED = "PERCENTAGE_REACHED"
     QUANTITY_BELOW = "QUANTITY_BELOW"
 
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class OutboxStatus(str, Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
 class PickingOrderStatus(str, Enum):
     NEW = "NEW"
     IN_PROGRESS = "IN_PROGRESS"
@@ -142,6 +154,18 @@ class InventoryCategory(Base):
     children = relationship("InventoryCategory", lazy="selectin")
     __table_args__ = (UniqueConstraint("company_id", "name", "parent_id", name="uq_category_company_name_parent"),)
 
+class InventoryCategoryClosure(Base):
+    """
+    Closure tabulka stromu kategorií: jeden řádek pro každou dvojici předek–potomek
+    (každá kategorie je i sama sobě předkem s depth=0). Udržuje ji category_tree_service.
+    """
+    __tablename__ = "inventory_category_closure"
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey("inventory_categories.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[int] = mapped_column(ForeignKey("inventory_categories.id", ondelete="CASCADE"), primary_key=True)
+    depth: Mapped[int] = mapped_column(Integer, default=0)
+    # PK (ancestor_id, descendant_id) obslouží dotazy na podstrom, tento index cestu ke kořeni
+    __table_args__ = (Index("ix_category_closure_descendant_depth", "descendant_id", "depth"),)
+
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -164,6 +188,8 @@ class InventoryItem(Base):
     low_stock_alert_sent: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc)
     updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc, onupdate=now_utc)
+    # ID transakce poslední změny (položka, stav na lokacích, kategorie); plní DB trigger, viz inventory_sync_service
+    change_xid: Mapped[Optional[int]] = mapped_column(BigInteger)
     
     # Změna: M:N vztah místo ForeignKey
     categories = relationship(
@@ -173,7 +199,25 @@ class InventoryItem(Base):
     )
     
     locations: Mapped[list["ItemLocationStock"]] = relationship(back_populates="inventory_item", cascade="all, delete-orphan")
-    __table_args__ = (UniqueConstraint("company_id", "sku", name="uq_inventory_item_company_sku"),)
+    __table_args__ = (
+        UniqueConstraint("company_id", "sku", name="uq_inventory_item_company_sku"),
+        # Keyset stránkování výpisu skladu (WHERE company_id = ? AND id > ? ORDER BY id)
+        Index("ix_inventory_items_company_id_id", "company_id", "id"),
+        # Feed změn /inventory/changes (WHERE company_id = ? AND change_xid >= ?)
+        Index("ix_inventory_items_company_id_change_xid", "company_id", "change_xid"),
+    )
+
+class InventoryTombstone(Base):
+    """Záznam o smazané položce skladu pro feed změn; zapisuje ho DB trigger."""
+    __tablename__ = "inventory_tombstones"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"))
+    item_id: Mapped[int] = mapped_column(Integer)
+    change_xid: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc, index=True)
+    __table_args__ = (
+        Index("ix_inventory_tombstones_company_id_change_xid", "company_id", "change_xid"),
+    )
 
 class Location(Base):
     __tablename__ = "locations"
@@ -202,6 +246,18 @@ class CompanyPohodaSettings(Base):
     company: Mapped["Company"] = relationship()
 
 
+class RefreshToken(Base):
+    """Refresh token desktopové relace (uložen jen hash), viz refresh_token_service."""
+    __tablename__ = "refresh_tokens"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    family_id: Mapped[str] = mapped_column(String(32), index=True)
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc)
+
+
 class Invite(Base):
     __tablename__ = "invites"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -347,6 +403,30 @@ class TimeLog(Base):
     user: Mapped["User"] = relationship()
     work_type: Mapped["WorkType"] = relationship()
     task: Mapped["Task"] = relationship(back_populates="time_logs")
+    # Součty odpracovaných hodin na úkol (kontrola rozpočtu zakázek)
+    __table_args__ = (Index("ix_time_logs_task_id_entry_type", "task_id", "entry_type"),)
+
+class TimeLogRollup(Base):
+    """
+    Průběžné součty odpracovaného času: jeden řádek na úkol, typ záznamu a druh práce.
+    work_order_id je denormalizované, takže součet za zakázku je indexovaný dotaz
+    přes pár řádků místo průchodu všemi time_logs. Udržuje ho hours_rollup_service.
+    """
+    __tablename__ = "time_log_rollups"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id", ondelete="CASCADE"))
+    work_order_id: Mapped[int] = mapped_column(ForeignKey("work_orders.id", ondelete="CASCADE"), index=True)
+    entry_type: Mapped[TimeLogEntryType] = mapped_column(SAEnum(TimeLogEntryType))
+    work_type_id: Mapped[Optional[int]] = mapped_column(ForeignKey("work_types.id"))
+    # Hrubá délka záznamů (end_time - start_time) a součet pauz
+    total_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    break_minutes: Mapped[int] = mapped_column(Integer, default=0)
+    log_count: Mapped[int] = mapped_column(Integer, default=0)
+    __table_args__ = (
+        # NULLS NOT DISTINCT (Postgres 15+): záznamy bez druhu práce sdílí jeden řádek
+        UniqueConstraint("task_id", "entry_type", "work_type_id", name="uq_time_log_rollup_key",
+                         postgresql_nulls_not_distinct=True),
+    )
 
 class UsedInventoryItem(Base):
     __tablename__ = "used_inventory_items"
@@ -425,4 +505,54 @@ class ClientCategoryMargin(Base):
     margin_percentage: Mapped[float] = mapped_column(Float, default=0.0)
     
     client: Mapped["Client"] = relationship(back_populates="category_margins")
-    category: Mapped["InventoryCategory"] = relationship()
\ No newline at end of file
+    category: Mapped["InventoryCategory"] = relationship()
+
+
+class BackgroundJob(Base):
+    """Dlouhotrvající úloha (import, export, synchronizace) zpracovávaná na pozadí, viz job_service."""
+    __tablename__ = "background_jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    job_type: Mapped[str] = mapped_column(String(50))
+    status: Mapped[JobStatus] = mapped_column(SAEnum(JobStatus), default=JobStatus.queued, index=True)
+    params: Mapped[dict] = mapped_column(JSON, default=lambda: {})
+    progress: Mapped[int] = mapped_column(Integer, default=0)
+    message: Mapped[Optional[str]] = mapped_column(Text)
+    result: Mapped[Optional[dict]] = mapped_column(JSON)
+    result_path: Mapped[Optional[str]] = mapped_column(String(512))
+    result_filename: Mapped[Optional[str]] = mapped_column(String(255))
+    result_media_type: Mapped[Optional[str]] = mapped_column(String(100))
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc, index=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    # Worker, který úlohu právě zpracovává, a poslední obnovení jeho lease (viz job_service)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+
+class EmailOutbox(Base):
+    """
+    E-mail čekající na odeslání. Zapisuje se ve stejné transakci jako obchodní změna
+    (pozvánka, alert), odesílá ho worker v outbox_service.
+    """
+    __tablename__ = "email_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"))
+    notification_type: Mapped[str] = mapped_column(String(100))
+    recipient: Mapped[str] = mapped_column(String(255))
+    subject: Mapped[str] = mapped_column(String(500))
+    body: Mapped[str] = mapped_column(Text)
+    status: Mapped[OutboxStatus] = mapped_column(SAEnum(OutboxStatus), default=OutboxStatus.pending)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=now_utc)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    sent_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    __table_args__ = (
+        # Výběr zpráv k odeslání (WHERE status = 'pending' AND next_attempt_at <= now())
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+        # Limit odeslaných zpráv firmy za poslední minutu
+        Index("ix_email_outbox_company_sent_at", "company_id", "sent_at"),
+    )
@@ -1,17 +1,17 @@
 # backend/app/main.py
-import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import select, func, text
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.core.config import settings
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.db.database import engine, Base, async_session_factory
 from app.db.models import User, Company, Membership, RoleEnum
 
@@ -32,9 +32,18 @@ from app.routers import (
     auth, users, companies, clients, invites, members, inventory, categories,
     work_types, work_orders, tasks, time_logs, audit_logs,
     locations, inventory_movements, smtp, triggers, internal, picking_orders,
-    partners, pohoda, service_reports
+    partners, pohoda, service_reports, jobs
 )
 from app.services.trigger_service import check_all_triggers
+from app.services.category_tree_service import ensure_category_closure
+from app.services.hours_rollup_service import ensure_hours_rollup
+from app.services.job_service import init_job_runner
+from app.services.stock_events import start_stock_event_dispatcher, stop_stock_event_dispatcher
+from app.services.email_service import close_smtp_pools
+from app.services.outbox_service import init_outbox_worker
+from app.services.refresh_token_service import cleanup_refresh_tokens
+from app.services.inventory_sync_service import INVENTORY_CHANGE_TRIGGERS, cleanup_inventory_tombstones
+from app.core.executor import get_executor_stats, shutdown_executor
 
 # Nastavení logování
 logging.basicConfig(level=logging.INFO)
@@ -45,18 +54,15 @@ scheduler = AsyncIOScheduler()
 
 async def periodic_trigger_check():
     """
-    Periodicky spouští kontrolu triggerů (např. nízký stav skladu, rozpočet).
-    Toto běží jako nekonečná smyčka na pozadí (legacy způsob).
-    V budoucnu lze toto také převést přímo pod APScheduler.
+    Periodická kontrola triggerů (rozpočet zakázek, nízký stav skladu) spouštěná APSchedulerem.
+    Nízký stav skladu se hlídá hlavně událostmi ze stock_events, tady jde o konzistenční
+    kontrolu (importy, ruční zásahy do DB, události ztracené při restartu).
     """
-    while True:
-        # Počkáme 60 minut
-        await asyncio.sleep(3600)
-        async with async_session_factory() as session:
-            try:
-                await check_all_triggers(session)
-            except Exception as e:
-                logger.error(f"Periodic trigger check failed: {e}")
+    async with async_session_factory() as session:
+        try:
+            await check_all_triggers(session)
+        except Exception as e:
+            logger.error(f"Periodic trigger check failed: {e}")
 
 async def create_default_user():
     """
@@ -74,7 +80,7 @@ async def create_default_user():
                 # 1. Vytvoření uživatele
                 new_user = User(
                     email=settings.DEFAULT_USER_EMAIL,
-                    password_hash=hash_password(settings.DEFAULT_USER_PASSWORD),
+                    password_hash=await hash_password_async(settings.DEFAULT_USER_PASSWORD),
                     is_active=True
                 )
                 session.add(new_user)
@@ -111,6 +117,9 @@ async def lifespan(app: FastAPI):
     # Automatické vytvoření tabulek v DB
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Migrace až po commitu create_all; každá v savepointu, takže chyba jedné (např. chybějící
+    # právo na CREATE EXTENSION) neshodí transakci s ostatními
+    async with engine.begin() as conn:
         # Přidání sloupců, která create_all nepřidá do existujících tabulek
         _migrations = [
             "ALTER TABLE plugin_obj_tech_fields ADD COLUMN IF NOT EXISTS is_main BOOLEAN NOT NULL DEFAULT FALSE",
@@ -122,21 +131,52 @@ async def lifespan(app: FastAPI):
             "ALTER TABLE plugin_quote_invoices ADD COLUMN IF NOT EXISTS status VARCHAR(30) NOT NULL DEFAULT 'issued'",
             "ALTER TABLE plugin_quote_invoices ADD COLUMN IF NOT EXISTS work_order_id INTEGER REFERENCES work_orders(id) ON DELETE CASCADE",
             "ALTER TABLE plugin_quote_invoices ALTER COLUMN quote_id DROP NOT NULL",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_company_id_id ON inventory_items (company_id, id)",
+            "CREATE INDEX IF NOT EXISTS ix_time_logs_task_id_entry_type ON time_logs (task_id, entry_type)",
+            # Trigramové indexy pro /inventory/search (ILIKE '%...%' a similarity)
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_name_trgm ON inventory_items USING gin (name gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_sku_trgm ON inventory_items USING gin (sku gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_alternative_sku_trgm ON inventory_items USING gin (alternative_sku gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_ean_trgm ON inventory_items USING gin (ean gin_trgm_ops)",
+            # Feed změn skladu: verze položky (ID transakce) + triggery, které ji udržují
+            "ALTER TABLE inventory_items ADD COLUMN IF NOT EXISTS change_xid BIGINT",
+            "CREATE INDEX IF NOT EXISTS ix_inventory_items_company_id_change_xid ON inventory_items (company_id, change_xid)",
+            *INVENTORY_CHANGE_TRIGGERS,
             # service_reports tabulka se vytvoří přes create_all, tady jen pro jistotu indexy
         ]
         for sql in _migrations:
             try:
-                await conn.execute(text(sql))
+                async with conn.begin_nested():
+                    await conn.execute(text(sql))
             except Exception as e:
                 logger.warning(f"Migration skipped: {e}")
 
     # Bootstrap výchozího uživatele
     await create_default_user()
+
+    # Doplnění closure tabulky stromu kategorií (při prvním spuštění nebo po ručním zásahu do DB)
+    async with async_session_factory() as session:
+        if await ensure_category_closure(session):
+            logger.info("Closure tabulka kategorií byla přestavěna.")
+        # Průběžné součty hodin (první spuštění po přidání tabulky time_log_rollups)
+        if await ensure_hours_rollup(session):
+            logger.info("Součty odpracovaných hodin byly přepočítány.")
     
     # Spuštění APScheduleru
     scheduler.start()
     # Uložíme scheduler do state, aby byl dostupný v pluginech
     app.state.scheduler = scheduler
+    # Fronta úloh na pozadí (importy, exporty, synchronizace)
+    init_job_runner(scheduler)
+    # Worker pro odesílání e-mailů z outboxu
+    init_outbox_worker(scheduler)
+    # Úklid expirovaných refresh tokenů
+    if not scheduler.get_job("refresh_token_cleanup"):
+        scheduler.add_job(cleanup_refresh_tokens, 'cron', hour=4, minute=45, id="refresh_token_cleanup")
+    # Úklid starých tombstonů feedu změn skladu
+    if not scheduler.get_job("inventory_tombstone_cleanup"):
+        scheduler.add_job(cleanup_inventory_tombstones, 'cron', hour=4, minute=50, id="inventory_tombstone_cleanup")
     
     # Registrace pluginů
     pm = PluginManager(app)
@@ -151,14 +191,21 @@ async def lifespan(app: FastAPI):
     pm.register_plugin(quotes_management)
     pm.register_plugin(invoices_management)
     
-    # Spuštění staré logiky triggerů na pozadí
-    asyncio.create_task(periodic_trigger_check())
+    # Alerty nízkého stavu skladu podle událostí + řídká konzistenční kontrola triggerů
+    start_stock_event_dispatcher()
+    scheduler.add_job(
+        periodic_trigger_check, 'interval', minutes=settings.TRIGGER_SWEEP_INTERVAL_MINUTES,
+        id="trigger_sweep", replace_existing=True
+    )
     
     yield # Zde aplikace běží a obsluhuje požadavky
     
     # 2. SHUTDOWN
     logger.info("Shutting down application...")
     scheduler.shutdown()
+    await stop_stock_event_dispatcher()
+    await close_smtp_pools()
+    shutdown_executor()
 
 # Zajištění existence složek pro nahrávání obrázků
 Path("static/images/inventory").mkdir(parents=True, exist_ok=True)
@@ -175,6 +222,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Komprese větších odpovědí (seznamy skladu, exporty) pro klienty s Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Připojení statických souborů
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -202,8 +251,9 @@ app.include_router(picking_orders.router)
 app.include_router(partners.router)
 app.include_router(pohoda.router)
 app.include_router(service_reports.router)
+app.include_router(jobs.router)
 
 @app.get("/healthz")
 async def health():
-    """Endpoint pro kontrolu stavu služby (health check)."""
-    return {"status": "ok"}
\ No newline at end of file
+    """Endpoint pro kontrolu stavu služby (health check) včetně vytížení poolu pro dokumenty."""
+    return {"status": "ok", "executor": get_executor_stats()}
\ No newline at end of file
@@ -1,23 +1,43 @@
 # app/routers/audit_logs.py
 from typing import List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from datetime import date
 
 from app.db.database import get_db
-from app.db.models import InventoryAuditLog
+from app.db.models import InventoryAuditLog, AuditLogAction, InventoryItem, User
 from app.schemas.audit_log import AuditLogOut
 from app.routers.members import require_admin_access # Předpokládáme, že logy vidí jen admini
+from app.services.export_service import export_response, EXPORT_FORMAT_PATTERN
 
 router = APIRouter(prefix="/companies/{company_id}/audit-logs", tags=["audit-logs"])
 
+EXPORT_COLUMNS = ["id", "timestamp", "action", "item_id", "item_sku", "item_name", "user_email", "details"]
+
+def _apply_filters(stmt, company_id: int, item_id: Optional[int], user_id: Optional[int],
+                   action: Optional[AuditLogAction], start_date: Optional[date], end_date: Optional[date]):
+    """Společné filtry pro výpis i export auditního logu."""
+    stmt = stmt.where(InventoryAuditLog.company_id == company_id)
+    if item_id:
+        stmt = stmt.where(InventoryAuditLog.item_id == item_id)
+    if user_id:
+        stmt = stmt.where(InventoryAuditLog.user_id == user_id)
+    if action:
+        stmt = stmt.where(InventoryAuditLog.action == action)
+    if start_date:
+        stmt = stmt.where(func.date(InventoryAuditLog.timestamp) >= start_date)
+    if end_date:
+        stmt = stmt.where(func.date(InventoryAuditLog.timestamp) <= end_date)
+    return stmt
+
 @router.get("", response_model=List[AuditLogOut], summary="Získání historie skladových pohybů s filtry")
 async def list_audit_logs(
     company_id: int,
     item_id: Optional[int] = None,
     user_id: Optional[int] = None,
+    action: Optional[AuditLogAction] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     skip: int = 0,
@@ -31,23 +51,16 @@ async def list_audit_logs(
     Umožňuje filtrování podle:
     - **item_id**: Zobrazí historii pouze pro jednu konkrétní položku.
     - **user_id**: Zobrazí všechny akce provedené jedním konkrétním uživatelem.
+    - **action**: Zobrazí jen jeden typ akce (např. `write_off`).
     - **start_date**: Začátek časového rozsahu.
     - **end_date**: Konec časového rozsahu.
     
     Výsledky jsou stránkované a seřazené od nejnovějšího po nejstarší.
     """
-    # Základní dotaz, který vybírá logy pro danou firmu
-    stmt = select(InventoryAuditLog).where(InventoryAuditLog.company_id == company_id)
-    
-    # Přidání filtrů podle parametrů v URL
-    if item_id:
-        stmt = stmt.where(InventoryAuditLog.item_id == item_id)
-    if user_id:
-        stmt = stmt.where(InventoryAuditLog.user_id == user_id)
-    if start_date:
-        stmt = stmt.where(func.date(InventoryAuditLog.timestamp) >= start_date)
-    if end_date:
-        stmt = stmt.where(func.date(InventoryAuditLog.timestamp) <= end_date)
+    # Základní dotaz, který vybírá logy pro danou firmu, s filtry podle parametrů v URL
+    stmt = _apply_filters(
+        select(InventoryAuditLog), company_id, item_id, user_id, action, start_date, end_date
+    )
         
     # Eager loading pro související objekty, abychom předešli N+1 problému a MissingGreenlet chybě
     stmt = stmt.options(
@@ -59,4 +72,33 @@ async def list_audit_logs(
     stmt = stmt.order_by(InventoryAuditLog.timestamp.desc()).offset(skip).limit(limit)
     
     result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
+
+@router.get("/export", summary="Streamovaný export auditního logu (NDJSON / CSV)")
+async def export_audit_logs(
+    company_id: int,
+    fmt: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    item_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    action: Optional[AuditLogAction] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    _=Depends(require_admin_access)
+):
+    """
+    Vyexportuje auditní log se stejnými filtry jako výpis, bez stránkování.
+    Řádky se streamují z server-side kurzoru, seřazené od nejnovějšího.
+    """
+    stmt = (
+        select(
+            InventoryAuditLog.id, InventoryAuditLog.timestamp, InventoryAuditLog.action,
+            InventoryAuditLog.item_id, InventoryItem.sku.label("item_sku"),
+            InventoryItem.name.label("item_name"), User.email.label("user_email"),
+            InventoryAuditLog.details
+        )
+        .outerjoin(InventoryItem, InventoryAuditLog.item_id == InventoryItem.id)
+        .outerjoin(User, InventoryAuditLog.user_id == User.id)
+    )
+    stmt = _apply_filters(stmt, company_id, item_id, user_id, action, start_date, end_date)
+    stmt = stmt.order_by(InventoryAuditLog.timestamp.desc())
+    return export_response(stmt, EXPORT_COLUMNS, fmt, f"audit_log_{company_id}")
@@ -9,10 +9,11 @@ from app.db.database import get_db
 from app.core.config import settings
 from app.core.security import create_access_token
 # --- LoginIn už nepotřebujeme pro tento endpoint ---
-from app.schemas.auth import TokenOut
+from app.schemas.auth import TokenOut, RefreshIn
 from app.schemas.company import RegisterCompanyIn, CompanyOut
 from app.db.models import Company, User, Membership, RoleEnum
 from app.services.user_service import get_user_by_email, create_user, add_membership
+from app.services.refresh_token_service import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
 from sqlalchemy import select
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -49,8 +50,35 @@ async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-    # Zbytek funkce zůstává stejný
+    # Refresh token (a případně přehashované heslo při změně BCRYPT_ROUNDS) uložíme jedním commitem
+    refresh_token = await issue_refresh_token(db, user.id)
+    await db.commit()
+    return await _token_response(db, user, refresh_token)
+
+@router.post("/refresh", response_model=TokenOut)
+async def refresh(payload: RefreshIn, db: AsyncSession = Depends(get_db)):
+    """Vymění refresh token za nový pár tokenů bez ověřování hesla."""
+    rotated = await rotate_refresh_token(db, payload.refresh_token)
+    # Commit i při neúspěchu – případné zneplatnění rodiny tokenů musí zůstat
+    await db.commit()
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user, refresh_token = rotated
+    return await _token_response(db, user, refresh_token)
+
+@router.post("/logout", status_code=204)
+async def logout(payload: RefreshIn, db: AsyncSession = Depends(get_db)):
+    """Zneplatní relaci, ke které refresh token patří."""
+    await revoke_refresh_token(db, payload.refresh_token)
+    await db.commit()
+
+async def _token_response(db: AsyncSession, user: User, refresh_token: str) -> TokenOut:
+    # Firmy se načítají při každém vydání tokenu, obnova tak promítne změny členství
     res = await db.execute(select(Membership.company_id).where(Membership.user_id == user.id))
     tenant_ids = [row[0] for row in res.all()]
     token = create_access_token(str(user.id), extra={"tenants": tenant_ids})
-    return TokenOut(access_token=token)
\ No newline at end of file
+    return TokenOut(access_token=token, refresh_token=refresh_token, expires_in=settings.JWT_EXPIRE_MINUTES * 60)
\ No newline at end of file
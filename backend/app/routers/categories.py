@@ -9,8 +9,10 @@ from sqlalchemy.exc import IntegrityError
 from app.db.database import get_db
 from app.db.models import InventoryCategory, InventoryItem, item_category_association
 from app.schemas.category import CategoryCreateIn, CategoryOut, CategoryUpdateIn
-from app.core.dependencies import require_company_access
+from app.core.dependencies import require_company_access, conditional_list
 from app.schemas.category import CategoryCreateIn, CategoryOut, CategoryUpdateIn, CategorySimpleOut
+from app.services.category_tree_service import insert_category_node, move_category_node, is_in_subtree
+from app.services.cache_service import get_company_categories, invalidate_company_categories
 router = APIRouter(prefix="/companies/{company_id}/categories", tags=["inventory-categories"])
 
 @router.post("", response_model=CategorySimpleOut, status_code=status.HTTP_201_CREATED)
@@ -22,7 +24,10 @@ async def create_category(
 ):
     category = InventoryCategory(**payload.dict(), company_id=company_id)
     db.add(category)
+    await db.flush()
+    await insert_category_node(db, category.id, category.parent_id)
     await db.commit()
+    invalidate_company_categories(company_id)
     await db.refresh(category) # Stačí základní refresh
     return category
 
@@ -30,36 +35,27 @@ async def create_category(
 async def list_categories(
     company_id: int,
     db: AsyncSession = Depends(get_db),
-    _=Depends(require_company_access)
+    _=Depends(require_company_access),
+    etag: str = Depends(conditional_list("categories"))
 ):
-    """Vrátí stromovou strukturu všech kategorií pro danou firmu."""
-    stmt = select(InventoryCategory).where(InventoryCategory.company_id == company_id)
-    result = await db.execute(stmt)
-    all_categories_db = result.scalars().all()
+    """Vrátí stromovou strukturu všech kategorií pro danou firmu (plochý seznam bere z cache)."""
+    all_categories = (await get_company_categories(db, company_id, version=etag)).rows
 
-    if not all_categories_db:
+    if not all_categories:
         return []
 
-    # Vytvoříme Pydantic modely, ale explicitně definujeme, které atributy se mají použít,
-    # abychom se vyhnuli přístupu k 'children' relationship.
-    category_out_map: Dict[int, CategoryOut] = {}
-    for category in all_categories_db:
-        # Vytvoříme slovník jen s bezpečnými atributy
-        safe_data = {
-            "id": category.id,
-            "name": category.name,
-            "parent_id": category.parent_id
-            # Atribut 'children' záměrně vynecháváme, Pydantic použije defaultní hodnotu []
-        }
-        category_out_map[category.id] = CategoryOut.model_validate(safe_data)
+    # Pydantic modely tvoříme z plochých řádků cache, vztah 'children' se tak vůbec nenačítá.
+    category_out_map: Dict[int, CategoryOut] = {
+        row["id"]: CategoryOut.model_validate(row) for row in all_categories
+    }
 
-    # Zbytek kódu pro sestavení stromu je již v pořádku a zůstává stejný
+    # Sestavení stromu
     root_categories_out: List[CategoryOut] = []
-    for category_db in all_categories_db:
-        category_out = category_out_map[category_db.id]
+    for row in all_categories:
+        category_out = category_out_map[row["id"]]
         
-        if category_db.parent_id is not None:
-            parent_out = category_out_map.get(category_db.parent_id)
+        if row["parent_id"] is not None:
+            parent_out = category_out_map.get(row["parent_id"])
             if parent_out:
                 parent_out.children.append(category_out)
         else:
@@ -85,10 +81,20 @@ async def update_category(
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Category not found")
 
     update_data = payload.dict(exclude_unset=True)
+    parent_changed = "parent_id" in update_data and update_data["parent_id"] != category.parent_id
+    if parent_changed and update_data["parent_id"] is not None:
+        # Nový rodič nesmí ležet v podstromu přesouvané kategorie (vznikl by cyklus)
+        if await is_in_subtree(db, category.id, update_data["parent_id"]):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Category cannot be moved under itself or its descendant.")
+
     for key, value in update_data.items():
         setattr(category, key, value)
+
+    if parent_changed:
+        await move_category_node(db, category.id, category.parent_id)
     
     await db.commit()
+    invalidate_company_categories(company_id)
     await db.refresh(category) # Nenačítáme children, vracíme plochý objekt
     return category
 
@@ -109,7 +115,9 @@ async def delete_category(
 
     category = (await db.execute(select(InventoryCategory).where(InventoryCategory.id == category_id, InventoryCategory.company_id == company_id))).scalar_one_or_none()
     if category:
+        # Řádky v inventory_category_closure smaže ON DELETE CASCADE
         await db.delete(category)
         await db.commit()
+        invalidate_company_categories(company_id)
     else:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Category not found")
\ No newline at end of file
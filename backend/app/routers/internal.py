@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.services.trigger_service import check_all_triggers
+from app.services.hours_rollup_service import rebuild_hours_rollup
 from app.core.dependencies import require_admin_access # Zajistíme, že to může spustit jen admin
 
 router = APIRouter(prefix="/internal", tags=["internal"], include_in_schema=False)
@@ -27,4 +28,25 @@ async def run_triggers_manually(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during trigger check: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/rebuild-hours-rollup", summary="Přepočet průběžných součtů odpracovaných hodin")
+async def rebuild_hours_rollup_manually(
+    company_id: int,
+    db: AsyncSession = Depends(get_db),
+    _ = Depends(require_admin_access)
+):
+    """
+    Opravný příkaz: smaže a znovu spočítá součty time_log_rollups zakázek dané firmy
+    ze záznamů času. Potřeba jen po ručním zásahu do time_logs mimo API.
+    """
+    try:
+        rows = await rebuild_hours_rollup(db, company_id)
+        await db.commit()
+        return {"status": "ok", "message": f"Hours rollup rebuilt ({rows} rows)."}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred during hours rollup rebuild: {str(e)}"
+        )
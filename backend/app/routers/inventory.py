@@ -2,19 +2,24 @@
 import shutil
 import uuid
 from pathlib import Path
-from typing import List, Dict, Any, Set
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, or_, case, func
 from sqlalchemy.orm import selectinload
 
 from app.db.database import get_db
 from app.db.models import (
     InventoryItem, InventoryAuditLog, AuditLogAction, 
-    InventoryCategory, ItemLocationStock, Location
+    InventoryCategory, ItemLocationStock, Location, Manufacturer, Supplier, item_category_association
 )
-from app.schemas.inventory import InventoryItemCreateIn, InventoryItemOut, InventoryItemUpdateIn
-from app.core.dependencies import require_company_access, require_admin_access
+from app.schemas.inventory import (
+    InventoryItemCreateIn, InventoryItemOut, InventoryItemUpdateIn, InventoryPageOut, InventoryChangesOut
+)
+from app.core.dependencies import require_company_access, require_admin_access, conditional_list
+from app.services.category_tree_service import subtree_item_ids_select
+from app.services.export_service import export_response, EXPORT_FORMAT_PATTERN
+from app.services.inventory_sync_service import get_inventory_changes
 
 from app.schemas.audit_log import AuditLogOut # <--- Přidat
 from app.db.models import InventoryAuditLog # <--- Přidat (už tam pravděpodobně je)
@@ -23,24 +28,6 @@ from app.db.models import InventoryAuditLog # <--- Přidat (už tam pravděpodob
 UPLOAD_DIRECTORY = Path("static/images/inventory")
 UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
 
-async def _get_descendant_category_ids(db: AsyncSession, company_id: int, parent_category_id: int) -> Set[int]:
-    all_categories_stmt = select(InventoryCategory.id, InventoryCategory.parent_id).where(InventoryCategory.company_id == company_id)
-    result = await db.execute(all_categories_stmt)
-    parent_map = {}
-    for cat_id, p_id in result.all():
-        if p_id not in parent_map: parent_map[p_id] = []
-        parent_map[p_id].append(cat_id)
-    all_ids_in_subtree = {parent_category_id}
-    queue = [parent_category_id]
-    while queue:
-        current_id = queue.pop(0)
-        children = parent_map.get(current_id, [])
-        for child_id in children:
-            if child_id not in all_ids_in_subtree:
-                all_ids_in_subtree.add(child_id)
-                queue.append(child_id)
-    return all_ids_in_subtree
-
 async def get_item_or_404(item_id: int, company_id: int, db: AsyncSession) -> InventoryItem:
     stmt = (
         select(InventoryItem)
@@ -74,6 +61,35 @@ async def get_full_inventory_item(item_id: int, db: AsyncSession) -> InventoryIt
 
 router = APIRouter(prefix="/companies/{company_id}/inventory", tags=["inventory"])
 
+# Celkové množství spočítané v SQL (korelovaný poddotaz přes PK item_location_stock),
+# aby odlehčený výpis nemusel načítat lokace a sčítat je v InventoryItemOut.
+_total_quantity_expr = (
+    select(func.coalesce(func.sum(ItemLocationStock.quantity), 0))
+    .where(ItemLocationStock.inventory_item_id == InventoryItem.id)
+    .correlate(InventoryItem)
+    .scalar_subquery()
+)
+
+# Pole, která lze vyžádat přes parametr `fields` v endpointu /inventory/page
+PAGE_FIELDS = {
+    "id": InventoryItem.id,
+    "name": InventoryItem.name,
+    "sku": InventoryItem.sku,
+    "alternative_sku": InventoryItem.alternative_sku,
+    "ean": InventoryItem.ean,
+    "price": InventoryItem.price,
+    "retail_price": InventoryItem.retail_price,
+    "vat_rate": InventoryItem.vat_rate,
+    "description": InventoryItem.description,
+    "image_url": InventoryItem.image_url,
+    "manufacturer_id": InventoryItem.manufacturer_id,
+    "supplier_id": InventoryItem.supplier_id,
+    "is_monitored_for_stock": InventoryItem.is_monitored_for_stock,
+    "low_stock_threshold": InventoryItem.low_stock_threshold,
+    "total_quantity": _total_quantity_expr,
+}
+DEFAULT_PAGE_FIELDS = ("id", "sku", "name", "ean", "total_quantity")
+
 @router.get("", response_model=List[InventoryItemOut])
 async def list_inventory_items(
     company_id: int,
@@ -81,7 +97,8 @@ async def list_inventory_items(
     skip: int = 0,
     limit: int = 10000,
     db: AsyncSession = Depends(get_db),
-    _=Depends(require_company_access)
+    _=Depends(require_company_access),
+    __=Depends(conditional_list("inventory"))
 ):
     stmt = (
         select(InventoryItem)
@@ -96,18 +113,167 @@ async def list_inventory_items(
             selectinload(InventoryItem.supplier)
         )
     )
-    # ... zbytek funkce (filtrování podle kategorií, limit, offset) ...
     if category_id is not None:
-        all_relevant_category_ids = await _get_descendant_category_ids(db, company_id, category_id)
-        if all_relevant_category_ids:
-            stmt = stmt.join(InventoryItem.categories).where(InventoryCategory.id.in_(all_relevant_category_ids))
-        else:
-            return []
+        # Kategorie včetně všech podkategorií přes closure tabulku
+        stmt = stmt.where(InventoryItem.id.in_(subtree_item_ids_select(category_id)))
     
     stmt = stmt.offset(skip).limit(limit)
     result = await db.execute(stmt)
     return result.scalars().all()
 
+@router.get("/page", response_model=InventoryPageOut, summary="Odlehčený výpis skladu s keyset stránkováním")
+async def list_inventory_page(
+    company_id: int,
+    after_id: int | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    fields: str | None = None,
+    category_id: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_company_access)
+):
+    """
+    Vrátí stránku položek seřazenou podle ID (index `company_id, id`).
+    Další stránku získáte předáním `next_cursor` jako `after_id`.
+
+    - **fields**: čárkami oddělený seznam polí (výchozí `id,sku,name,ean,total_quantity`),
+      `id` se vrací vždy, protože slouží jako kurzor.
+    - **category_id**: omezí výpis na kategorii včetně podkategorií.
+    """
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(DEFAULT_PAGE_FIELDS)
+    unknown = [f for f in requested if f not in PAGE_FIELDS]
+    if unknown:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown fields: {', '.join(unknown)}")
+    requested = list(dict.fromkeys(["id", *requested]))
+
+    stmt = (
+        select(*[PAGE_FIELDS[f].label(f) for f in requested])
+        .where(InventoryItem.company_id == company_id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(InventoryItem.id > after_id)
+    if category_id is not None:
+        stmt = stmt.where(InventoryItem.id.in_(subtree_item_ids_select(category_id)))
+
+    # O jeden řádek navíc, abychom poznali, zda existuje další stránka
+    stmt = stmt.order_by(InventoryItem.id).limit(limit + 1)
+    rows = (await db.execute(stmt)).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return InventoryPageOut(
+        items=[dict(row) for row in rows],
+        next_cursor=rows[-1]["id"] if has_more else None
+    )
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@router.get("/search", response_model=List[InventoryItemOut], summary="Fulltextové hledání položek (trigramy)")
+async def search_inventory_items(
+    company_id: int,
+    q: str = Query(..., min_length=1, max_length=100),
+    category_id: int | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_company_access)
+):
+    """
+    Hledá podřetězec (bez ohledu na velikost písmen) v názvu, SKU, alternativním SKU a EAN.
+    Dotaz obsluhují GIN trigramové indexy (pg_trgm), takže nečte celý sklad.
+
+    Řazení: přesná shoda SKU / alt. SKU / EAN, pak shoda začátku, pak podobnost (similarity).
+    """
+    term = q.strip()
+    if not term:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Search query must not be blank.")
+    contains = f"%{_escape_like(term)}%"
+    starts = f"{_escape_like(term)}%"
+    columns = (InventoryItem.name, InventoryItem.sku, InventoryItem.alternative_sku, InventoryItem.ean)
+
+    rank = case(
+        (or_(func.lower(InventoryItem.sku) == term.lower(),
+             func.lower(InventoryItem.alternative_sku) == term.lower(),
+             InventoryItem.ean == term), 0),
+        (or_(*(column.ilike(starts, escape="\\") for column in columns)), 1),
+        else_=2
+    )
+    similarity = func.greatest(*(func.coalesce(func.similarity(column, term), 0) for column in columns))
+
+    stmt = (
+        select(InventoryItem)
+        .where(
+            InventoryItem.company_id == company_id,
+            or_(*(column.ilike(contains, escape="\\") for column in columns))
+        )
+        .options(
+            selectinload(InventoryItem.categories),
+            selectinload(InventoryItem.locations)
+                .selectinload(ItemLocationStock.location)
+                .selectinload(Location.authorized_users),
+            selectinload(InventoryItem.manufacturer),
+            selectinload(InventoryItem.supplier)
+        )
+        .order_by(rank, similarity.desc(), InventoryItem.id)
+        .limit(limit)
+    )
+    if category_id is not None:
+        stmt = stmt.where(InventoryItem.id.in_(subtree_item_ids_select(category_id)))
+    return (await db.execute(stmt)).scalars().all()
+
+@router.get("/changes", response_model=InventoryChangesOut, summary="Změny skladu od kurzoru (delta synchronizace)")
+async def get_inventory_item_changes(
+    company_id: int,
+    since: str | None = Query(None, max_length=64),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_company_access)
+):
+    """
+    Bez `since` (nebo s neplatným / příliš starým kurzorem) vrátí celý sklad s `full` = True.
+    Jinak jen položky změněné od kurzoru (vč. změn stavu na lokacích) a ID smazaných položek.
+    """
+    cursor, full, items, deleted_ids = await get_inventory_changes(db, company_id, since)
+    return InventoryChangesOut(cursor=cursor, full=full, items=items, deleted_ids=deleted_ids)
+
+# Sloupce streamovaného exportu skladu (pořadí = pořadí sloupců v CSV)
+EXPORT_COLUMNS = [
+    "id", "name", "sku", "alternative_sku", "ean", "total_quantity", "price", "retail_price",
+    "vat_rate", "categories", "manufacturer", "supplier", "description"
+]
+
+@router.get("/export", summary="Streamovaný export skladu (NDJSON / CSV)")
+async def export_inventory_items(
+    company_id: int,
+    fmt: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    category_id: int | None = None,
+    _=Depends(require_company_access)
+):
+    """
+    Vyexportuje všechny položky firmy jako NDJSON (jeden JSON objekt na řádek) nebo CSV.
+    Data se čtou server-side kurzorem a odesílají průběžně, paměť serveru nezávisí na počtu položek.
+    """
+    category_names = (
+        select(func.string_agg(InventoryCategory.name, ", "))
+        .join(item_category_association, item_category_association.c.category_id == InventoryCategory.id)
+        .where(item_category_association.c.item_id == InventoryItem.id)
+        .correlate(InventoryItem)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            InventoryItem.id, InventoryItem.name, InventoryItem.sku, InventoryItem.alternative_sku,
+            InventoryItem.ean, _total_quantity_expr.label("total_quantity"), InventoryItem.price,
+            InventoryItem.retail_price, InventoryItem.vat_rate, category_names.label("categories"),
+            Manufacturer.name.label("manufacturer"), Supplier.name.label("supplier"),
+            InventoryItem.description
+        )
+        .outerjoin(Manufacturer, InventoryItem.manufacturer_id == Manufacturer.id)
+        .outerjoin(Supplier, InventoryItem.supplier_id == Supplier.id)
+        .where(InventoryItem.company_id == company_id)
+        .order_by(InventoryItem.id)
+    )
+    if category_id is not None:
+        stmt = stmt.where(InventoryItem.id.in_(subtree_item_ids_select(category_id)))
+    return export_response(stmt, EXPORT_COLUMNS, fmt, f"sklad_{company_id}")
+
 @router.post("", response_model=InventoryItemOut, status_code=status.HTTP_201_CREATED)
 async def create_inventory_item(
     company_id: int,
@@ -10,6 +10,7 @@ from app.db.models import InventoryItem, Location, ItemLocationStock, InventoryA
 from app.schemas.inventory import PlaceStockIn, TransferStockIn, InventoryItemOut, WriteOffStockIn
 from app.core.dependencies import require_admin_access
 from app.routers.inventory import get_full_inventory_item
+from app.services.stock_events import publish_stock_change
 
 router = APIRouter(prefix="/companies/{company_id}/inventory/movements", tags=["inventory-movements"])
 
@@ -54,6 +55,7 @@ async def place_stock(
     db.add(log)
     
     await db.commit()
+    publish_stock_change(company_id, [item.id])
     return await get_full_inventory_item(item.id, db)
 
 
@@ -101,6 +103,7 @@ async def transfer_stock(
     db.add(log)
     
     await db.commit()
+    publish_stock_change(company_id, [payload.inventory_item_id])
     return await get_full_inventory_item(payload.inventory_item_id, db)
 
 # --- NOVÝ ENDPOINT PRO ODPIS ---
@@ -147,6 +150,7 @@ async def write_off_stock(
     db.add(log)
 
     await db.commit()
+    publish_stock_change(company_id, [item.id])
 
     # 4. Vrácení odpovědi
     return await get_full_inventory_item(payload.inventory_item_id, db)
\ No newline at end of file
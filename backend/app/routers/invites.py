@@ -9,7 +9,7 @@ from app.schemas.user import UserOut
 from app.services.invite_service import create_invite, get_invite_by_token
 from app.services.user_service import get_user_by_email, create_user, add_membership
 from app.routers.companies import require_company_access
-from app.services.email_service import send_transactional_email
+from app.services.outbox_service import queue_email
 
 router = APIRouter(prefix="/invites", tags=["invites"])
 
@@ -18,13 +18,11 @@ async def create_company_invite(company_id: int, body: InviteCreateIn,
                                 _=Depends(lambda token=Depends(require_company_access): token),
                                 db: AsyncSession = Depends(get_db)):
     inv = await create_invite(db, company_id=company_id, email=body.email, role=body.role, ttl_minutes=body.ttl_minutes)
-    await db.commit()
-    await db.refresh(inv)
 
     # --- ODESLÁNÍ E-MAILU ---
-    # Toto by v reálné aplikaci mělo běžet na pozadí (např. přes Celery/RQ)
-    # aby neblokovalo HTTP odpověď. Pro jednoduchost to zde voláme přímo.
-    await send_transactional_email(
+    # E-mail se zařadí do outboxu ve stejné transakci jako pozvánka,
+    # odešle ho worker na pozadí (outbox_service), odpověď na SMTP nečeká.
+    await queue_email(
         db,
         company_id=company_id,
         notification_type="on_invite_created", # Klíč, který bude v JSON nastavení
@@ -32,6 +30,8 @@ async def create_company_invite(company_id: int, body: InviteCreateIn,
         subject="Pozvánka do společnosti",
         body=f"Byli jste pozváni do společnosti. Pro přijetí pozvánky použijte tento token: {inv.token}"
     )
+    await db.commit()
+    await db.refresh(inv)
 
     return inv
 
@@ -0,0 +1,74 @@
+# app/routers/jobs.py
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.db.database import get_db
+from app.db.models import BackgroundJob, JobStatus, RoleEnum
+from app.schemas.job import JobOut
+from app.core.dependencies import require_company_access, get_current_role, is_admin_role
+
+router = APIRouter(prefix="/companies/{company_id}/jobs", tags=["jobs"])
+
+async def get_job_owner_filter(
+    payload: dict = Depends(require_company_access),
+    role: Optional[RoleEnum] = Depends(get_current_role)
+) -> Optional[int]:
+    """
+    Úlohy nesou vstupy a výsledky jednotlivých uživatelů (exporty docházky, PDF nabídek,
+    výsledky synchronizace). Owner/admin vidí všechny úlohy firmy (None), ostatní jen své (user_id).
+    """
+    return None if is_admin_role(role) else int(payload.get("sub"))
+
+async def get_job_or_404(job_id: int, company_id: int, db: AsyncSession, owner_id: Optional[int]) -> BackgroundJob:
+    job = await db.get(BackgroundJob, job_id)
+    if not job or job.company_id != company_id or (owner_id is not None and job.user_id != owner_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.get("", response_model=List[JobOut], summary="Seznam úloh na pozadí")
+async def list_jobs(
+    company_id: int,
+    job_status: Optional[JobStatus] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    owner_id: Optional[int] = Depends(get_job_owner_filter)
+):
+    stmt = select(BackgroundJob).where(BackgroundJob.company_id == company_id)
+    if owner_id is not None:
+        stmt = stmt.where(BackgroundJob.user_id == owner_id)
+    if job_status:
+        stmt = stmt.where(BackgroundJob.status == job_status)
+    stmt = stmt.order_by(BackgroundJob.created_at.desc()).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
+
+@router.get("/{job_id}", response_model=JobOut, summary="Stav a průběh úlohy")
+async def get_job(
+    company_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    owner_id: Optional[int] = Depends(get_job_owner_filter)
+):
+    return await get_job_or_404(job_id, company_id, db, owner_id)
+
+@router.get("/{job_id}/result", summary="Výsledek dokončené úlohy")
+async def get_job_result(
+    company_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    owner_id: Optional[int] = Depends(get_job_owner_filter)
+):
+    """Vrátí soubor vytvořený úlohou (XLSX, PDF), případně její JSON výsledek."""
+    job = await get_job_or_404(job_id, company_id, db, owner_id)
+    if job.status == JobStatus.failed:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job failed: {job.error}")
+    if job.status != JobStatus.succeeded:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job has not finished yet.")
+    if job.result_path:
+        if not os.path.exists(job.result_path):
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Job result file has expired.")
+        return FileResponse(job.result_path, media_type=job.result_media_type, filename=job.result_filename)
+    return job.result
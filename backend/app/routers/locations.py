@@ -1,18 +1,21 @@
 # backend/app/routers/locations.py
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.db.database import get_db
-from app.db.models import Location, ItemLocationStock, User, Membership, RoleEnum, InventoryItem
+from app.db.models import Location, ItemLocationStock, User, RoleEnum, InventoryItem
 from app.schemas.location import (
     LocationCreateIn, LocationOut, LocationUpdateIn,
     LocationPermissionCreateIn, LocationStockItemOut
 )
 from app.schemas.user import UserOut
-from app.core.dependencies import require_admin_access, require_company_access
+from app.core.dependencies import (
+    require_admin_access, require_company_access, get_current_role, get_company_role, is_admin_role,
+    conditional_list
+)
 from app.services.user_service import get_user_by_email
 
 
@@ -48,7 +51,8 @@ async def create_location(
 async def list_locations(
     company_id: int,
     db: AsyncSession = Depends(get_db),
-    _ = Depends(require_admin_access)
+    _ = Depends(require_admin_access),
+    __ = Depends(conditional_list("locations"))
 ):
     # Tento endpoint je v pořádku, protože používá selectinload
     stmt = select(Location).where(Location.company_id == company_id).options(selectinload(Location.authorized_users)).order_by(Location.name)
@@ -64,7 +68,8 @@ async def list_locations(
 async def get_my_accessible_locations(
     company_id: int,
     db: AsyncSession = Depends(get_db),
-    payload: dict = Depends(require_company_access)
+    payload: dict = Depends(require_company_access),
+    user_role: Optional[RoleEnum] = Depends(get_current_role)
 ):
     """
     Vrátí seznam skladových lokací na základě oprávnění přihlášeného uživatele.
@@ -73,18 +78,12 @@ async def get_my_accessible_locations(
     """
     user_id = int(payload.get("sub"))
 
-    # Zjistíme roli uživatele v dané firmě
-    role_stmt = select(Membership.role).where(
-        Membership.user_id == user_id,
-        Membership.company_id == company_id
-    )
-    user_role = (await db.execute(role_stmt)).scalar_one_or_none()
-
+    # Role uživatele v dané firmě (get_current_role, jednou na požadavek)
     if not user_role:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is not a member of this company.")
 
     # Administrátoři vidí vše
-    if user_role in [RoleEnum.owner, RoleEnum.admin]:
+    if is_admin_role(user_role):
         stmt = (
             select(Location)
             .where(Location.company_id == company_id)
@@ -117,7 +116,8 @@ async def get_location_inventory(
     company_id: int,
     location_id: int,
     db: AsyncSession = Depends(get_db),
-    payload: dict = Depends(require_company_access)
+    payload: dict = Depends(require_company_access),
+    user_role: Optional[RoleEnum] = Depends(get_current_role)
 ):
     """
     Vrátí seznam všech skladových položek, které se nacházejí na dané lokaci
@@ -130,13 +130,7 @@ async def get_location_inventory(
     # 1. Ověření oprávnění
     location = await get_location_or_404(db, company_id, location_id, with_users=True)
     
-    role_stmt = select(Membership.role).where(
-        Membership.user_id == user_id,
-        Membership.company_id == company_id
-    )
-    user_role = (await db.execute(role_stmt)).scalar_one_or_none()
-    
-    is_admin = user_role in [RoleEnum.owner, RoleEnum.admin]
+    is_admin = is_admin_role(user_role)
     is_authorized = any(user.id == user_id for user in location.authorized_users)
 
     if not is_admin and not is_authorized:
@@ -237,11 +231,7 @@ async def add_location_permission(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User with this email not found.")
 
-    membership_stmt = select(Membership).where(
-        Membership.company_id == company_id,
-        Membership.user_id == user.id
-    )
-    if not (await db.execute(membership_stmt)).scalar_one_or_none():
+    if await get_company_role(db, user.id, company_id) is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is not a member of this company.")
 
     if user in location.authorized_users:
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 import calendar
 from collections import defaultdict
@@ -17,7 +17,11 @@ from app.db.models import (
 from app.schemas.member import MemberOut, MemberUpdateIn, MonthlyHoursSummaryOut, HoursBreakdown, MemberCreateIn
 from app.schemas.task import AssignedTaskOut
 from app.services.user_service import get_user_by_email, create_user
-from app.core.dependencies import require_company_access, require_admin_access
+from app.services.refresh_token_service import revoke_user_refresh_tokens
+from app.core.dependencies import (
+    require_company_access, require_admin_access, get_current_role, is_admin_role, invalidate_company_role,
+    conditional_list
+)
 
 router = APIRouter(prefix="/companies/{company_id}/members", tags=["members"])
 
@@ -91,7 +95,8 @@ async def create_member(
 async def list_company_members(
     company_id: int, 
     db: AsyncSession = Depends(get_db), 
-    _=Depends(require_company_access)
+    _=Depends(require_company_access),
+    __=Depends(conditional_list("members"))
 ):
     stmt = select(Membership).where(Membership.company_id == company_id).options(selectinload(Membership.user))
     result = await db.execute(stmt)
@@ -106,6 +111,7 @@ async def update_member_role(
     member = await get_member_or_404(company_id, user_id, db)
     member.role = payload.role
     await db.commit()
+    invalidate_company_role(user_id, company_id)
     await db.refresh(member)
     return member
 
@@ -117,7 +123,10 @@ async def remove_member(
 ):
     member = await get_member_or_404(company_id, user_id, db)
     await db.delete(member)
+    # Odebraný člen si nesmí refresh tokenem obnovovat relaci; přihlásí se znovu (do ostatních firem)
+    await revoke_user_refresh_tokens(db, user_id)
     await db.commit()
+    invalidate_company_role(user_id, company_id)
 
 
 @router.get(
@@ -129,7 +138,8 @@ async def get_assigned_tasks_for_member(
     company_id: int,
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    payload: dict = Depends(require_company_access)
+    payload: dict = Depends(require_company_access),
+    requesting_role: Optional[RoleEnum] = Depends(get_current_role)
 ):
     """
     Vrátí seznam všech úkolů přiřazených danému uživateli (`user_id`).
@@ -144,12 +154,7 @@ async def get_assigned_tasks_for_member(
     # Autorizační logika
     if requesting_user_id != user_id:
         # Pokud se uživatel snaží zobrazit úkoly někoho jiného, ověříme, zda je admin
-        stmt_role = select(Membership.role).where(
-            Membership.user_id == requesting_user_id,
-            Membership.company_id == company_id
-        )
-        role = (await db.execute(stmt_role)).scalar_one_or_none()
-        if role not in [RoleEnum.owner, RoleEnum.admin]:
+        if not is_admin_role(requesting_role):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You can only view your own assigned tasks."
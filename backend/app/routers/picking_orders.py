@@ -17,6 +17,7 @@ from app.schemas.picking_order import (
     PickingOrderStatusUpdateIn
 )
 from app.core.dependencies import require_company_access
+from app.services.stock_events import publish_stock_change
 
 router = APIRouter(prefix="/companies/{company_id}/picking-orders", tags=["picking-orders"])
 
@@ -251,4 +252,5 @@ async def fulfill_picking_order(
     order.completed_at = datetime.now(timezone.utc)
     
     await db.commit()
+    publish_stock_change(company_id, [i.inventory_item_id for i in order.items if i.picked_quantity])
     return await get_picking_order_or_404(db, company_id, order.id)
\ No newline at end of file
@@ -2,7 +2,7 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, date
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -306,21 +306,33 @@ async def export_periodic_invoice_to_pohoda(
         raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
     
 from app.services.pohoda_connector import sync_clients_from_pohoda # Import nové služby
+from app.services.job_service import JobContext, register_job_handler, enqueue_job, job_accepted_response
 
 @router.post("/import/clients", summary="Synchronizace zákazníků z Pohody (mServer)")
 async def import_clients_from_pohoda(
     company_id: int,
+    background: bool = Query(False, description="Spustit synchronizaci na pozadí a hned vrátit job_id"),
     db: AsyncSession = Depends(get_db),
-    _=Depends(require_admin_access)
+    token=Depends(require_admin_access)
 ):
     """
     Připojí se k Pohoda mServeru, stáhne aktuální adresář a aktualizuje/vytvoří klienty v aplikaci.
     Vyžaduje nastavený mServer URL v nastavení firmy.
     """
+    if background:
+        job = await enqueue_job(db, company_id, int(token.get("sub")), "pohoda_client_sync")
+        return job_accepted_response(job)
     try:
         count = await sync_clients_from_pohoda(db, company_id)
         return {"status": "success", "message": f"Synchronizace dokončena. Zpracováno {count} klientů."}
     except ValueError as e:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Chyba synchronizace: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Chyba synchronizace: {str(e)}")
+
+async def _run_pohoda_client_sync_job(ctx: JobContext, db: AsyncSession):
+    """Handler úlohy 'pohoda_client_sync' (čistě I/O, běží v event loopu)."""
+    count = await sync_clients_from_pohoda(db, ctx.company_id)
+    return {"status": "success", "count": count, "message": f"Synchronizace dokončena. Zpracováno {count} klientů."}
+
+register_job_handler("pohoda_client_sync", _run_pohoda_client_sync_job)
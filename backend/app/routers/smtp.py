@@ -7,7 +7,7 @@ from app.db.models import CompanySmtpSettings
 from app.schemas.smtp import SmtpSettingsIn, SmtpSettingsOut, SmtpTestIn
 from app.core.dependencies import require_admin_access
 from app.services.encryption_service import encrypt_data
-from app.services.email_service import send_email_async
+from app.services.email_service import send_email_async, invalidate_smtp_settings
 from typing import Dict, Any
 
 router = APIRouter(prefix="/companies/{company_id}/smtp-settings", tags=["smtp"])
@@ -55,6 +55,7 @@ async def create_or_update_smtp_settings(
 
     await db.commit()
     await db.refresh(settings)
+    await invalidate_smtp_settings(company_id)
 
     return SmtpSettingsOut(
         **settings.__dict__,
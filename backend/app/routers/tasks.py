@@ -2,14 +2,14 @@
 from typing import Dict, Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.db.database import get_db
 from app.db.models import (
     Task, UsedInventoryItem, InventoryItem, WorkOrder, Membership,
     InventoryAuditLog, AuditLogAction, ItemLocationStock, Location,
-    TimeLog, TimeLogEntryType
+    TimeLog
 )
 from app.schemas.task import (
     TaskCreateIn, TaskOut, UsedItemCreateIn, TaskUpdateIn,
@@ -19,6 +19,8 @@ from app.schemas.task import (
 from app.schemas.time_log import TimeLogOut
 from app.core.dependencies import require_company_access
 from app.routers.inventory import get_full_inventory_item
+from app.services.stock_events import publish_stock_change
+from app.services.hours_rollup_service import get_task_hours
 
 router = APIRouter(prefix="/companies/{company_id}/work-orders/{work_order_id}/tasks", tags=["tasks"])
 
@@ -163,6 +165,7 @@ async def use_inventory_for_task(
     db.add(log_entry)
 
     await db.commit()
+    publish_stock_change(company_id, [payload.inventory_item_id])
     return await get_full_task_or_404(work_order_id, task_id, db)
 
 @router.post(
@@ -232,18 +235,8 @@ async def get_task_total_hours(
     _ = Depends(require_company_access)
 ):
     await get_full_task_or_404(work_order_id, task_id, db)
-    total_seconds_expr = func.timestampdiff(text('SECOND'), TimeLog.start_time, TimeLog.end_time)
-    total_break_seconds_expr = TimeLog.break_duration_minutes * 60
-    stmt = (
-        select(func.sum(total_seconds_expr - total_break_seconds_expr))
-        .where(
-            TimeLog.task_id == task_id,
-            TimeLog.entry_type == TimeLogEntryType.WORK
-        )
-    )
-    result_from_db = (await db.execute(stmt)).scalar_one_or_none()
-    total_seconds = float(result_from_db or 0)
-    total_hours = round(total_seconds / 3600.0, 2)
+    # Průběžné součty z time_log_rollups (odpracovaný čas bez pauz)
+    total_hours = round(await get_task_hours(db, task_id), 2)
     return TaskTotalHoursOut(task_id=task_id, total_hours=total_hours)
 
 @router.get(
@@ -367,6 +360,7 @@ async def remove_used_inventory_from_task(
     await db.delete(used_item_record)
     
     await db.commit()
+    publish_stock_change(company_id, [item.id])
     return await get_full_task_or_404(work_order_id, task_id, db)
 
 # ... (update_used_inventory_quantity zůstává beze změny) ...
@@ -446,4 +440,5 @@ async def update_used_inventory_quantity(
     db.add(log_entry)
     
     await db.commit()
+    publish_stock_change(company_id, [used_item_record.inventory_item_id])
     return await get_full_task_or_404(work_order_id, task_id, db)
\ No newline at end of file
@@ -11,6 +11,7 @@ from app.schemas.time_log import TimeLogCreateIn, TimeLogOut, TimeLogUpdateIn, T
 from app.routers.members import require_admin_access
 from app.core.dependencies import require_company_access
 from app.services.timesheet_service import upsert_timelog
+from app.services.hours_rollup_service import HoursRollupDelta
 
 from app.schemas.time_log import ServiceReportDataOut
 from app.schemas.work_order import WorkOrderOut
@@ -96,12 +97,14 @@ async def update_time_log(
     if log_to_update.status != TimeLogStatus.pending:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cannot edit a log that has already been processed.")
     
+    rollup = HoursRollupDelta()
+    rollup.remove(log_to_update)
     await db.delete(log_to_update)
     await db.flush()
 
     try:
         create_payload = TimeLogCreateIn(**payload.dict())
-        updated_log = await upsert_timelog(db, user_id, company_id, create_payload)
+        updated_log = await upsert_timelog(db, user_id, company_id, create_payload, rollup)
         await db.commit()
     except ValueError as e:
         await db.rollback()
@@ -135,7 +138,10 @@ async def delete_time_log(
     if log.status != TimeLogStatus.pending:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Cannot delete a log that has already been processed.")
 
+    rollup = HoursRollupDelta()
+    rollup.remove(log)
     await db.delete(log)
+    await rollup.apply(db)
     await db.commit()
 
 @router.get(
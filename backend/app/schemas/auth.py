@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, EmailStr
 
 class LoginIn(BaseModel):
@@ -7,3 +8,8 @@ class LoginIn(BaseModel):
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # platnost access tokenu v sekundách
+
+class RefreshIn(BaseModel):
+    refresh_token: str
@@ -1,6 +1,6 @@
 # app/schemas/inventory.py
 from pydantic import BaseModel, ConfigDict, computed_field, field_validator
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from .category import CategoryOut, CategorySimpleOut
 from .location import LocationOut
 from .partners import ManufacturerOut, SupplierOut
@@ -65,6 +65,29 @@ class InventoryItemOut(InventoryItemBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class InventoryPageOut(BaseModel):
+    """Jedna stránka odlehčeného výpisu skladu (keyset stránkování).
+
+    `items` obsahují jen pole vyžádaná parametrem `fields`, `next_cursor`
+    je ID poslední vrácené položky (None = žádná další stránka).
+    """
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
+
+
+class InventoryChangesOut(BaseModel):
+    """Změny skladu od kurzoru `since` (delta synchronizace).
+
+    `items` jsou nové a změněné položky, `deleted_ids` smazané. Při `full` = True
+    obsahuje `items` celý sklad a klient má svou kopii nahradit. `cursor` se pošle
+    jako `since` v dalším požadavku.
+    """
+    cursor: str
+    full: bool
+    items: List[InventoryItemOut]
+    deleted_ids: List[int] = []
+
+
 class PlaceStockIn(BaseModel):
     inventory_item_id: int
     location_id: int
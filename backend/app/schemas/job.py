@@ -0,0 +1,20 @@
+# app/schemas/job.py
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Any
+from datetime import datetime
+from app.db.models import JobStatus
+
+class JobOut(BaseModel):
+    """Stav úlohy na pozadí. Soubor s výsledkem se stahuje přes /jobs/{id}/result."""
+    id: int
+    job_type: str
+    status: JobStatus
+    progress: int
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    result_filename: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
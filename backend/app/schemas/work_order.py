@@ -64,4 +64,10 @@ class BillingReportOut(BaseModel):
     total_price_inventory: float
     grand_total: float
     time_logs: List[BillingReportTimeLogOut]
-    used_items: List[BillingReportUsedItemOut]
\ No newline at end of file
+    used_items: List[BillingReportUsedItemOut]
+
+class WorkOrderTotalHoursOut(BaseModel):
+    """Odpracované hodiny na zakázce (z průběžných součtů, bez pauz)."""
+    work_order_id: int
+    total_hours: float
+    budget_hours: Optional[float] = None
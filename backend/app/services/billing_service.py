@@ -0,0 +1,194 @@
+# backend/app/services/billing_service.py
+"""
+Společný výpočet fakturačních podkladů pro zakázku i klienta.
+
+Délky záznamů, sazby, marže a součty se počítají v SQL, Python jen skládá výstupní řádky.
+Marže položky: nejvyšší z (globální marže klienta, marže nejbližšího předka každé kategorie položky).
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, cast, extract, literal, Float, Select
+
+from app.db.models import (
+    TimeLog, TimeLogEntryType, Task, WorkOrder, WorkType, User, UsedInventoryItem, InventoryItem,
+    ClientCategoryMargin, InventoryCategoryClosure, item_category_association
+)
+from app.schemas.shared import BillingReportTimeLogOut, BillingReportUsedItemOut
+
+
+@dataclass
+class BillingLines:
+    """Řádky a nezaokrouhlené součty reportu."""
+    time_logs: List[BillingReportTimeLogOut] = field(default_factory=list)
+    used_items: List[BillingReportUsedItemOut] = field(default_factory=list)
+    total_hours: float = 0.0
+    total_price_work: float = 0.0
+    total_price_inventory: float = 0.0
+
+
+def _scope(stmt: Select, company_id: int, work_order_id: Optional[int], client_id: Optional[int]) -> Select:
+    """Omezí dotaz (obsahující Task) na jednu zakázku, nebo na všechny zakázky klienta."""
+    if work_order_id is not None:
+        stmt = stmt.where(Task.work_order_id == work_order_id)
+    if client_id is not None:
+        stmt = stmt.join(WorkOrder, Task.work_order_id == WorkOrder.id).where(
+            WorkOrder.client_id == client_id, WorkOrder.company_id == company_id
+        )
+    return stmt
+
+
+def _date_range(stmt: Select, column, start_date: Optional[date], end_date: Optional[date]) -> Select:
+    if start_date:
+        stmt = stmt.where(func.date(column) >= start_date)
+    if end_date:
+        stmt = stmt.where(func.date(column) <= end_date)
+    return stmt
+
+
+async def _time_log_lines(db: AsyncSession, lines: BillingLines, company_id: int,
+                          work_order_id: Optional[int], client_id: Optional[int],
+                          start_date: Optional[date], end_date: Optional[date]) -> None:
+    hours = cast(extract("epoch", TimeLog.end_time - TimeLog.start_time), Float) / 3600.0
+    rate = func.coalesce(WorkType.rate, 0.0)
+    price = hours * rate
+
+    stmt = (
+        select(
+            TimeLog.start_time,
+            hours.label("hours"),
+            rate.label("rate"),
+            price.label("price"),
+            WorkType.name.label("work_type_name"),
+            User.email.label("user_email"),
+            Task.name.label("task_name"),
+            # Součty celého reportu jako window funkce – bez druhého průchodu tabulkou
+            func.sum(hours).over().label("sum_hours"),
+            func.sum(price).over().label("sum_price"),
+        )
+        .select_from(TimeLog)
+        .join(Task, TimeLog.task_id == Task.id)
+        .outerjoin(WorkType, TimeLog.work_type_id == WorkType.id)
+        .outerjoin(User, TimeLog.user_id == User.id)
+        .where(TimeLog.entry_type == TimeLogEntryType.WORK)
+    )
+    stmt = _scope(stmt, company_id, work_order_id, client_id)
+    stmt = _date_range(stmt, TimeLog.start_time, start_date, end_date).order_by(TimeLog.start_time)
+
+    for row in (await db.execute(stmt)).all():
+        lines.time_logs.append(BillingReportTimeLogOut(
+            work_date=row.start_time.date(),
+            hours=round(row.hours, 2),
+            rate=row.rate,
+            total_price=round(row.price, 2),
+            work_type_name=row.work_type_name or "N/A",
+            user_email=row.user_email or "N/A",
+            task_name=row.task_name or "N/A"
+        ))
+        lines.total_hours, lines.total_price_work = row.sum_hours, row.sum_price
+
+
+async def _used_item_lines(db: AsyncSession, lines: BillingLines, company_id: int,
+                           work_order_id: Optional[int], client_id: Optional[int],
+                           margin_client_id: Optional[int], global_margin: float,
+                           start_date: Optional[date], end_date: Optional[date]) -> None:
+    # ID položek použitých v rozsahu reportu (omezuje výpočet marží jen na ně)
+    used_item_ids = _date_range(
+        _scope(
+            select(UsedInventoryItem.inventory_item_id).join(Task, UsedInventoryItem.task_id == Task.id),
+            company_id, work_order_id, client_id
+        ),
+        UsedInventoryItem.log_date, start_date, end_date
+    )
+
+    global_margin_expr = literal(global_margin, Float)
+    margin = global_margin_expr
+    item_margin = None
+    if margin_client_id is not None:
+        # Marže nejbližšího předka (včetně sebe) pro každou kategorii – closure tabulka seřazená dle hloubky
+        nearest = (
+            select(
+                InventoryCategoryClosure.descendant_id.label("category_id"),
+                ClientCategoryMargin.margin_percentage.label("margin")
+            )
+            .join(ClientCategoryMargin, ClientCategoryMargin.category_id == InventoryCategoryClosure.ancestor_id)
+            .where(ClientCategoryMargin.client_id == margin_client_id)
+            .distinct(InventoryCategoryClosure.descendant_id)
+            .order_by(InventoryCategoryClosure.descendant_id, InventoryCategoryClosure.depth)
+            .cte("nearest_margin")
+        )
+        # Položka ve více kategoriích: nejvyšší z nalezených marží
+        item_margin = (
+            select(item_category_association.c.item_id, func.max(nearest.c.margin).label("margin"))
+            .join(nearest, nearest.c.category_id == item_category_association.c.category_id)
+            .where(item_category_association.c.item_id.in_(used_item_ids))
+            .group_by(item_category_association.c.item_id)
+            .cte("item_margin")
+        )
+        margin = func.greatest(global_margin_expr, func.coalesce(item_margin.c.margin, global_margin_expr))
+
+    unit_cost = func.coalesce(InventoryItem.price, 0.0)
+    unit_price_sold = unit_cost * (1.0 + margin / 100.0)
+    # Pořadí (cena * marže) * množství dává v plovoucí čárce stejný výsledek jako dřívější výpočet v Pythonu
+    line_total = unit_price_sold * UsedInventoryItem.quantity
+
+    stmt = (
+        select(
+            InventoryItem.name.label("item_name"),
+            InventoryItem.sku.label("sku"),
+            UsedInventoryItem.quantity,
+            unit_cost.label("unit_cost"),
+            margin.label("margin"),
+            unit_price_sold.label("unit_price_sold"),
+            line_total.label("line_total"),
+            Task.name.label("task_name"),
+            func.sum(line_total).over().label("sum_total"),
+        )
+        .select_from(UsedInventoryItem)
+        .join(Task, UsedInventoryItem.task_id == Task.id)
+        .outerjoin(InventoryItem, UsedInventoryItem.inventory_item_id == InventoryItem.id)
+    )
+    if item_margin is not None:
+        stmt = stmt.outerjoin(item_margin, item_margin.c.item_id == UsedInventoryItem.inventory_item_id)
+    stmt = _scope(stmt, company_id, work_order_id, client_id)
+    stmt = _date_range(stmt, UsedInventoryItem.log_date, start_date, end_date).order_by(UsedInventoryItem.log_date)
+
+    for row in (await db.execute(stmt)).all():
+        lines.used_items.append(BillingReportUsedItemOut(
+            item_name=row.item_name or "N/A",
+            sku=row.sku or "N/A",
+            quantity=row.quantity,
+            unit_cost=round(row.unit_cost, 2),
+            margin_applied=round(row.margin, 2),
+            unit_price_sold=round(row.unit_price_sold, 2),
+            total_price=round(row.line_total, 2),
+            task_name=row.task_name or "N/A"
+        ))
+        lines.total_price_inventory = row.sum_total
+
+
+async def compute_billing_lines(
+    db: AsyncSession,
+    company_id: int,
+    *,
+    work_order_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    margin_client_id: Optional[int] = None,
+    global_margin: Optional[float] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> BillingLines:
+    """
+    Spočítá řádky práce a materiálu pro jednu zakázku (work_order_id) nebo pro všechny
+    zakázky klienta (client_id). Marže se berou z margin_client_id (None = bez marží).
+    """
+    lines = BillingLines()
+    await _time_log_lines(db, lines, company_id, work_order_id, client_id, start_date, end_date)
+    await _used_item_lines(
+        db, lines, company_id, work_order_id, client_id,
+        margin_client_id, global_margin if global_margin is not None else 0.0,
+        start_date, end_date
+    )
+    return lines
@@ -0,0 +1,114 @@
+# backend/app/services/cache_service.py
+"""
+In-process cache pro často čtená a zřídka měněná data (strom kategorií, marže klientů).
+
+Cache je per proces (per uvicorn worker). Zápisové endpointy volají invalidate_* funkce
+po commitu; TTL omezuje zastarání dat v ostatních workerech.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import InventoryCategory, ClientCategoryMargin
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU cache s omezenou velikostí a dobou platnosti záznamů."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass(frozen=True)
+class CategorySnapshot:
+    """Plochý seznam kategorií firmy. Hodnoty neměnit."""
+    rows: List[Dict[str, Any]]
+    version: Optional[str] = None
+
+
+# Klíč: company_id
+_category_cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+# Klíč: (company_id, client_id)
+_client_margin_cache = TTLCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+
+async def get_company_categories(db: AsyncSession, company_id: int, version: Optional[str] = None) -> CategorySnapshot:
+    """
+    Vrátí kategorie firmy z cache, případně je jedním dotazem načte. S verzí dat
+    (ETag výpisu z list_version_service) se snapshot jiné verze načte znovu, takže
+    změnu provedenou v jiném workeru nezakryje TTL.
+    """
+    snapshot = _category_cache.get(company_id)
+    if snapshot is None or (version is not None and snapshot.version != version):
+        stmt = (
+            select(InventoryCategory.id, InventoryCategory.name, InventoryCategory.parent_id)
+            .where(InventoryCategory.company_id == company_id)
+            .order_by(InventoryCategory.id)
+        )
+        rows = [dict(r) for r in (await db.execute(stmt)).mappings().all()]
+        snapshot = CategorySnapshot(rows=rows, version=version)
+        _category_cache.set(company_id, snapshot)
+    return snapshot
+
+
+async def get_client_margins(db: AsyncSession, company_id: int, client_id: int) -> Dict[int, float]:
+    """Vrátí specifické marže klienta {category_id: margin_percentage} z cache. Hodnoty neměnit."""
+    key = (company_id, client_id)
+    margins = _client_margin_cache.get(key)
+    if margins is None:
+        stmt = select(ClientCategoryMargin.category_id, ClientCategoryMargin.margin_percentage).where(
+            ClientCategoryMargin.client_id == client_id
+        )
+        margins = {category_id: margin for category_id, margin in (await db.execute(stmt)).all()}
+        _client_margin_cache.set(key, margins)
+    return margins
+
+
+def invalidate_company_categories(company_id: int) -> None:
+    """Volat po každé změně stromu kategorií firmy (smazání kategorie maže i marže klientů)."""
+    _category_cache.invalidate(company_id)
+    _client_margin_cache.invalidate_where(lambda key: key[0] == company_id)
+
+
+def invalidate_client_margins(company_id: int, client_id: int) -> None:
+    """Volat po změně nebo smazání specifických marží klienta."""
+    _client_margin_cache.invalidate((company_id, client_id))
@@ -0,0 +1,120 @@
+# backend/app/services/category_tree_service.py
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, delete, func, literal, true, Select
+from sqlalchemy.orm import aliased
+
+from app.db.models import InventoryCategory, InventoryCategoryClosure, item_category_association
+
+Closure = InventoryCategoryClosure
+
+
+async def insert_category_node(db: AsyncSession, category_id: int, parent_id: Optional[int]) -> None:
+    """
+    Zapíše novou (listovou) kategorii do closure tabulky.
+    Volat po flush(), aby kategorie už měla ID.
+    """
+    await db.execute(insert(Closure).values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+    if parent_id is not None:
+        # Všichni předci rodiče (včetně rodiče samotného) jsou i předky nové kategorie
+        await db.execute(
+            insert(Closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(Closure.ancestor_id, literal(category_id), Closure.depth + 1)
+                .where(Closure.descendant_id == parent_id)
+            )
+        )
+
+
+async def move_category_node(db: AsyncSession, category_id: int, new_parent_id: Optional[int]) -> None:
+    """
+    Přepojí celý podstrom kategorie pod nového rodiče (None = kořen).
+    Volající musí předem ověřit, že nový rodič neleží v podstromu (viz is_in_subtree).
+    """
+    subtree = select(Closure.descendant_id).where(Closure.ancestor_id == category_id)
+
+    # 1. Odpojení podstromu od všech dosavadních předků mimo podstrom
+    await db.execute(
+        delete(Closure).where(
+            Closure.descendant_id.in_(subtree),
+            Closure.ancestor_id.not_in(subtree)
+        )
+    )
+    if new_parent_id is None:
+        return
+
+    # 2. Kartézský součin: předci nového rodiče x uzly podstromu
+    ancestors = aliased(Closure)
+    descendants = aliased(Closure)
+    await db.execute(
+        insert(Closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                ancestors.ancestor_id,
+                descendants.descendant_id,
+                ancestors.depth + descendants.depth + 1
+            )
+            .select_from(ancestors)
+            .join(descendants, true())
+            .where(ancestors.descendant_id == new_parent_id, descendants.ancestor_id == category_id)
+        )
+    )
+
+
+async def is_in_subtree(db: AsyncSession, root_id: int, category_id: int) -> bool:
+    """Vrátí True, pokud je category_id root_id nebo jeho potomek."""
+    stmt = select(Closure.depth).where(Closure.ancestor_id == root_id, Closure.descendant_id == category_id)
+    return (await db.execute(stmt)).first() is not None
+
+
+def subtree_item_ids_select(category_id: int) -> Select:
+    """Poddotaz s ID položek zařazených do kategorie nebo kterékoli z jejích podkategorií."""
+    return (
+        select(item_category_association.c.item_id)
+        .join(Closure, Closure.descendant_id == item_category_association.c.category_id)
+        .where(Closure.ancestor_id == category_id)
+    )
+
+
+async def rebuild_category_closure(db: AsyncSession) -> None:
+    """Kompletně přestaví closure tabulku z parent_id (rekurzivní CTE). Necommituje."""
+    tree = (
+        select(
+            InventoryCategory.id.label("ancestor_id"),
+            InventoryCategory.id.label("descendant_id"),
+            literal(0).label("depth")
+        )
+        .cte("category_tree", recursive=True)
+    )
+    child = aliased(InventoryCategory)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.id, tree.c.depth + 1)
+        .join(child, child.parent_id == tree.c.descendant_id)
+    )
+    await db.execute(delete(Closure))
+    await db.execute(
+        insert(Closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth)
+        )
+    )
+
+
+async def ensure_category_closure(db: AsyncSession) -> bool:
+    """
+    Při startu ověří, že každá kategorie má v closure tabulce řádek sama na sebe.
+    Pokud ne (nová instalace tabulky, ruční zásah do DB), tabulku přestaví. Vrací True při přestavbě.
+    """
+    missing_stmt = (
+        select(func.count())
+        .select_from(InventoryCategory)
+        .where(~select(Closure.ancestor_id).where(
+            Closure.ancestor_id == InventoryCategory.id,
+            Closure.descendant_id == InventoryCategory.id
+        ).exists())
+    )
+    if not (await db.execute(missing_stmt)).scalar():
+        return False
+    await rebuild_category_closure(db)
+    await db.commit()
+    return True
@@ -1,79 +1,228 @@
 # backend/app/services/email_service.py
-import aiosmtplib
+"""
+Odesílání e-mailů přes SMTP server firmy.
+
+Transakční e-maily (pozvánky, alerty) se neposílají přímo, ale přes frontu
+v outbox_service; tady je jen samotné doručení. Nastavení SMTP (včetně dešifrovaného
+hesla) se drží v in-process cache a router smtp ho po změně invaliduje. Pro každou
+firmu existuje malý pool přihlášených spojení aiosmtplib, takže dávka zpráv jde jedním
+spojením a přechodné chyby (odpojení, timeout, odpověď 4xx) se opakují s exponenciálním čekáním.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
 from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+import aiosmtplib
 from sqlalchemy.ext.asyncio import AsyncSession
-import logging
 
+from app.core.config import settings as app_settings
 from app.db.models import CompanySmtpSettings, SecurityProtocolEnum
+from app.services.cache_service import TTLCache
 from app.services.encryption_service import decrypt_data
 
 logger = logging.getLogger(__name__)
 
-async def send_email_async(
-    db: AsyncSession,
-    company_id: int,
-    recipient: str,
-    subject: str,
-    body: str,
-):
-    """
-    Nízkoúrovňová funkce pro odeslání e-mailu pomocí nastavení dané firmy.
-    """
-    settings = await db.get(CompanySmtpSettings, company_id)
-    if not settings or not settings.is_enabled:
-        logger.warning(f"Attempted to send email for company {company_id}, but SMTP is disabled or not configured.")
-        return
+EmailTuple = Tuple[str, str, str]  # (recipient, subject, body)
 
-    password = decrypt_data(settings.encrypted_password)
-    if not password:
-        logger.error(f"SMTP password for company {company_id} could not be decrypted.")
-        raise ValueError("SMTP password decryption failed.")
 
+@dataclass(frozen=True)
+class SmtpConfig:
+    """Načtené a dešifrované nastavení SMTP firmy. Hodnoty neměnit."""
+    company_id: int
+    is_enabled: bool
+    host: str
+    port: int
+    username: str
+    password: Optional[str]
+    sender_email: str
+    use_tls: bool
+    start_tls: bool
+    notification_settings: Dict[str, bool] = field(default_factory=dict, compare=False)
+
+
+# Klíč: company_id
+_smtp_cache = TTLCache(app_settings.CACHE_MAX_ENTRIES, app_settings.CACHE_TTL_SECONDS)
+
+
+async def get_smtp_config(db: AsyncSession, company_id: int) -> Optional[SmtpConfig]:
+    """Vrátí nastavení SMTP firmy z cache, případně ho načte a dešifruje heslo."""
+    config = _smtp_cache.get(company_id)
+    if config is None:
+        settings = await db.get(CompanySmtpSettings, company_id)
+        if not settings:
+            return None
+        password = decrypt_data(settings.encrypted_password)
+        if not password:
+            logger.error(f"SMTP password for company {company_id} could not be decrypted.")
+        config = SmtpConfig(
+            company_id=company_id,
+            is_enabled=settings.is_enabled,
+            host=settings.smtp_host,
+            port=settings.smtp_port,
+            username=settings.smtp_user,
+            password=password,
+            sender_email=settings.sender_email,
+            # use_tls = implicitní SSL (typicky port 465), start_tls = STARTTLS (typicky port 587)
+            use_tls=settings.security_protocol == SecurityProtocolEnum.SSL,
+            start_tls=settings.security_protocol == SecurityProtocolEnum.TLS,
+            notification_settings=dict(settings.notification_settings or {}),
+        )
+        _smtp_cache.set(company_id, config)
+    return config
+
+
+async def invalidate_smtp_settings(company_id: int) -> None:
+    """Volat po změně nastavení SMTP firmy; zavře i spojení otevřená se starým nastavením."""
+    _smtp_cache.invalidate(company_id)
+    pool = _pools.pop(company_id, None)
+    if pool:
+        await pool.close()
+
+
+# --- Pool spojení ---
+
+async def _close_client(client: aiosmtplib.SMTP) -> None:
+    try:
+        if client.is_connected:
+            await client.quit()
+    except Exception:
+        client.close()
+
+
+class _SmtpPool:
+    """Nečinná přihlášená spojení jedné firmy (nejvýše SMTP_POOL_SIZE)."""
+
+    def __init__(self, config: SmtpConfig):
+        self.config = config
+        self._idle: List[Tuple[float, aiosmtplib.SMTP]] = []
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            last_used, client = self._idle.pop()
+            if client.is_connected and time.monotonic() - last_used < app_settings.SMTP_POOL_IDLE_SECONDS:
+                return client
+            await _close_client(client)
+        client = aiosmtplib.SMTP(
+            hostname=self.config.host,
+            port=self.config.port,
+            username=self.config.username,
+            password=self.config.password,
+            use_tls=self.config.use_tls,
+            start_tls=self.config.start_tls,
+        )
+        await client.connect()  # connect() s username/password rovnou přihlásí
+        return client
+
+    async def release(self, client: aiosmtplib.SMTP, healthy: bool = True) -> None:
+        if healthy and client.is_connected and len(self._idle) < app_settings.SMTP_POOL_SIZE:
+            self._idle.append((time.monotonic(), client))
+        else:
+            await _close_client(client)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, client in idle:
+            await _close_client(client)
+
+
+_pools: Dict[int, _SmtpPool] = {}
+
+
+async def _get_pool(config: SmtpConfig) -> _SmtpPool:
+    pool = _pools.get(config.company_id)
+    if pool is None or pool.config != config:
+        # Nastavení se změnilo (např. v jiném workeru) – stará spojení zahodíme
+        if pool is not None:
+            await pool.close()
+        pool = _pools[config.company_id] = _SmtpPool(config)
+    return pool
+
+
+async def close_smtp_pools() -> None:
+    """Zavře všechna nečinná spojení (volá se při vypnutí aplikace)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        await pool.close()
+
+
+def _is_transient(error: Exception) -> bool:
+    """Chyby, u kterých má smysl zkusit zprávu odeslat znovu novým spojením."""
+    if isinstance(error, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError,
+                          aiosmtplib.SMTPTimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, aiosmtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return False
+
+
+def _build_message(config: SmtpConfig, recipient: str, subject: str, body: str) -> EmailMessage:
     message = EmailMessage()
-    message["From"] = settings.sender_email
+    message["From"] = config.sender_email
     message["To"] = recipient
     message["Subject"] = subject
     message.set_content(body)
+    return message
+
+
+async def send_batch(config: SmtpConfig, messages: List[EmailTuple]) -> Dict[int, Exception]:
+    """
+    Odešle zprávy jedním spojením z poolu. Přechodné chyby opakuje (SMTP_SEND_RETRIES)
+    s exponenciálním čekáním a novým spojením. Vrací {index zprávy: chyba} neodeslaných zpráv.
+    """
+    if not config.password:
+        raise ValueError("SMTP password decryption failed.")
 
-    # --- OPRAVENÁ LOGIKA ---
-    # use_tls se použije pro implicitní SSL (typicky port 465)
-    use_tls = settings.security_protocol == SecurityProtocolEnum.SSL
-    # start_tls se použije pro explicitní STARTTLS (typicky port 587)
-    start_tls = settings.security_protocol == SecurityProtocolEnum.TLS
-    
-    # Protokol "none" nebude mít ani jedno nastaveno na True
-    
-    await aiosmtplib.send(
-        message,
-        hostname=settings.smtp_host,
-        port=settings.smtp_port,
-        username=settings.smtp_user,
-        password=password,
-        use_tls=use_tls,
-        start_tls=start_tls
-    )
-    # --- KONEC OPRAVENÉ LOGIKY ---
-
-async def send_transactional_email(
+    pool = await _get_pool(config)
+    retries = app_settings.SMTP_SEND_RETRIES
+    failures: Dict[int, Exception] = {}
+    client: Optional[aiosmtplib.SMTP] = None
+    try:
+        for index, (recipient, subject, body) in enumerate(messages):
+            message = _build_message(config, recipient, subject, body)
+            for attempt in range(retries + 1):
+                try:
+                    if client is None:
+                        client = await pool.acquire()
+                    await client.send_message(message)
+                    break
+                except Exception as e:
+                    # Po chybě spojení nevracíme do poolu, další pokus/zpráva otevře nové
+                    if client is not None:
+                        await pool.release(client, healthy=False)
+                        client = None
+                    if not _is_transient(e) or attempt == retries:
+                        failures[index] = e
+                        break
+                    delay = app_settings.SMTP_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                    logger.warning(f"SMTP error for company {config.company_id} ({e}), retrying in {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+    finally:
+        if client is not None:
+            await pool.release(client)
+    return failures
+
+
+async def send_email_async(
     db: AsyncSession,
     company_id: int,
-    notification_type: str, # např. "on_invite_created"
     recipient: str,
     subject: str,
     body: str,
 ):
     """
-    Vysokoúrovňová funkce, která nejprve ověří, zda má firma daný typ notifikace povolený.
+    Nízkoúrovňová funkce pro odeslání e-mailu pomocí nastavení dané firmy.
+    Při neúspěchu vyhodí výjimku (používá ji např. testovací e-mail).
     """
-    settings = await db.get(CompanySmtpSettings, company_id)
-    if not settings or not settings.is_enabled:
-        return # SMTP je vypnuto, nic neodesíláme
-
-    if settings.notification_settings.get(notification_type, False):
-        try:
-            await send_email_async(db, company_id, recipient, subject, body)
-            logger.info(f"Email '{notification_type}' sent to {recipient} for company {company_id}.")
-        except Exception as e:
-            logger.error(f"Failed to send email '{notification_type}' for company {company_id}: {e}")
-    else:
-        logger.info(f"Skipping email '{notification_type}' for company {company_id} as it is disabled in settings.")
\ No newline at end of file
+    config = await get_smtp_config(db, company_id)
+    if not config or not config.is_enabled:
+        logger.warning(f"Attempted to send email for company {company_id}, but SMTP is disabled or not configured.")
+        return
+    failures = await send_batch(config, [(recipient, subject, body)])
+    if failures:
+        raise failures[0]
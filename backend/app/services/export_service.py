@@ -0,0 +1,85 @@
+# backend/app/services/export_service.py
+"""
+Streamovaný export velkých tabulek (NDJSON / CSV) s konstantní spotřebou paměti.
+
+Řádky se čtou server-side kurzorem (session.stream + yield_per) a posílají se po dávkách.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.db.database import async_session_factory
+
+EXPORT_BATCH_ROWS = 1000
+EXPORT_FORMAT_PATTERN = "^(ndjson|csv)$"
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _plain(value: Any) -> Any:
+    """Převede hodnotu z DB na typ serializovatelný do JSON/CSV."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def stream_rows(stmt: Select) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iteruje výsledky dotazu přes server-side kurzor.
+    Používá vlastní session: session ze závislosti get_db se uzavře dřív,
+    než StreamingResponse začne odesílat tělo odpovědi.
+    """
+    async with async_session_factory() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        async for row in result.mappings():
+            yield {key: _plain(value) for key, value in row.items()}
+
+
+async def _ndjson_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    batch: List[str] = []
+    async for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False))
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+async def _csv_chunks(columns: List[str], rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    # BOM, aby Excel soubor otevřel v UTF-8
+    buffer.write("\ufeff")
+    writer.writeheader()
+    count = 0
+    async for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def export_response(stmt: Select, columns: List[str], fmt: str, filename: str) -> StreamingResponse:
+    """Vrátí StreamingResponse s výsledkem dotazu ve formátu 'ndjson' nebo 'csv'."""
+    rows = stream_rows(stmt)
+    body = _csv_chunks(columns, rows) if fmt == "csv" else _ndjson_chunks(rows)
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
@@ -0,0 +1,152 @@
+# backend/app/services/hours_rollup_service.py
+"""
+Průběžně udržované součty odpracovaných hodin (tabulka time_log_rollups).
+
+Každá změna time_logs (upsert_timelog, úprava a smazání záznamu) zapíše do HoursRollupDelta
+odebrané a přidané záznamy a apply() je v téže transakci přičte k součtům. Dotaz na hodiny
+úkolu nebo zakázky pak čte jen pár agregovaných řádků. Při nesouladu (ruční zásah do DB)
+tabulku přestaví rebuild_hours_rollup().
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, cast, extract, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import TimeLog, TimeLogRollup, TimeLogEntryType, Task, WorkOrder
+
+RollupKey = Tuple[int, TimeLogEntryType, Optional[int]]
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class HoursRollupDelta:
+    """Změny součtů nasbírané během jedné transakce (klíč: úkol, typ záznamu, druh práce)."""
+
+    def __init__(self):
+        self._deltas: Dict[RollupKey, List[float]] = {}
+
+    def add(self, log: TimeLog, sign: int = 1) -> None:
+        """Přičte záznam (sign=-1 odečte). Záznamy bez úkolu (dovolená, nemoc) se nesčítají."""
+        if log.task_id is None:
+            return
+        seconds = (_as_utc(log.end_time) - _as_utc(log.start_time)).total_seconds()
+        delta = self._deltas.setdefault((log.task_id, log.entry_type, log.work_type_id), [0.0, 0, 0])
+        delta[0] += sign * seconds
+        delta[1] += sign * (log.break_duration_minutes or 0)
+        delta[2] += sign
+
+    def remove(self, log: TimeLog) -> None:
+        self.add(log, sign=-1)
+
+    async def apply(self, db: AsyncSession) -> None:
+        """Zapíše změny jedním upsertem. Necommituje."""
+        deltas = {key: d for key, d in self._deltas.items() if any(d)}
+        self._deltas.clear()
+        if not deltas:
+            return
+        task_ids = {task_id for task_id, _, _ in deltas}
+        work_orders = dict((await db.execute(
+            select(Task.id, Task.work_order_id).where(Task.id.in_(task_ids))
+        )).all())
+
+        rows = [
+            {
+                "task_id": task_id, "work_order_id": work_orders[task_id],
+                "entry_type": entry_type, "work_type_id": work_type_id,
+                "total_seconds": seconds, "break_minutes": break_minutes, "log_count": count,
+            }
+            for (task_id, entry_type, work_type_id), (seconds, break_minutes, count) in deltas.items()
+            if task_id in work_orders
+        ]
+        if not rows:
+            return
+        stmt = pg_insert(TimeLogRollup).values(rows)
+        await db.execute(stmt.on_conflict_do_update(
+            constraint="uq_time_log_rollup_key",
+            set_={
+                "total_seconds": TimeLogRollup.total_seconds + stmt.excluded.total_seconds,
+                "break_minutes": TimeLogRollup.break_minutes + stmt.excluded.break_minutes,
+                "log_count": TimeLogRollup.log_count + stmt.excluded.log_count,
+            }
+        ))
+
+
+async def get_task_hours(db: AsyncSession, task_id: int, net: bool = True) -> float:
+    """Odpracované hodiny (WORK) na úkolu; net=True odečte pauzy."""
+    return await _sum_hours(db, TimeLogRollup.task_id == task_id, net)
+
+
+async def get_work_order_hours(db: AsyncSession, work_order_id: int, net: bool = True) -> float:
+    """Odpracované hodiny (WORK) na zakázce; net=True odečte pauzy."""
+    return await _sum_hours(db, TimeLogRollup.work_order_id == work_order_id, net)
+
+
+def work_order_hours_select(net: bool = False):
+    """Poddotaz (work_order_id, hours) s hodinami WORK všech zakázek – pro hromadné kontroly."""
+    return (
+        select(TimeLogRollup.work_order_id, _hours_expr(net).label("hours"))
+        .where(TimeLogRollup.entry_type == TimeLogEntryType.WORK)
+        .group_by(TimeLogRollup.work_order_id)
+        .subquery()
+    )
+
+
+def _hours_expr(net: bool):
+    seconds = TimeLogRollup.total_seconds
+    if net:
+        seconds = seconds - TimeLogRollup.break_minutes * 60
+    return func.coalesce(func.sum(seconds), 0) / 3600.0
+
+
+async def _sum_hours(db: AsyncSession, condition, net: bool) -> float:
+    stmt = select(_hours_expr(net)).where(condition, TimeLogRollup.entry_type == TimeLogEntryType.WORK)
+    return float((await db.execute(stmt)).scalar() or 0)
+
+
+async def rebuild_hours_rollup(db: AsyncSession, company_id: Optional[int] = None) -> int:
+    """
+    Přepočítá součty z time_logs – pro zakázky jedné firmy, bez company_id všechny.
+    Necommituje. Vrací počet přepočtených řádků součtů.
+    """
+    seconds = cast(extract("epoch", TimeLog.end_time - TimeLog.start_time), Float)
+    source = (
+        select(
+            TimeLog.task_id, Task.work_order_id, TimeLog.entry_type, TimeLog.work_type_id,
+            func.sum(seconds), func.sum(func.coalesce(TimeLog.break_duration_minutes, 0)), func.count()
+        )
+        .join(Task, Task.id == TimeLog.task_id)
+        .group_by(TimeLog.task_id, Task.work_order_id, TimeLog.entry_type, TimeLog.work_type_id)
+    )
+    clear = delete(TimeLogRollup)
+    count = select(func.count()).select_from(TimeLogRollup)
+    if company_id is not None:
+        company_work_orders = select(WorkOrder.id).where(WorkOrder.company_id == company_id)
+        source = source.where(Task.work_order_id.in_(company_work_orders))
+        clear = clear.where(TimeLogRollup.work_order_id.in_(company_work_orders))
+        count = count.where(TimeLogRollup.work_order_id.in_(company_work_orders))
+    await db.execute(clear)
+    await db.execute(
+        insert(TimeLogRollup).from_select(
+            ["task_id", "work_order_id", "entry_type", "work_type_id", "total_seconds", "break_minutes", "log_count"],
+            source
+        )
+    )
+    return (await db.execute(count)).scalar()
+
+
+async def ensure_hours_rollup(db: AsyncSession) -> bool:
+    """
+    Při startu: pokud jsou součty prázdné, ale existují záznamy s úkolem (nová tabulka),
+    přestaví je. Vrací True při přestavbě.
+    """
+    if (await db.execute(select(TimeLogRollup.id).limit(1))).first() is not None:
+        return False
+    if (await db.execute(select(TimeLog.id).where(TimeLog.task_id != None).limit(1))).first() is None:
+        return False
+    await rebuild_hours_rollup(db)
+    await db.commit()
+    return True
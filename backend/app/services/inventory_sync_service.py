@@ -0,0 +1,207 @@
+# backend/app/services/inventory_sync_service.py
+"""
+Feed změn skladu pro delta synchronizaci desktopových klientů (GET /inventory/changes).
+
+Každá položka nese change_xid = ID transakce, která ji naposledy změnila. Plní ho DB
+triggery, takže se počítají i změny mimo ORM (hromadné UPDATE, kaskádní mazání):
+- vlastní změna řádku inventory_items,
+- změna stavu na lokaci (item_location_stock) nebo přiřazení kategorie,
+- přejmenování lokace, kategorie, výrobce či dodavatele, které položka zobrazuje,
+  změna popisu lokace a přidání či odebrání oprávnění k lokaci.
+Smazání položky zapíše tombstone do inventory_tombstones.
+
+Kurzor je xmin snapshotu (nejstarší transakce, která v okamžiku dotazu ještě běžela),
+ne nejvyšší viděné change_xid – transakce commitují v jiném pořadí, než začaly, a
+s maximem by se pozdě commitnuté změny ztratily. Položky se proto mohou v dalším
+feedu objevit znovu; klient je aplikuje idempotentně (upsert podle id).
+Kurzor nese i čas vydání; starší než INVENTORY_TOMBSTONE_RETENTION_DAYS už nemusí
+mít všechny tombstony, a feed pak vrátí celý sklad (full=True).
+"""
+import time
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.db.database import async_session_factory
+from app.db.models import InventoryItem, InventoryTombstone, ItemLocationStock, Location, now_utc
+
+_CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+# DDL triggerů; app.main je spouští mezi migracemi při startu (idempotentní)
+INVENTORY_CHANGE_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION inventory_item_stamp() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_xid := {_CURRENT_XID};
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_inventory_items_stamp
+    BEFORE INSERT OR UPDATE ON inventory_items
+    FOR EACH ROW EXECUTE FUNCTION inventory_item_stamp()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION inventory_item_tombstone() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO inventory_tombstones (company_id, item_id, change_xid, deleted_at)
+        VALUES (OLD.company_id, OLD.id, {_CURRENT_XID}, now());
+        RETURN OLD;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_inventory_items_tombstone
+    AFTER DELETE ON inventory_items
+    FOR EACH ROW EXECUTE FUNCTION inventory_item_tombstone()
+    """,
+    # Změna podřízeného řádku (TG_ARGV[0] = sloupec s ID položky) označí položku jako změněnou.
+    # Podmínka na change_xid brání opakovanému UPDATE téže položky v jedné transakci.
+    f"""
+    CREATE OR REPLACE FUNCTION inventory_item_touch_from_child() RETURNS trigger AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_data := to_jsonb(OLD);
+        ELSE
+            row_data := to_jsonb(NEW);
+        END IF;
+        UPDATE inventory_items SET change_xid = {_CURRENT_XID}
+        WHERE id = (row_data ->> TG_ARGV[0])::integer
+          AND change_xid IS DISTINCT FROM {_CURRENT_XID};
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_item_location_stock_touch
+    AFTER INSERT OR UPDATE OR DELETE ON item_location_stock
+    FOR EACH ROW EXECUTE FUNCTION inventory_item_touch_from_child('inventory_item_id')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_item_category_association_touch
+    AFTER INSERT OR UPDATE OR DELETE ON item_category_association
+    FOR EACH ROW EXECUTE FUNCTION inventory_item_touch_from_child('item_id')
+    """,
+    # Přejmenování entit, jejichž název je součástí payloadu položky
+    f"""
+    CREATE OR REPLACE FUNCTION inventory_item_touch_on_rename() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'locations' THEN
+            UPDATE inventory_items SET change_xid = {_CURRENT_XID}
+            WHERE id IN (SELECT inventory_item_id FROM item_location_stock WHERE location_id = NEW.id);
+        ELSIF TG_TABLE_NAME = 'inventory_categories' THEN
+            UPDATE inventory_items SET change_xid = {_CURRENT_XID}
+            WHERE id IN (SELECT item_id FROM item_category_association WHERE category_id = NEW.id);
+        ELSIF TG_TABLE_NAME = 'manufacturers' THEN
+            UPDATE inventory_items SET change_xid = {_CURRENT_XID} WHERE manufacturer_id = NEW.id;
+        ELSIF TG_TABLE_NAME = 'suppliers' THEN
+            UPDATE inventory_items SET change_xid = {_CURRENT_XID} WHERE supplier_id = NEW.id;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    # Lokace je v payloadu celá (název, popis, oprávnění uživatelé)
+    """
+    CREATE OR REPLACE TRIGGER trg_locations_inventory_touch
+    AFTER UPDATE OF name, description ON locations
+    FOR EACH ROW WHEN ((OLD.name, OLD.description) IS DISTINCT FROM (NEW.name, NEW.description))
+    EXECUTE FUNCTION inventory_item_touch_on_rename()
+    """,
+    *(
+        f"""
+        CREATE OR REPLACE TRIGGER trg_{table}_inventory_touch
+        AFTER UPDATE OF name ON {table}
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION inventory_item_touch_on_rename()
+        """
+        for table in ("inventory_categories", "manufacturers", "suppliers")
+    ),
+    f"""
+    CREATE OR REPLACE FUNCTION inventory_item_touch_on_location_permission() RETURNS trigger AS $$
+    DECLARE
+        loc_id integer;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            loc_id := OLD.location_id;
+        ELSE
+            loc_id := NEW.location_id;
+        END IF;
+        UPDATE inventory_items SET change_xid = {_CURRENT_XID}
+        WHERE id IN (SELECT inventory_item_id FROM item_location_stock WHERE location_id = loc_id)
+          AND change_xid IS DISTINCT FROM {_CURRENT_XID};
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_location_permissions_inventory_touch
+    AFTER INSERT OR DELETE ON location_permissions
+    FOR EACH ROW EXECUTE FUNCTION inventory_item_touch_on_location_permission()
+    """,
+]
+
+
+def _encode_cursor(xmin: int) -> str:
+    return f"{xmin}.{int(time.time())}"
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Vrátí xmin z kurzoru, nebo None, pokud chybí, je neplatný či starší než retence tombstonů."""
+    if not cursor:
+        return None
+    try:
+        xmin, issued_at = (int(part) for part in cursor.split(".", 1))
+    except ValueError:
+        return None
+    if issued_at < time.time() - settings.INVENTORY_TOMBSTONE_RETENTION_DAYS * 86400:
+        return None
+    return xmin
+
+
+async def get_inventory_changes(
+    db: AsyncSession, company_id: int, since: Optional[str]
+) -> Tuple[str, bool, List[InventoryItem], List[int]]:
+    """
+    Změny skladu firmy od kurzoru: (nový kurzor, full, změněné položky, ID smazaných).
+    Při full=True jsou v seznamu všechny položky a klient má svou kopii nahradit.
+    """
+    # Kurzor se čte PŘED daty: co commitne po tomto okamžiku, má xid >= xmin a přijde příště
+    xmin = (await db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))).scalar_one()
+    since_xid = _decode_cursor(since)
+    full = since_xid is None
+
+    stmt = (
+        select(InventoryItem)
+        .where(InventoryItem.company_id == company_id)
+        .options(
+            selectinload(InventoryItem.categories),
+            selectinload(InventoryItem.locations)
+                .selectinload(ItemLocationStock.location)
+                .selectinload(Location.authorized_users),
+            selectinload(InventoryItem.manufacturer),
+            selectinload(InventoryItem.supplier)
+        )
+        .order_by(InventoryItem.id)
+    )
+    if not full:
+        stmt = stmt.where(InventoryItem.change_xid >= since_xid)
+    items = (await db.execute(stmt)).scalars().all()
+
+    deleted_ids: List[int] = []
+    if not full:
+        deleted_ids = (await db.execute(
+            select(InventoryTombstone.item_id).distinct()
+            .where(InventoryTombstone.company_id == company_id, InventoryTombstone.change_xid >= since_xid)
+        )).scalars().all()
+    return _encode_cursor(xmin), full, items, deleted_ids
+
+
+async def cleanup_inventory_tombstones() -> None:
+    """Smaže tombstony starší než INVENTORY_TOMBSTONE_RETENTION_DAYS (plánuje app.main)."""
+    cutoff = now_utc() - timedelta(days=settings.INVENTORY_TOMBSTONE_RETENTION_DAYS)
+    async with async_session_factory() as db:
+        await db.execute(delete(InventoryTombstone).where(InventoryTombstone.deleted_at < cutoff))
+        await db.commit()
@@ -0,0 +1,263 @@
+# backend/app/services/job_service.py
+"""
+Úlohy na pozadí (importy, exporty, synchronizace) nad APSchedulerem z app.main.
+
+Endpoint úlohu jen založí (enqueue_job) a hned vrátí její ID. Stav, průběh a výsledek
+se ukládají do tabulky background_jobs, takže přežijí i restart serveru.
+CPU náročné kroky (openpyxl, reportlab) handler spouští přes app.core.executor.run_blocking.
+
+Úlohu si worker převezme podmíněným UPDATE (queued -> running), takže ji při více
+workerech nespustí dvakrát. Po dobu běhu obnovuje její lease (heartbeat_at); za
+přerušenou se považuje jen úloha, jejíž lease vypršel (JOB_LEASE_SECONDS), ne každá
+běžící – jinak by restart jednoho workeru shodil úlohy ostatních.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import async_session_factory
+from app.db.models import BackgroundJob, JobStatus, now_utc
+
+logger = logging.getLogger(__name__)
+
+# Identita tohoto workeru (procesu) v background_jobs.worker_id
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+@dataclass
+class JobFileResult:
+    """Výsledek úlohy ve formě souboru ke stažení (XLSX, PDF, ...)."""
+    content: bytes
+    filename: str
+    media_type: str
+
+
+class JobContext:
+    """Informace o běžící úloze předávané handleru."""
+
+    def __init__(self, job: BackgroundJob):
+        self.job_id = job.id
+        self.company_id = job.company_id
+        self.user_id = job.user_id
+        self.params: Dict[str, Any] = dict(job.params or {})
+
+    async def set_progress(self, progress: int, message: Optional[str] = None) -> None:
+        """Zapíše průběh (0–100) vlastní session, nezávisle na transakci handleru."""
+        values: Dict[str, Any] = {"progress": max(0, min(100, int(progress)))}
+        if message is not None:
+            values["message"] = message
+        async with async_session_factory() as session:
+            await session.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(**values))
+            await session.commit()
+
+
+JobHandler = Callable[[JobContext, AsyncSession], Awaitable[Any]]
+
+_handlers: Dict[str, JobHandler] = {}
+_scheduler = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def register_job_handler(job_type: str, handler: JobHandler) -> None:
+    """
+    Zaregistruje handler pro daný typ úlohy. Handler dostane JobContext a vlastní DB session
+    a vrací dict (JSON výsledek), JobFileResult nebo None.
+    """
+    _handlers[job_type] = handler
+
+
+def job_input_path(suffix: str) -> str:
+    """Cesta pro uložení vstupního souboru úlohy (např. nahraného XLS). Po dokončení úlohy se smaže."""
+    directory = os.path.join(settings.JOB_RESULTS_DIR, "inputs")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{uuid.uuid4().hex}{suffix}")
+
+
+async def enqueue_job(db: AsyncSession, company_id: int, user_id: Optional[int],
+                      job_type: str, params: Optional[Dict[str, Any]] = None) -> BackgroundJob:
+    """Založí úlohu ve stavu 'queued' a naplánuje její okamžité spuštění."""
+    if job_type not in _handlers:
+        raise ValueError(f"Neznámý typ úlohy: {job_type}")
+    job = BackgroundJob(company_id=company_id, user_id=user_id, job_type=job_type, params=params or {})
+    db.add(job)
+    await db.commit()
+    _schedule(job.id)
+    return job
+
+
+def job_accepted_response(job: BackgroundJob) -> JSONResponse:
+    """Odpověď 202 pro endpointy v asynchronním režimu."""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job.id,
+            "status": JobStatus.queued.value,
+            "status_url": f"/companies/{job.company_id}/jobs/{job.id}",
+        }
+    )
+
+
+def _schedule(job_id: int) -> None:
+    if _scheduler is None:
+        raise RuntimeError("Job runner není inicializován (init_job_runner).")
+    # Bez triggeru APScheduler spustí úlohu okamžitě
+    _scheduler.add_job(run_job, args=[job_id], id=f"background_job_{job_id}", replace_existing=True)
+
+
+async def _claim_job(job_id: int) -> bool:
+    """Převezme čekající úlohu pro tento worker. False = už ji převzal jiný."""
+    now = now_utc()
+    async with async_session_factory() as session:
+        claimed = (await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, BackgroundJob.status == JobStatus.queued)
+            .values(status=JobStatus.running, started_at=now, worker_id=WORKER_ID, heartbeat_at=now)
+            .returning(BackgroundJob.id)
+        )).first()
+        await session.commit()
+    return claimed is not None
+
+
+async def _set_job_state(job_id: int, **values) -> None:
+    async with async_session_factory() as session:
+        await session.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values))
+        await session.commit()
+
+
+def _store_result_file(job_id: int, result: JobFileResult) -> str:
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    _, ext = os.path.splitext(result.filename)
+    path = os.path.join(settings.JOB_RESULTS_DIR, f"job_{job_id}_{uuid.uuid4().hex}{ext}")
+    with open(path, "wb") as f:
+        f.write(result.content)
+    return path
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Nelze smazat soubor úlohy {path}: {e}")
+
+
+async def run_job(job_id: int) -> None:
+    """Vykoná jednu úlohu. Počet souběžně běžících úloh omezuje JOB_MAX_CONCURRENT."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.JOB_MAX_CONCURRENT)
+
+    async with _semaphore:
+        async with async_session_factory() as db:
+            job = await db.get(BackgroundJob, job_id)
+            if job is None or job.status != JobStatus.queued:
+                return
+            handler = _handlers.get(job.job_type)
+            ctx = JobContext(job)
+
+        if handler is None:
+            await _set_job_state(job_id, status=JobStatus.failed, finished_at=now_utc(),
+                                 error=f"Neznámý typ úlohy: {job.job_type}")
+            return
+
+        if not await _claim_job(job_id):
+            return
+        try:
+            async with async_session_factory() as db:
+                result = await handler(ctx, db)
+            values: Dict[str, Any] = {"status": JobStatus.succeeded, "progress": 100, "finished_at": now_utc()}
+            if isinstance(result, JobFileResult):
+                values.update(
+                    result_path=_store_result_file(job_id, result),
+                    result_filename=result.filename,
+                    result_media_type=result.media_type,
+                )
+            elif result is not None:
+                values["result"] = result
+            await _set_job_state(job_id, **values)
+        except Exception as e:
+            logger.exception(f"Úloha {job_id} ({job.job_type}) selhala")
+            await _set_job_state(job_id, status=JobStatus.failed, finished_at=now_utc(), error=str(e))
+        finally:
+            _remove_file(ctx.params.get("input_path"))
+
+
+async def _renew_leases() -> None:
+    """Obnoví lease úloh, které běží v tomto workeru."""
+    async with async_session_factory() as db:
+        await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.worker_id == WORKER_ID, BackgroundJob.status == JobStatus.running)
+            .values(heartbeat_at=now_utc())
+        )
+        await db.commit()
+
+
+async def _fail_expired_jobs() -> None:
+    """Běžící úlohy s vypršelým lease (jejich worker skončil nebo spadl) označí jako selhané."""
+    expired = now_utc() - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    async with async_session_factory() as db:
+        result = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.status == JobStatus.running,
+                   or_(BackgroundJob.heartbeat_at == None, BackgroundJob.heartbeat_at < expired))
+            .values(status=JobStatus.failed, finished_at=now_utc(),
+                    error="Úloha byla přerušena (worker přestal obnovovat lease).")
+        )
+        await db.commit()
+    if result.rowcount:
+        logger.warning(f"{result.rowcount} přerušených úloh označeno jako selhané.")
+
+
+async def _resume_jobs() -> None:
+    """Po startu: přerušené úlohy s vypršelým lease označí jako selhané, čekající znovu naplánuje."""
+    await _fail_expired_jobs()
+    async with async_session_factory() as db:
+        queued = (await db.execute(
+            select(BackgroundJob.id).where(BackgroundJob.status == JobStatus.queued).order_by(BackgroundJob.id)
+        )).scalars().all()
+    for job_id in queued:
+        _schedule(job_id)
+    if queued:
+        logger.info(f"Znovu naplánováno {len(queued)} čekajících úloh.")
+
+
+async def cleanup_old_jobs() -> None:
+    """Smaže dokončené úlohy starší než JOB_RESULT_RETENTION_DAYS včetně jejich souborů."""
+    cutoff = now_utc() - timedelta(days=settings.JOB_RESULT_RETENTION_DAYS)
+    async with async_session_factory() as db:
+        old_jobs = select(BackgroundJob.id, BackgroundJob.result_path).where(
+            BackgroundJob.status.in_([JobStatus.succeeded, JobStatus.failed]),
+            BackgroundJob.finished_at < cutoff
+        )
+        rows = (await db.execute(old_jobs)).all()
+        for _, path in rows:
+            _remove_file(path)
+        if rows:
+            await db.execute(delete(BackgroundJob).where(BackgroundJob.id.in_([job_id for job_id, _ in rows])))
+            await db.commit()
+
+
+def init_job_runner(scheduler) -> None:
+    """Napojí frontu úloh na běžící APScheduler (volá se v lifespan po scheduler.start())."""
+    global _scheduler
+    _scheduler = scheduler
+    scheduler.add_job(_resume_jobs, id="background_jobs_resume", replace_existing=True)
+    # Lease se obnovuje třikrát za dobu platnosti; kontrola vypršelých běží ve všech workerech
+    scheduler.add_job(_renew_leases, 'interval', seconds=max(1, settings.JOB_LEASE_SECONDS // 3),
+                      id="background_jobs_lease_renew", replace_existing=True)
+    scheduler.add_job(_fail_expired_jobs, 'interval', seconds=settings.JOB_LEASE_SECONDS,
+                      id="background_jobs_lease_check", replace_existing=True)
+    if not scheduler.get_job("background_jobs_cleanup"):
+        scheduler.add_job(cleanup_old_jobs, 'cron', hour=4, minute=0, id="background_jobs_cleanup")
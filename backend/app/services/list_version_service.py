@@ -0,0 +1,86 @@
+# backend/app/services/list_version_service.py
+"""
+Verze výpisů pro podmíněný GET (ETag / If-None-Match).
+
+Verze výpisu je otisk tabulek, ze kterých se odpověď skládá: počet řádků firmy a součet
+ID transakcí, které je zapsaly (systémový sloupec xmin). Každý INSERT, UPDATE i DELETE
+otisk změní; tabulky proto nepotřebují updated_at ani triggery. Sklad místo xmin
+používá change_xid (viz inventory_sync_service), do kterého se promítají i stavy
+na lokacích, kategorie a přejmenování souvisejících entit; k tomu přidává strom
+kategorií (filtr category_id přes podstrom) a lokace s oprávněními, které jsou
+součástí payloadu položky.
+
+Otisk je jeden agregační dotaz nad řádky firmy – bez ORM, vztahů a serializace.
+"""
+import hashlib
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Zvýšit při změně formátu odpovědí výpisů (klienti pak nedostanou 304 na starý formát)
+_FORMAT_VERSION = "1"
+
+# Zdroj -> seznam (FROM ... WHERE ... s parametrem :company_id, sloupec verze řádku)
+_RESOURCE_TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "categories": [
+        ("FROM inventory_categories t WHERE t.company_id = :company_id", "t.xmin"),
+    ],
+    "locations": [
+        ("FROM locations t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM location_permissions t JOIN locations l ON l.id = t.location_id"
+         " WHERE l.company_id = :company_id", "t.xmin"),
+        ("FROM users t JOIN location_permissions p ON p.user_id = t.id"
+         " JOIN locations l ON l.id = p.location_id WHERE l.company_id = :company_id", "t.xmin"),
+    ],
+    "members": [
+        ("FROM memberships t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM users t JOIN memberships m ON m.user_id = t.id WHERE m.company_id = :company_id", "t.xmin"),
+    ],
+    "work_orders": [
+        ("FROM work_orders t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM tasks t JOIN work_orders w ON w.id = t.work_order_id WHERE w.company_id = :company_id", "t.xmin"),
+        ("FROM clients t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM plugin_obj_sites t WHERE t.company_id = :company_id", "t.xmin"),
+    ],
+    "inventory": [
+        ("FROM inventory_items t WHERE t.company_id = :company_id", "t.change_xid"),
+        ("FROM inventory_categories t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM inventory_category_closure t JOIN inventory_categories c ON c.id = t.descendant_id"
+         " WHERE c.company_id = :company_id", "t.xmin"),
+        ("FROM locations t WHERE t.company_id = :company_id", "t.xmin"),
+        ("FROM location_permissions t JOIN locations l ON l.id = t.location_id"
+         " WHERE l.company_id = :company_id", "t.xmin"),
+    ],
+}
+
+
+def _version_query(resource: str):
+    parts = [
+        f"(SELECT count(*) || '.' || coalesce(sum({column}::text::bigint), 0) {source})"
+        for source, column in _RESOURCE_TABLES[resource]
+    ]
+    return text(f"SELECT concat_ws('/', {', '.join(parts)})")
+
+
+_VERSION_QUERIES = {resource: _version_query(resource) for resource in _RESOURCE_TABLES}
+
+
+async def get_list_version(db: AsyncSession, resource: str, company_id: int) -> str:
+    """Otisk dat výpisu `resource` pro firmu (mění se s každou změnou zdrojových tabulek)."""
+    return (await db.execute(_VERSION_QUERIES[resource], {"company_id": company_id})).scalar_one()
+
+
+def make_etag(resource: str, company_id: int, version: str, query: str = "") -> str:
+    """Silný ETag výpisu; query = parametry požadavku (filtry, stránkování) v kanonickém tvaru."""
+    digest = hashlib.sha1(f"{_FORMAT_VERSION}|{resource}|{company_id}|{query}|{version}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Vyhodnotí hlavičku If-None-Match (seznam ETagů, '*', slabé W/ ETagy)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,189 @@
+# backend/app/services/outbox_service.py
+"""
+Fronta odchozích transakčních e-mailů (tabulka email_outbox).
+
+Endpointy a kontroly triggerů volají queue_email(s) před svým commitem, takže e-mail
+vznikne ve stejné transakci jako obchodní změna a odpověď na SMTP nečeká. Worker
+drain_outbox běží na APScheduleru z app.main: zprávy si atomicky zabere, pošle je
+po firmách (souběžně nejvýše OUTBOX_CONCURRENCY firem, každá nejvýše
+OUTBOX_RATE_PER_MINUTE zpráv za minutu) a neúspěšné naplánuje znovu s rostoucím odstupem.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from itertools import groupby
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import async_session_factory
+from app.db.models import EmailOutbox, OutboxStatus, now_utc
+from app.services.email_service import get_smtp_config, send_batch
+
+logger = logging.getLogger(__name__)
+
+# Zprávy ve stavu 'sending' déle než tuto dobu (pád workeru) se vrátí do fronty
+_STALE_LOCK = timedelta(minutes=10)
+
+_drain_lock = asyncio.Lock()
+
+
+async def queue_emails(db: AsyncSession, company_id: int, notification_type: str,
+                       messages: List[Tuple[str, str, str]]) -> int:
+    """
+    Zařadí e-maily (recipient, subject, body) do fronty v transakci volajícího; necommituje.
+    Typy notifikací, které má firma vypnuté (nebo firma nemá SMTP), se rovnou zahodí.
+    Vrací počet zařazených zpráv.
+    """
+    if not messages:
+        return 0
+    config = await get_smtp_config(db, company_id)
+    if not config or not config.is_enabled:
+        return 0
+    if not config.notification_settings.get(notification_type, False):
+        logger.info(f"Skipping {len(messages)} email(s) '{notification_type}' for company {company_id} as it is disabled in settings.")
+        return 0
+    db.add_all([
+        EmailOutbox(company_id=company_id, notification_type=notification_type,
+                    recipient=recipient, subject=subject, body=body)
+        for recipient, subject, body in messages
+    ])
+    return len(messages)
+
+
+async def queue_email(db: AsyncSession, company_id: int, notification_type: str,
+                      recipient: str, subject: str, body: str) -> int:
+    return await queue_emails(db, company_id, notification_type, [(recipient, subject, body)])
+
+
+async def _claim_batch(db: AsyncSession) -> List[EmailOutbox]:
+    """Vybere splatné zprávy v rámci limitů firem a atomicky je přepne do stavu 'sending'."""
+    now = now_utc()
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.status == OutboxStatus.sending, EmailOutbox.locked_at < now - _STALE_LOCK)
+        .values(status=OutboxStatus.pending, locked_at=None)
+    )
+
+    # Kolik zpráv firmy už za poslední minutu odešly (limit platí i napříč workery)
+    recent_stmt = (
+        select(EmailOutbox.company_id, func.count())
+        .where(EmailOutbox.sent_at >= now - timedelta(minutes=1))
+        .group_by(EmailOutbox.company_id)
+    )
+    sent_recently: Dict[int, int] = dict((await db.execute(recent_stmt)).all())
+
+    rank = func.row_number().over(partition_by=EmailOutbox.company_id, order_by=EmailOutbox.id).label("rank")
+    due = (
+        select(EmailOutbox.id, EmailOutbox.company_id, rank)
+        .where(EmailOutbox.status == OutboxStatus.pending, EmailOutbox.next_attempt_at <= now)
+        .subquery()
+    )
+    candidates = (await db.execute(
+        select(due.c.id, due.c.company_id, due.c.rank)
+        .where(due.c.rank <= settings.OUTBOX_RATE_PER_MINUTE)
+        .order_by(due.c.id)
+        .limit(settings.OUTBOX_BATCH_SIZE)
+    )).all()
+    ids = [
+        row.id for row in candidates
+        if row.rank <= settings.OUTBOX_RATE_PER_MINUTE - sent_recently.get(row.company_id, 0)
+    ]
+    if not ids:
+        await db.commit()
+        return []
+
+    # Podmínka na status zajistí, že zprávu nezabere souběžně jiný worker
+    claimed = (await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), EmailOutbox.status == OutboxStatus.pending)
+        .values(status=OutboxStatus.sending, locked_at=now, attempts=EmailOutbox.attempts + 1)
+        .returning(EmailOutbox)
+    )).scalars().all()
+    await db.commit()
+    return sorted(claimed, key=lambda m: (m.company_id, m.id))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+
+
+async def _deliver_company(company_id: int, messages: List[EmailOutbox]) -> None:
+    """Pošle zprávy jedné firmy jedním SMTP spojením a zapíše jejich výsledný stav."""
+    async with async_session_factory() as db:
+        try:
+            config = await get_smtp_config(db, company_id)
+            if not config or not config.is_enabled:
+                raise RuntimeError("SMTP is disabled or not configured.")
+            failures = await send_batch(config, [(m.recipient, m.subject, m.body) for m in messages])
+        except Exception as e:
+            failures = {index: e for index in range(len(messages))}
+
+        now = now_utc()
+        sent_ids = [m.id for index, m in enumerate(messages) if index not in failures]
+        if sent_ids:
+            await db.execute(
+                update(EmailOutbox).where(EmailOutbox.id.in_(sent_ids))
+                .values(status=OutboxStatus.sent, sent_at=now, locked_at=None, last_error=None)
+            )
+        for index, error in failures.items():
+            message = messages[index]
+            values = {"locked_at": None, "last_error": str(error)[:2000]}
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                values["status"] = OutboxStatus.failed
+                logger.error(f"Email '{message.notification_type}' to {message.recipient} for company {company_id} failed permanently: {error}")
+            else:
+                values.update(status=OutboxStatus.pending, next_attempt_at=now + _retry_delay(message.attempts))
+            await db.execute(update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values))
+        await db.commit()
+    if sent_ids:
+        logger.info(f"Outbox: sent {len(sent_ids)} email(s) for company {company_id}.")
+
+
+async def drain_outbox() -> None:
+    """Jeden průchod workeru: zabere dávku zpráv a odešle ji. Souběžné průchody se nepřekrývají."""
+    if _drain_lock.locked():
+        return
+    async with _drain_lock:
+        async with async_session_factory() as db:
+            batch = await _claim_batch(db)
+        if not batch:
+            return
+        semaphore = asyncio.Semaphore(settings.OUTBOX_CONCURRENCY)
+
+        async def deliver(company_id: int, messages: List[EmailOutbox]):
+            async with semaphore:
+                try:
+                    await _deliver_company(company_id, messages)
+                except Exception:
+                    logger.exception(f"Outbox delivery for company {company_id} failed")
+
+        await asyncio.gather(*(
+            deliver(company_id, list(messages))
+            for company_id, messages in groupby(batch, key=lambda m: m.company_id)
+        ))
+
+
+async def cleanup_outbox() -> None:
+    """Smaže odeslané a definitivně neúspěšné zprávy starší než OUTBOX_RETENTION_DAYS."""
+    cutoff = now_utc() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    async with async_session_factory() as db:
+        await db.execute(
+            delete(EmailOutbox).where(
+                EmailOutbox.status.in_([OutboxStatus.sent, OutboxStatus.failed]),
+                EmailOutbox.created_at < cutoff
+            )
+        )
+        await db.commit()
+
+
+def init_outbox_worker(scheduler) -> None:
+    """Napojí worker na běžící APScheduler (volá se v lifespan po scheduler.start())."""
+    scheduler.add_job(
+        drain_outbox, 'interval', seconds=settings.OUTBOX_POLL_SECONDS,
+        id="email_outbox_drain", replace_existing=True, max_instances=1, coalesce=True
+    )
+    if not scheduler.get_job("email_outbox_cleanup"):
+        scheduler.add_job(cleanup_outbox, 'cron', hour=4, minute=30, id="email_outbox_cleanup")
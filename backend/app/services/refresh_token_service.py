@@ -0,0 +1,105 @@
+# backend/app/services/refresh_token_service.py
+"""
+Refresh tokeny pro dlouhé relace desktopových klientů.
+
+Refresh token je náhodný řetězec; v DB se drží jen jeho SHA-256, takže obnova access
+tokenu stojí jeden indexovaný dotaz místo bcryptu. Každé použití token rotuje: starý
+se zneplatní a nový patří do stejné rodiny (family_id). Pokus o opakované použití už
+vyměněného tokenu znamená jeho únik, a proto se zneplatní celá rodina.
+"""
+import hashlib
+import logging
+import secrets
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import async_session_factory
+from app.db.models import RefreshToken, User, now_utc
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    """Vytvoří nový refresh token (nová rodina, pokud family_id není zadáno). Necommituje."""
+    token = secrets.token_urlsafe(48)
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id or secrets.token_hex(16),
+        token_hash=_hash_token(token),
+        expires_at=now_utc() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Optional[Tuple[User, str]]:
+    """
+    Vymění platný refresh token za nový. Vrací (uživatel, nový token), nebo None, pokud je
+    token neplatný, expirovaný či už použitý (pak zneplatní celou rodinu). Necommituje.
+    """
+    now = now_utc()
+    # Podmíněný UPDATE zajistí, že souběžné požadavky se stejným tokenem neuspějí oba
+    claimed = (await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == _hash_token(token),
+               RefreshToken.revoked_at == None,
+               RefreshToken.expires_at > now)
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+    )).first()
+
+    if claimed is None:
+        reused = (await db.execute(
+            select(RefreshToken.user_id, RefreshToken.family_id)
+            .where(RefreshToken.token_hash == _hash_token(token), RefreshToken.revoked_at != None)
+        )).first()
+        if reused is not None:
+            logger.warning(f"Refresh token reuse detected for user {reused.user_id}, revoking token family.")
+            await _revoke(db, RefreshToken.family_id == reused.family_id)
+        return None
+
+    user = await db.get(User, claimed.user_id)
+    if not user or not user.is_active:
+        await _revoke(db, RefreshToken.family_id == claimed.family_id)
+        return None
+    return user, await issue_refresh_token(db, user.id, family_id=claimed.family_id)
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> None:
+    """Odhlášení: zneplatní rodinu, do které token patří. Necommituje."""
+    family_id = (await db.execute(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == _hash_token(token))
+    )).scalar_one_or_none()
+    if family_id:
+        await _revoke(db, RefreshToken.family_id == family_id)
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int) -> None:
+    """Zneplatní všechny relace uživatele (odhlášení ze všech zařízení). Necommituje."""
+    await _revoke(db, RefreshToken.user_id == user_id)
+
+
+async def _revoke(db: AsyncSession, condition) -> None:
+    await db.execute(
+        update(RefreshToken).where(condition, RefreshToken.revoked_at == None).values(revoked_at=now_utc())
+    )
+
+
+async def cleanup_refresh_tokens() -> None:
+    """Smaže expirované tokeny a vyměněné tokeny starší než jejich platnost (plánuje app.main)."""
+    now = now_utc()
+    async with async_session_factory() as db:
+        await db.execute(
+            delete(RefreshToken).where(or_(
+                RefreshToken.expires_at < now,
+                RefreshToken.revoked_at < now - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            ))
+        )
+        await db.commit()
@@ -0,0 +1,73 @@
+# backend/app/services/stock_events.py
+"""
+Události o změně stavu skladu a jejich dispatcher.
+
+Endpointy, které mění ItemLocationStock (naskladnění, přesun, odpis, výdej na úkol,
+splnění požadavku), po commitu zavolají publish_stock_change(). Dispatcher běží jako
+jedna asyncio úloha, události slučuje po firmách a kontroluje práh nízkého stavu jen
+u dotčených položek, takže alert odchází během několika sekund. Periodická kontrola
+v app.main zůstává jako řídká konzistenční kontrola (TRIGGER_SWEEP_INTERVAL_MINUTES).
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app.db.database import async_session_factory
+from app.services.trigger_service import check_low_stock_for_items
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional["asyncio.Queue[Tuple[int, Set[int]]]"] = None
+_task: Optional[asyncio.Task] = None
+
+
+def publish_stock_change(company_id: int, item_ids: Iterable[int]) -> None:
+    """
+    Oznámí změnu stavu položek. Volá se až po commitu, aby dispatcher viděl nový stav.
+    Neblokuje; pokud dispatcher neběží, událost se zahodí a položku zachytí konzistenční kontrola.
+    """
+    ids = {item_id for item_id in item_ids if item_id is not None}
+    if _queue is None or not ids:
+        return
+    _queue.put_nowait((company_id, ids))
+
+
+async def _dispatch_loop() -> None:
+    while True:
+        company_id, ids = await _queue.get()
+        # Sloučíme vše, co se mezitím nahromadilo, do jedné kontroly na firmu
+        pending: Dict[int, Set[int]] = {company_id: set(ids)}
+        while not _queue.empty():
+            company_id, ids = _queue.get_nowait()
+            pending.setdefault(company_id, set()).update(ids)
+
+        for company_id, item_ids in pending.items():
+            try:
+                async with async_session_factory() as session:
+                    sent = await check_low_stock_for_items(session, company_id, item_ids)
+                if sent:
+                    logger.info(f"Odesláno {sent} upozornění na nízký stav (firma {company_id}).")
+            except Exception as e:
+                logger.error(f"Kontrola nízkého stavu pro firmu {company_id} selhala: {e}", exc_info=True)
+
+
+def start_stock_event_dispatcher() -> None:
+    """Spustí dispatcher (volá se v lifespan)."""
+    global _queue, _task
+    if _task is not None:
+        return
+    _queue = asyncio.Queue()
+    _task = asyncio.create_task(_dispatch_loop())
+
+
+async def stop_stock_event_dispatcher() -> None:
+    global _queue, _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _queue = None
+    _task = None
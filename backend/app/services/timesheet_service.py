@@ -3,8 +3,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timezone
+from typing import Optional
 from app.db.models import TimeLog, Task, WorkOrder, TimeLogEntryType
 from app.schemas.time_log import TimeLogCreateIn
+from app.services.hours_rollup_service import HoursRollupDelta
 
 def ensure_utc(dt: datetime) -> datetime:
     """Pomocná funkce, která zajistí, že datetime je 'aware' a v UTC."""
@@ -14,11 +16,15 @@ def ensure_utc(dt: datetime) -> datetime:
     # Pokud je 'aware', převedeme ho na UTC
     return dt.astimezone(timezone.utc)
 
-async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_log_data: TimeLogCreateIn) -> TimeLog:
+async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_log_data: TimeLogCreateIn,
+                         rollup: Optional[HoursRollupDelta] = None) -> TimeLog:
     """
     Vloží nebo aktualizuje časový záznam, inteligentně řeší překryvy
     a defenzivně pracuje s časovými zónami.
+    Součty hodin (time_log_rollups) upraví v téže transakci; volající může
+    předat rollup s již zaznamenanými změnami (např. smazaný původní záznam).
     """
+    rollup = rollup or HoursRollupDelta()
     
     # 1. Validace časů
     new_start = ensure_utc(new_log_data.start_time)
@@ -77,6 +83,8 @@ async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_lo
     overlapping_logs = (await db.execute(stmt)).scalars().all()
     
     for log in overlapping_logs:
+        # Původní podobu záznamu odečteme ze součtů, upravenou zase přičteme
+        rollup.remove(log)
         # Převedeme DB časy na UTC aware pro bezpečné porovnání
         log_start = ensure_utc(log.start_time)
         log_end = ensure_utc(log.end_time)
@@ -99,9 +107,11 @@ async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_lo
                 break_duration_minutes=0 
             )
             db.add(second_part)
+            rollup.add(second_part)
             
             # První část zkrátíme (8-9)
             log.end_time = new_start
+            rollup.add(log)
             continue
 
         # Scénář B: Nový log zcela PŘEKRÝVÁ starý (Starý: 9-10, Nový: 8-11) -> Smazat starý
@@ -120,6 +130,8 @@ async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_lo
         # Pojistka: Pokud by úpravou vznikl nulový nebo záporný čas, smažeme ho
         if log.start_time >= log.end_time:
             await db.delete(log)
+        else:
+            rollup.add(log)
             
     # 4. Vytvoření nového záznamu
     new_log = TimeLog(
@@ -135,6 +147,8 @@ async def upsert_timelog(db: AsyncSession, user_id: int, company_id: int, new_lo
         is_overtime=new_log_data.is_overtime
     )
     db.add(new_log)
+    rollup.add(new_log)
     
     await db.flush()
+    await rollup.apply(db)
     return new_log
\ No newline at end of file
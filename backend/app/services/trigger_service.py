@@ -1,105 +1,185 @@
 # backend/app/services/trigger_service.py
 import logging
+from itertools import groupby
+from typing import Iterable, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text
+from sqlalchemy import select, func, and_, update
 from app.db.models import (
-    NotificationTrigger, TriggerType, WorkOrder, TimeLog,
-    InventoryItem, ItemLocationStock, TimeLogEntryType, Task
+    NotificationTrigger, TriggerType, WorkOrder,
+    InventoryItem, ItemLocationStock
 )
-from app.services.email_service import send_transactional_email
+from app.services.outbox_service import queue_emails
+from app.services.hours_rollup_service import work_order_hours_select
 
 logger = logging.getLogger(__name__)
 
-async def check_work_order_budget_triggers(db: AsyncSession):
-    """Najde všechny zakázky, které překročily rozpočtový práh a ještě nemají odeslaný alert."""
-    stmt = select(NotificationTrigger).where(
-        NotificationTrigger.is_active == True,
-        NotificationTrigger.trigger_type == TriggerType.WORK_ORDER_BUDGET
+def _budget_message(name: str, work_order_id: int, threshold: float, budget_hours: float,
+                    logged_hours: float) -> Tuple[str, str]:
+    subject = f"Upozornění: Rozpočet zakázky '{name}' je téměř vyčerpán"
+    body = (
+        f"Dobrý den,\n\n"
+        f"fond hodin pro zakázku '{name}' (ID: {work_order_id}) dosáhl {threshold}% svého rozpočtu.\n\n"
+        f"Rozpočet: {budget_hours:.2f} hodin\n"
+        f"Aktuálně evidováno: {logged_hours:.2f} hodin\n\n"
+        "S pozdravem,\nVáš Appartus systém"
     )
-    triggers = (await db.execute(stmt)).scalars().all()
+    return subject, body
 
-    for trigger in triggers:
-        # Tento subquery sečte hodiny pro každou zakázku
-        subquery = (
-            select(
-                TimeLog.task_id,
-                func.sum((func.timestampdiff(text('SECOND'), TimeLog.start_time, TimeLog.end_time)) / 3600.0).label('total_hours')
-            )
-            .where(TimeLog.entry_type == TimeLogEntryType.WORK)
-            .group_by(TimeLog.task_id)
-            .subquery()
+async def check_work_order_budget_triggers(db: AsyncSession):
+    """
+    Najde všechny zakázky, které překročily rozpočtový práh a ještě nemají odeslaný alert.
+    Jeden dotaz pro všechny aktivní triggery; odpracované hodiny se čtou z průběžných
+    součtů time_log_rollups (viz hours_rollup_service). Příznaky se commitují jednou za firmu.
+    """
+    wo_hours = work_order_hours_select()
+    stmt = (
+        select(
+            WorkOrder.id, WorkOrder.company_id, WorkOrder.name, WorkOrder.budget_hours,
+            NotificationTrigger.threshold_value, NotificationTrigger.recipient_emails,
+            wo_hours.c.hours.label("logged_hours")
         )
+        .join(NotificationTrigger, and_(
+            NotificationTrigger.company_id == WorkOrder.company_id,
+            NotificationTrigger.trigger_type == TriggerType.WORK_ORDER_BUDGET,
+            NotificationTrigger.is_active == True
+        ))
+        .join(wo_hours, wo_hours.c.work_order_id == WorkOrder.id)
+        .where(
+            WorkOrder.budget_hours > 0,
+            WorkOrder.budget_alert_sent == False,
+            WorkOrder.status.not_in(['completed', 'cancelled']),
+            wo_hours.c.hours >= WorkOrder.budget_hours * NotificationTrigger.threshold_value / 100.0
+        )
+        .order_by(WorkOrder.company_id, WorkOrder.id)
+    )
+    rows = (await db.execute(stmt)).all()
 
-        # Najdeme zakázky, které splňují podmínku
-        work_orders_stmt = (
-            select(WorkOrder, func.sum(subquery.c.total_hours).label('logged_hours'))
-            .join(WorkOrder.tasks)
-            .join(subquery, subquery.c.task_id == Task.id) # Použijeme explicitní Task.id
-            .where(
-                WorkOrder.company_id == trigger.company_id,
-                WorkOrder.budget_hours > 0,
-                WorkOrder.budget_alert_sent == False,
-                WorkOrder.status.not_in(['completed', 'cancelled'])
-            )
-            .group_by(WorkOrder.id)
-            .having(func.sum(subquery.c.total_hours) >= (WorkOrder.budget_hours * trigger.threshold_value / 100.0))
+    for company_id, company_rows in groupby(rows, key=lambda r: r.company_id):
+        company_rows = list(company_rows)
+        messages = []
+        for row in company_rows:
+            subject, body = _budget_message(row.name, row.id, row.threshold_value, row.budget_hours, row.logged_hours)
+            messages.extend((recipient, subject, body) for recipient in row.recipient_emails)
+        await queue_emails(db, company_id, "on_budget_alert", messages)
+
+        await db.execute(
+            update(WorkOrder)
+            .where(WorkOrder.id.in_([row.id for row in company_rows]))
+            .values(budget_alert_sent=True)
         )
-        
-        work_orders_to_alert = (await db.execute(work_orders_stmt)).all()
+        await db.commit()
 
-        for wo, logged_hours in work_orders_to_alert:
-            subject = f"Upozornění: Rozpočet zakázky '{wo.name}' je téměř vyčerpán"
-            body = (
-                f"Dobrý den,\n\n"
-                f"fond hodin pro zakázku '{wo.name}' (ID: {wo.id}) dosáhl {trigger.threshold_value}% svého rozpočtu.\n\n"
-                f"Rozpočet: {wo.budget_hours:.2f} hodin\n"
-                f"Aktuálně evidováno: {logged_hours:.2f} hodin\n\n"
-                "S pozdravem,\nVáš Appartus systém"
-            )
-            for recipient in trigger.recipient_emails:
-                await send_transactional_email(db, trigger.company_id, "on_budget_alert", recipient, subject, body)
-            
-            wo.budget_alert_sent = True
-            await db.commit()
+def _low_stock_message(name: str, sku: str, threshold: int, total_quantity: int) -> Tuple[str, str]:
+    subject = f"Upozornění: Nízký stav zásob pro položku '{name}'"
+    body = (
+        f"Dobrý den,\n\n"
+        f"stav zásob pro položku '{name}' (SKU: {sku}) klesl pod nastavený práh.\n\n"
+        f"Nastavený práh: {threshold} ks\n"
+        f"Aktuální stav: {total_quantity} ks\n\n"
+        "S pozdravem,\nVáš Appartus systém"
+    )
+    return subject, body
 
-async def check_low_stock_triggers(db: AsyncSession):
-    """Najde všechny monitorované položky pod prahem, které nemají odeslaný alert."""
-    stmt = select(InventoryItem).where(
-        InventoryItem.is_monitored_for_stock == True,
-        InventoryItem.low_stock_alert_sent == False,
-        InventoryItem.low_stock_threshold != None
+def _stock_total(item_id_column):
+    """Korelovaný součet kusů položky přes všechny lokace."""
+    return (
+        select(func.coalesce(func.sum(ItemLocationStock.quantity), 0))
+        .where(ItemLocationStock.inventory_item_id == item_id_column)
+        .scalar_subquery()
     )
-    items_to_check = (await db.execute(stmt)).scalars().all()
 
-    for item in items_to_check:
-        # Získáme trigger pro danou firmu
-        trigger_stmt = select(NotificationTrigger).where(
-            NotificationTrigger.company_id == item.company_id,
+async def _send_low_stock_alerts(db: AsyncSession, *conditions, per_item: bool = False) -> int:
+    """
+    Najde monitorované položky pod prahem bez odeslaného alertu (volitelně zúžené
+    o další podmínky), zařadí e-maily do outboxu a spolu s příznaky commitne jednou za firmu.
+    Vrací počet položek, pro které byl alert odeslán.
+
+    per_item=True (pár položek z pohybu) sčítá sklad korelovaným poddotazem jen pro
+    vybrané položky; jinak (celý sklad) jedním GROUP BY přes item_location_stock.
+    """
+    stock_totals = None
+    if per_item:
+        total_quantity = _stock_total(InventoryItem.id)
+    else:
+        stock_totals = (
+            select(ItemLocationStock.inventory_item_id, func.sum(ItemLocationStock.quantity).label("total"))
+            .group_by(ItemLocationStock.inventory_item_id)
+            .subquery()
+        )
+        total_quantity = func.coalesce(stock_totals.c.total, 0)
+    stmt = (
+        select(
+            InventoryItem.id, InventoryItem.company_id, InventoryItem.name, InventoryItem.sku,
+            InventoryItem.low_stock_threshold, total_quantity.label("total_quantity"),
+            NotificationTrigger.recipient_emails
+        )
+        .join(NotificationTrigger, and_(
+            NotificationTrigger.company_id == InventoryItem.company_id,
             NotificationTrigger.trigger_type == TriggerType.INVENTORY_LOW_STOCK,
             NotificationTrigger.is_active == True
+        ))
+        .where(
+            InventoryItem.is_monitored_for_stock == True,
+            InventoryItem.low_stock_alert_sent == False,
+            InventoryItem.low_stock_threshold != None,
+            total_quantity <= InventoryItem.low_stock_threshold,
+            *conditions
+        )
+        .order_by(InventoryItem.company_id, InventoryItem.id)
+    )
+    if stock_totals is not None:
+        stmt = stmt.outerjoin(stock_totals, stock_totals.c.inventory_item_id == InventoryItem.id)
+    rows = (await db.execute(stmt)).all()
+
+    for company_id, company_rows in groupby(rows, key=lambda r: r.company_id):
+        company_rows = list(company_rows)
+        messages = []
+        for row in company_rows:
+            subject, body = _low_stock_message(row.name, row.sku, row.low_stock_threshold, row.total_quantity)
+            messages.extend((recipient, subject, body) for recipient in row.recipient_emails)
+        await queue_emails(db, company_id, "on_low_stock_alert", messages)
+
+        await db.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id.in_([row.id for row in company_rows]))
+            .values(low_stock_alert_sent=True)
         )
-        trigger = (await db.execute(trigger_stmt)).scalar_one_or_none()
-        if not trigger:
-            continue
+        await db.commit()
+    return len(rows)
 
-        # Sečteme celkové množství
-        total_quantity_stmt = select(func.sum(ItemLocationStock.quantity)).where(ItemLocationStock.inventory_item_id == item.id)
-        total_quantity = (await db.execute(total_quantity_stmt)).scalar_one() or 0
+async def check_low_stock_triggers(db: AsyncSession):
+    """
+    Konzistenční kontrola všech monitorovaných položek pod prahem, které nemají odeslaný alert.
+    Jeden dotaz pro všechny firmy (položky + součty skladu + aktivní trigger),
+    e-maily jdou do outboxu ve stejné transakci jako příznaky (commit jednou za firmu).
+    """
+    await _send_low_stock_alerts(db)
 
-        if total_quantity <= item.low_stock_threshold:
-            subject = f"Upozornění: Nízký stav zásob pro položku '{item.name}'"
-            body = (
-                f"Dobrý den,\n\n"
-                f"stav zásob pro položku '{item.name}' (SKU: {item.sku}) klesl pod nastavený práh.\n\n"
-                f"Nastavený práh: {item.low_stock_threshold} ks\n"
-                f"Aktuální stav: {total_quantity} ks\n\n"
-                "S pozdravem,\nVáš Appartus systém"
-            )
-            for recipient in trigger.recipient_emails:
-                await send_transactional_email(db, item.company_id, "on_low_stock_alert", recipient, subject, body)
-            
-            item.low_stock_alert_sent = True
-            await db.commit()
+async def check_low_stock_for_items(db: AsyncSession, company_id: int, item_ids: Iterable[int]) -> int:
+    """
+    Kontrola jen položek dotčených pohybem na skladě (volá dispatcher ze stock_events).
+    Položkám, jejichž stav se vrátil nad práh, nejdřív zruší příznak odeslaného alertu,
+    aby se při dalším poklesu upozornění odeslalo znovu.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return 0
+    await db.execute(
+        update(InventoryItem)
+        .where(
+            InventoryItem.company_id == company_id,
+            InventoryItem.id.in_(item_ids),
+            InventoryItem.low_stock_alert_sent == True,
+            InventoryItem.low_stock_threshold != None,
+            _stock_total(InventoryItem.id) > InventoryItem.low_stock_threshold
+        )
+        .values(low_stock_alert_sent=False)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return await _send_low_stock_alerts(
+        db, InventoryItem.company_id == company_id, InventoryItem.id.in_(item_ids), per_item=True
+    )
 
 
 async def check_all_triggers(db: AsyncSession):
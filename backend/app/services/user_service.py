@@ -1,14 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.models import User, Membership, Company, RoleEnum
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password_async, verify_and_update_password_async
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     res = await db.execute(select(User).where(User.email == email))
     return res.scalar_one_or_none()
 
 async def create_user(db: AsyncSession, email: str, password: str) -> User:
-    u = User(email=email, password_hash=hash_password(password))
+    u = User(email=email, password_hash=await hash_password_async(password))
     db.add(u)
     await db.flush()
     return u
@@ -20,7 +20,14 @@ async def add_membership(db: AsyncSession, user_id: int, company_id: int, role:
     return m
 
 async def verify_user_password(db: AsyncSession, email: str, password: str) -> User | None:
+    """
+    Ověří heslo (bcrypt běží v samostatném poolu). Pokud hash neodpovídá aktuálnímu
+    nastavení (BCRYPT_ROUNDS), nastaví uživateli nový hash – volající ho commitne.
+    """
     u = await get_user_by_email(db, email)
     if not u: return None
-    if not verify_password(password, u.password_hash): return None
+    valid, new_hash = await verify_and_update_password_async(password, u.password_hash)
+    if not valid: return None
+    if new_hash:
+        u.password_hash = new_hash
     return u
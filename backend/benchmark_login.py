@@ -0,0 +1,80 @@
+import sys
+import time
+import statistics
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Konfigurace benchmarku ---
+# Spouští se proti běžícímu serveru: python benchmark_login.py [počet_přihlášení] [souběžnost]
+BASE_URL = "http://127.0.0.1:8000"
+EMAIL = "admin@local.cz"
+PASSWORD = "admin123"
+LOGIN_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+LOGIN_CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+PROBE_INTERVAL = 0.02  # s mezi dotazy na nesouvisející endpoint
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def login(session):
+    start = time.perf_counter()
+    r = session.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD})
+    return time.perf_counter() - start, r.status_code
+
+
+def probe(stop_event, latencies):
+    """Během náporu přihlášení měří latenci /healthz (nesouvisí s bcryptem)."""
+    with requests.Session() as session:
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            session.get(f"{BASE_URL}/healthz")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(PROBE_INTERVAL)
+
+
+def report(title, latencies):
+    ms = [v * 1000 for v in latencies]
+    print(f"{title}: n={len(ms)}  p50={percentile(ms, 50):.1f} ms  p99={percentile(ms, 99):.1f} ms  max={max(ms, default=0):.1f} ms")
+
+
+def main():
+    # Klidový stav
+    baseline = []
+    stop = threading.Event()
+    t = threading.Thread(target=probe, args=(stop, baseline))
+    t.start()
+    time.sleep(2)
+    stop.set()
+    t.join()
+
+    # Nápor přihlášení
+    during = []
+    stop = threading.Event()
+    t = threading.Thread(target=probe, args=(stop, during))
+    t.start()
+    sessions = [requests.Session() for _ in range(LOGIN_CONCURRENCY)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=LOGIN_CONCURRENCY) as pool:
+        results = list(pool.map(lambda i: login(sessions[i % LOGIN_CONCURRENCY]), range(LOGIN_COUNT)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    t.join()
+
+    failed = sum(1 for _, status in results if status != 200)
+    print(f"Přihlášení: {LOGIN_COUNT} za {elapsed:.1f} s ({LOGIN_COUNT / elapsed:.1f}/s), souběžnost {LOGIN_CONCURRENCY}, chyb {failed}")
+    report("  /auth/login", [duration for duration, _ in results])
+    report("/healthz v klidu", baseline)
+    report("/healthz při náporu", during)
+    if during and baseline:
+        print(f"Zpomalení p99: {percentile(during, 99) / max(statistics.median(baseline), 1e-6):.1f}× medián v klidu")
+
+
+if __name__ == "__main__":
+    main()
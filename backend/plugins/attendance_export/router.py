@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from datetime import date, datetime, timedelta
 from io import BytesIO
+from types import SimpleNamespace
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
@@ -18,6 +19,10 @@ from app.db.database import get_db
 # --- ZMĚNA ZDE: Přidány importy User, Task, WorkOrder ---
 from app.db.models import TimeLog, TimeLogEntryType, User, Task, WorkOrder
 from app.core.dependencies import require_company_access
+from app.services.job_service import (
+    JobContext, JobFileResult, register_job_handler, enqueue_job, job_accepted_response
+)
+from app.core.executor import run_blocking
 
 router = APIRouter(prefix="/plugins/attendance-export", tags=["plugin-attendance-export"])
 
@@ -241,16 +246,34 @@ def create_yearly_summary(wb, year, all_logs, user_name):
     ws.cell(row=row_idx, column=8, value=round(total_year_hours, 2)).font = Font(bold=True)
 
 
-# --- HLAVNÍ ENDPOINT ---
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _snapshot_log(log: TimeLog) -> SimpleNamespace:
+    """
+    Odpojená kopie záznamu jen s poli, která potřebuje výkaz.
+    Lze ji předat do jiného procesu (ORM objekty se session nelze).
+    """
+    task = None
+    if log.task:
+        client = None
+        if log.task.work_order and log.task.work_order.client:
+            client = SimpleNamespace(name=log.task.work_order.client.name, address=log.task.work_order.client.address)
+        task = SimpleNamespace(
+            name=log.task.name,
+            work_order=SimpleNamespace(client=client) if log.task.work_order else None
+        )
+    return SimpleNamespace(
+        start_time=log.start_time,
+        end_time=log.end_time,
+        entry_type=log.entry_type,
+        notes=log.notes,
+        break_duration_minutes=log.break_duration_minutes,
+        is_overtime=getattr(log, 'is_overtime', False),
+        task=task
+    )
 
-@router.get("/download")
-async def download_attendance_excel(
-    company_id: int,
-    year: int,
-    user_id: int = None,
-    db: AsyncSession = Depends(get_db),
-    _=Depends(require_company_access)
-):
+async def load_attendance(db: AsyncSession, company_id: int, year: int, user_id: int = None):
+    """Načte záznamy docházky za rok a jméno pracovníka pro hlavičku výkazu."""
     start_date = date(year, 1, 1)
     end_date = date(year, 12, 31)
 
@@ -285,6 +308,10 @@ async def download_attendance_excel(
     else:
         user_name = "Neznámý"
 
+    return [_snapshot_log(l) for l in all_logs], user_name
+
+def build_attendance_workbook(year: int, all_logs: list, user_name: str) -> bytes:
+    """Sestaví roční výkaz (souhrn + 12 měsíčních listů) a vrátí obsah XLSX souboru."""
     wb = openpyxl.Workbook()
     default_sheet = wb.active
     wb.remove(default_sheet)
@@ -297,12 +324,41 @@ async def download_attendance_excel(
 
     output = BytesIO()
     wb.save(output)
-    output.seek(0)
+    return output.getvalue()
+
+# --- HLAVNÍ ENDPOINT ---
+
+@router.get("/download")
+async def download_attendance_excel(
+    company_id: int,
+    year: int,
+    user_id: int = None,
+    background: bool = Query(False, description="Vygenerovat jako úlohu na pozadí a hned vrátit job_id"),
+    db: AsyncSession = Depends(get_db),
+    token=Depends(require_company_access)
+):
+    if background:
+        job = await enqueue_job(db, company_id, int(token.get("sub")), "attendance_export",
+                                {"year": year, "user_id": user_id})
+        return job_accepted_response(job)
+
+    all_logs, user_name = await load_attendance(db, company_id, year, user_id)
+    output = BytesIO(await run_blocking(build_attendance_workbook, year, all_logs, user_name))
 
     filename = f"vykaz_{year}_{user_name}.xlsx"
     
     return StreamingResponse(
         output, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=XLSX_MEDIA_TYPE,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+    )
+
+async def run_attendance_export_job(ctx: JobContext, db: AsyncSession):
+    """Handler úlohy 'attendance_export': načtení z DB, sestavení sešitu ve sdíleném poolu."""
+    year = ctx.params["year"]
+    all_logs, user_name = await load_attendance(db, ctx.company_id, year, ctx.params.get("user_id"))
+    await ctx.set_progress(30, "Generuji výkaz...")
+    content = await run_blocking(build_attendance_workbook, year, all_logs, user_name)
+    return JobFileResult(content=content, filename=f"vykaz_{year}_{user_name}.xlsx", media_type=XLSX_MEDIA_TYPE)
+
+register_job_handler("attendance_export", run_attendance_export_job)
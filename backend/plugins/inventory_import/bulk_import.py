@@ -0,0 +1,399 @@
+# backend/plugins/inventory_import/bulk_import.py
+"""
+Hromadný import skladu z XLS.
+
+Soubor se čte líně z disku (read-only režim openpyxl) a řádky se zpracovávají po dávkách
+(settings.IMPORT_CHUNK_ROWS), takže paměť nezávisí na velikosti listu. Pro každou dávku se
+dodavatelé, výrobci, kategorie a lokace dohledají/založí několika dávkovými dotazy. Položky
+a stavy na lokacích se pak zapíšou přes INSERT ... ON CONFLICT a dávka se commitne samostatně.
+"""
+import asyncio
+import logging
+import shutil
+from dataclasses import dataclass, field
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+)
+
+from fastapi import UploadFile
+from openpyxl import load_workbook
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.executor import stream_blocking
+from app.db.models import (
+    InventoryItem, InventoryCategory, Location, ItemLocationStock,
+    InventoryAuditLog, AuditLogAction, Manufacturer, Supplier, item_category_association, now_utc
+)
+from app.services.category_tree_service import insert_category_node
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class ImportRow:
+    """Jeden platný řádek importního souboru, už převedený na správné typy."""
+    row_number: int
+    sku: str
+    name: str
+    alt_sku: Optional[str] = None
+    ean: Optional[str] = None
+    price: float = 0.0
+    description: Optional[str] = None
+    quantity: int = 0
+    location_name: Optional[str] = None
+    supplier: Optional[str] = None
+    manufacturer: Optional[str] = None
+    category_path: Tuple[str, ...] = ()
+
+
+@dataclass
+class _MergedItem:
+    """Všechny řádky dávky se stejným SKU (poslední neprázdná hodnota vyhrává, množství se sčítají)."""
+    row: ImportRow
+    category_paths: Set[Tuple[str, ...]] = field(default_factory=set)
+    stock: Dict[str, int] = field(default_factory=dict)
+
+
+def new_import_stats() -> Dict[str, Any]:
+    return {"created": 0, "updated": 0, "skipped": 0, "processed": 0, "chunks": 0, "errors": []}
+
+
+def read_sheet_headers(path: str) -> List[str]:
+    """Názvy sloupců z prvního řádku aktivního listu (pro mapování v náhledu importu)."""
+    wb = load_workbook(filename=path, data_only=True, read_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=1, max_row=1, values_only=True):
+            return [str(cell) if cell is not None else f"Sloupec {i+1}" for i, cell in enumerate(row)]
+        return []
+    finally:
+        wb.close()
+
+
+def read_sheet_row_count(path: str) -> Optional[int]:
+    """Počet datových řádků podle rozměru listu uloženého v souboru (bez čtení dat), None = neznámý."""
+    wb = load_workbook(filename=path, data_only=True, read_only=True)
+    try:
+        max_row = wb.active.max_row
+        return max_row - 1 if max_row else None
+    finally:
+        wb.close()
+
+
+def iter_sheet_rows(path: str) -> Iterator[Tuple[Any, ...]]:
+    """
+    Líně čte datové řádky (bez hlavičky) aktivního listu v read-only režimu openpyxl.
+    V paměti nikdy není celý list, jen právě zpracovávaný řádek.
+    """
+    wb = load_workbook(filename=path, data_only=True, read_only=True)
+    try:
+        yield from wb.active.iter_rows(min_row=2, values_only=True)
+    finally:
+        wb.close()
+
+
+async def stream_sheet_rows(path: str) -> AsyncIterator[Tuple[Any, ...]]:
+    """Řádky listu jako async iterátor; parsování běží mimo event loop po dávkách IMPORT_CHUNK_ROWS."""
+    async for batch in stream_blocking(iter_sheet_rows, path, batch_size=settings.IMPORT_CHUNK_ROWS):
+        for row in batch:
+            yield row
+
+
+async def spool_upload(upload: UploadFile, path: str) -> None:
+    """Zkopíruje nahraný soubor na disk po blocích, bez načtení celého obsahu do paměti."""
+    def copy():
+        upload.file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload.file, f, length=1024 * 1024)
+    await asyncio.to_thread(copy)
+
+
+async def parse_import_rows(rows: AsyncIterable[Sequence[Any]], col_map: Dict[str, Any], stats: Dict[str, Any],
+                            first_row_number: int = 2) -> AsyncIterator[ImportRow]:
+    """
+    Převede surové řádky listu (values_only) na ImportRow podle mapování sloupců.
+    Řádky bez názvu nebo SKU se přeskočí, chybné hodnoty se zapíšou do stats["errors"].
+    """
+    category_level_indices: List[int] = col_map.get('category_levels', [])
+
+    def get_val(row_data, field_key):
+        idx = col_map.get(field_key)
+        if idx is not None and isinstance(idx, int) and 0 <= idx < len(row_data):
+            return row_data[idx]
+        return None
+
+    def text(value) -> Optional[str]:
+        return str(value).strip() if value else None
+
+    index = first_row_number - 1
+    async for row in rows:
+        index += 1
+        try:
+            name = get_val(row, 'name')
+            sku = text(get_val(row, 'sku'))
+            if not name or not sku:
+                stats["skipped"] += 1
+                continue
+
+            price_val = get_val(row, 'price')
+            qty_val = get_val(row, 'quantity')
+            desc_val = get_val(row, 'description')
+
+            # Cesta kategorie z hodnot buněk na vybraných sloupcích (prázdné se přeskočí)
+            parts = []
+            for col_idx in category_level_indices:
+                if 0 <= col_idx < len(row):
+                    cell_val = row[col_idx]
+                    if cell_val is not None and str(cell_val).strip():
+                        parts.append(str(cell_val).strip())
+
+            yield ImportRow(
+                row_number=index,
+                sku=sku,
+                name=str(name),
+                alt_sku=text(get_val(row, 'alt_sku')),
+                ean=text(get_val(row, 'ean')),
+                price=float(price_val) if price_val else 0.0,
+                description=str(desc_val) if desc_val else None,
+                quantity=int(qty_val) if qty_val else 0,
+                location_name=text(get_val(row, 'location')),
+                supplier=text(get_val(row, 'supplier')),
+                manufacturer=text(get_val(row, 'manufacturer')),
+                category_path=tuple(parts),
+            )
+        except Exception as e:
+            stats["errors"].append(f"Řádek {index}: Chyba - {str(e)}")
+
+
+class BulkInventoryImporter:
+    """
+    Zapisuje ImportRow do databáze po dávkách. Číselníky (dodavatelé, výrobci, kategorie, lokace)
+    se cachují po celou dobu importu, takže se každý název dohledává jen jednou.
+    """
+
+    def __init__(self, db: AsyncSession, company_id: int, user_id: int,
+                 stats: Optional[Dict[str, Any]] = None, progress: Optional[ProgressCallback] = None,
+                 chunk_size: Optional[int] = None):
+        self.db = db
+        self.company_id = company_id
+        self.user_id = user_id
+        self.stats = stats if stats is not None else new_import_stats()
+        self.progress = progress
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_ROWS
+        self._suppliers: Dict[str, int] = {}
+        self._manufacturers: Dict[str, int] = {}
+        self._categories: Dict[Tuple[Optional[int], str], int] = {}
+        self._locations: Optional[Dict[str, int]] = None
+        self.categories_created = False
+
+    async def run(self, rows: AsyncIterable[ImportRow]) -> Dict[str, Any]:
+        chunk: List[ImportRow] = []
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                await self._commit_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self._commit_chunk(chunk)
+        return self.stats
+
+    async def _commit_chunk(self, chunk: List[ImportRow]) -> None:
+        try:
+            created, updated = await self._write_chunk(chunk)
+            await self.db.commit()
+            self.stats["created"] += created
+            self.stats["updated"] += updated
+        except Exception as e:
+            # Chyba v dávce nesmí shodit už commitnuté dávky – dávku přeskočíme a pokračujeme
+            await self.db.rollback()
+            self._forget_uncommitted()
+            logger.exception("Import skladu: dávka řádků %s–%s selhala", chunk[0].row_number, chunk[-1].row_number)
+            self.stats["errors"].append(
+                f"Řádky {chunk[0].row_number}–{chunk[-1].row_number}: Dávka nebyla uložena - {str(e)}"
+            )
+        self.stats["processed"] += len(chunk)
+        self.stats["chunks"] += 1
+        if self.progress:
+            await self.progress(self.stats)
+
+    def _forget_uncommitted(self) -> None:
+        # Po rollbacku mohou v cache zůstat ID záznamů, které v DB nejsou
+        self._suppliers.clear()
+        self._manufacturers.clear()
+        self._categories.clear()
+
+    async def _write_chunk(self, chunk: List[ImportRow]) -> Tuple[int, int]:
+        # Sloučení duplicitních SKU v rámci dávky (ON CONFLICT nesmí jeden řádek měnit dvakrát)
+        merged: Dict[str, _MergedItem] = {}
+        for row in chunk:
+            entry = merged.get(row.sku)
+            if entry is None:
+                entry = merged[row.sku] = _MergedItem(row=row)
+            else:
+                prev = entry.row
+                entry.row = ImportRow(
+                    row_number=row.row_number, sku=row.sku, name=row.name,
+                    alt_sku=row.alt_sku or prev.alt_sku, ean=row.ean or prev.ean,
+                    price=row.price if row.price > 0 else prev.price,
+                    description=row.description or prev.description,
+                    supplier=row.supplier or prev.supplier,
+                    manufacturer=row.manufacturer or prev.manufacturer,
+                )
+            if row.category_path:
+                entry.category_paths.add(row.category_path)
+            if row.quantity > 0 and row.location_name:
+                entry.stock[row.location_name] = entry.stock.get(row.location_name, 0) + row.quantity
+
+        items = list(merged.values())
+        suppliers = await self._resolve_named(Supplier, "uq_supplier_company_name", self._suppliers,
+                                              {i.row.supplier for i in items if i.row.supplier})
+        manufacturers = await self._resolve_named(Manufacturer, "uq_manufacturer_company_name", self._manufacturers,
+                                                  {i.row.manufacturer for i in items if i.row.manufacturer})
+        category_ids = await self._resolve_category_paths({p for i in items for p in i.category_paths})
+        locations = await self._get_locations()
+
+        # 1. Položky: jeden INSERT ... ON CONFLICT (company_id, sku) DO UPDATE pro celou dávku
+        now = now_utc()
+        values = [{
+            "company_id": self.company_id,
+            "name": i.row.name,
+            "sku": i.row.sku,
+            "alternative_sku": i.row.alt_sku,
+            "ean": i.row.ean,
+            "price": i.row.price,
+            "description": i.row.description,
+            "supplier_id": suppliers.get(i.row.supplier),
+            "manufacturer_id": manufacturers.get(i.row.manufacturer),
+            "is_monitored_for_stock": True,
+            "low_stock_threshold": 5,
+            "created_at": now,
+            "updated_at": now,
+        } for i in items]
+        stmt = pg_insert(InventoryItem).values(values)
+        table, new = InventoryItem.__table__.c, stmt.excluded
+        # Stejná pravidla jako dřív u aktualizace po jednom: prázdné hodnoty z XLS nic nepřepisují
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_inventory_item_company_sku",
+            set_={
+                "name": new.name,
+                "alternative_sku": func.coalesce(new.alternative_sku, table.alternative_sku),
+                "ean": func.coalesce(new.ean, table.ean),
+                "price": func.coalesce(func.nullif(new.price, 0.0), table.price),
+                "description": func.coalesce(new.description, table.description),
+                "supplier_id": func.coalesce(new.supplier_id, table.supplier_id),
+                "manufacturer_id": func.coalesce(new.manufacturer_id, table.manufacturer_id),
+                "updated_at": new.updated_at,
+            }
+        ).returning(table.id, table.sku, literal_column("(xmax = 0)").label("inserted"))
+        result = (await self.db.execute(stmt)).all()
+        item_ids = {r.sku: r.id for r in result}
+        created = sum(1 for r in result if r.inserted)
+
+        # 2. Kategorie položek (již přiřazené kategorie se nemění)
+        links = {
+            (item_ids[i.row.sku], category_ids[path])
+            for i in items for path in i.category_paths if path in category_ids
+        }
+        if links:
+            await self.db.execute(
+                pg_insert(item_category_association)
+                .values([{"item_id": item_id, "category_id": cat_id} for item_id, cat_id in links])
+                .on_conflict_do_nothing()
+            )
+
+        # 3. Naskladnění: přičtení k existujícímu stavu v jednom dotazu
+        stock_values = []
+        for i in items:
+            for location_name, quantity in i.stock.items():
+                location_id = locations.get(location_name)
+                if location_id is None:
+                    self.stats["errors"].append(f"Řádek {i.row.row_number}: Lokace '{location_name}' nenalezena.")
+                    continue
+                stock_values.append({
+                    "inventory_item_id": item_ids[i.row.sku], "location_id": location_id, "quantity": quantity
+                })
+        if stock_values:
+            stock_stmt = pg_insert(ItemLocationStock).values(stock_values)
+            stock_stmt = stock_stmt.on_conflict_do_update(
+                index_elements=["inventory_item_id", "location_id"],
+                set_={"quantity": ItemLocationStock.__table__.c.quantity + stock_stmt.excluded.quantity}
+            ).returning(ItemLocationStock.inventory_item_id, ItemLocationStock.location_id, ItemLocationStock.quantity)
+            added = {(v["inventory_item_id"], v["location_id"]): v["quantity"] for v in stock_values}
+            location_names = {loc_id: name for name, loc_id in locations.items()}
+            logs = []
+            for r in (await self.db.execute(stock_stmt)).all():
+                quantity = added[(r.inventory_item_id, r.location_id)]
+                logs.append({
+                    "item_id": r.inventory_item_id, "user_id": self.user_id, "company_id": self.company_id,
+                    "action": AuditLogAction.quantity_adjusted, "timestamp": now,
+                    "details": f"Import XLS: +{quantity} ks na '{location_names[r.location_id]}'. "
+                               f"(Původně: {r.quantity - quantity})",
+                })
+            await self.db.execute(pg_insert(InventoryAuditLog).values(logs))
+
+        return created, len(result) - created
+
+    async def _resolve_named(self, model, constraint: str, cache: Dict[str, int], names: Set[str]) -> Dict[str, int]:
+        """Dohledá (a případně založí) dodavatele/výrobce podle jména – dva dotazy na dávku."""
+        missing = names - cache.keys()
+        if missing:
+            await self.db.execute(
+                pg_insert(model)
+                .values([{"company_id": self.company_id, "name": name} for name in missing])
+                .on_conflict_do_nothing(constraint=constraint)
+            )
+            stmt = select(model.id, model.name).where(model.company_id == self.company_id, model.name.in_(missing))
+            cache.update({name: id_ for id_, name in (await self.db.execute(stmt)).all()})
+        return cache
+
+    async def _resolve_category_paths(self, paths: Set[Tuple[str, ...]]) -> Dict[Tuple[str, ...], int]:
+        """
+        Převede cesty kategorií ("Elektro", "Kabely", ...) na ID poslední kategorie.
+        Strom se prochází po úrovních: na každé úrovni jeden SELECT a jeden INSERT pro chybějící uzly.
+        """
+        resolved: Dict[Tuple[str, ...], int] = {}
+        parent_of: Dict[Tuple[str, ...], Optional[int]] = {path: None for path in paths}
+        depth = 0
+        while True:
+            level = {path for path in paths if len(path) > depth}
+            if not level:
+                break
+            wanted = {(parent_of[path], path[depth]) for path in level}
+            missing = wanted - self._categories.keys()
+            if missing:
+                # UNIQUE (company_id, name, parent_id) nezachytí kořeny (parent_id IS NULL), proto SELECT + INSERT
+                stmt = select(InventoryCategory.id, InventoryCategory.parent_id, InventoryCategory.name).where(
+                    InventoryCategory.company_id == self.company_id,
+                    InventoryCategory.name.in_({name for _, name in missing})
+                )
+                for id_, parent_id, name in (await self.db.execute(stmt)).all():
+                    if (parent_id, name) in missing:
+                        self._categories[(parent_id, name)] = id_
+                to_create = sorted(missing - self._categories.keys(), key=lambda k: (k[0] or 0, k[1]))
+                if to_create:
+                    insert_stmt = pg_insert(InventoryCategory).values([
+                        {"company_id": self.company_id, "parent_id": parent_id, "name": name}
+                        for parent_id, name in to_create
+                    ]).returning(InventoryCategory.id, InventoryCategory.parent_id, InventoryCategory.name)
+                    for id_, parent_id, name in (await self.db.execute(insert_stmt)).all():
+                        self._categories[(parent_id, name)] = id_
+                        await insert_category_node(self.db, id_, parent_id)
+                    self.categories_created = True
+            for path in level:
+                category_id = self._categories[(parent_of[path], path[depth])]
+                parent_of[path] = category_id
+                if len(path) == depth + 1:
+                    resolved[path] = category_id
+            depth += 1
+        return resolved
+
+    async def _get_locations(self) -> Dict[str, int]:
+        """Lokace se v importu nezakládají; načtou se jednou pro celý import."""
+        if self._locations is None:
+            stmt = select(Location.id, Location.name).where(Location.company_id == self.company_id)
+            self._locations = {name: id_ for id_, name in (await self.db.execute(stmt)).all()}
+        return self._locations
@@ -5,6 +5,7 @@ from sqlalchemy import delete, select, text
 from app.db.database import get_db
 from app.db.models import InventoryItem, InventoryCategory, UsedInventoryItem
 from app.core.dependencies import require_admin_access
+from app.services.cache_service import invalidate_company_categories
 
 router = APIRouter(prefix="/plugins/inventory-wipe", tags=["inventory-wipe"])
 
@@ -48,6 +49,7 @@ async def wipe_inventory_categories(
     """Smaže všechny kategorie firmy."""
     await _delete_categories(company_id, db)
     await db.commit()
+    invalidate_company_categories(company_id)
 
 
 @router.delete("/{company_id}/all", status_code=status.HTTP_204_NO_CONTENT)
@@ -60,3 +62,4 @@ async def wipe_inventory_all(
     await _delete_items(company_id, db)
     await _delete_categories(company_id, db)
     await db.commit()
+    invalidate_company_categories(company_id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
@@ -7,6 +7,10 @@ import io
 from app.db.database import get_db
 from app.core.dependencies import require_company_access
 from app.db.models import Client, Company
+from app.services.job_service import (
+    JobContext, JobFileResult, register_job_handler, enqueue_job, job_accepted_response
+)
+from app.core.executor import run_blocking
 from .models import Quote, QuoteSection, QuoteItem, QuoteCategoryAssembly, QuoteInvoice
 from .schemas import (
     QuoteIn, QuoteUpdate, QuoteOut, QuoteListOut,
@@ -350,15 +354,8 @@ async def upsert_category_assemblies(
 
 # ─── PDF Export ───────────────────────────────────────────────────────────────
 
-@router.get("/{company_id}/quotes/{quote_id}/pdf")
-async def export_quote_pdf(
-    company_id: int,
-    quote_id: int,
-    db: AsyncSession = Depends(get_db),
-    _=Depends(require_company_access),
-):
-    from .pdf_generator import generate_quote_pdf
-
+async def _quote_pdf_input(quote_id: int, company_id: int, db: AsyncSession) -> tuple[dict, dict, str]:
+    """Data pro generate_quote_pdf (čisté dicty, lze je předat do process poolu) a bezpečný název souboru."""
     q = await _get_quote(quote_id, company_id, db)
     quote_out = await _build_quote_out(q, db)
     quote_data = quote_out.model_dump()
@@ -375,8 +372,27 @@ async def export_quote_pdf(
             "dic": getattr(company, "dic", "") or "",
         }
 
-    pdf_bytes = generate_quote_pdf(quote_data, company_data)
     safe_name = "".join(c if c.isalnum() or c in " _-" else "_" for c in q.name)[:60]
+    return quote_data, company_data, safe_name
+
+
+@router.get("/{company_id}/quotes/{quote_id}/pdf")
+async def export_quote_pdf(
+    company_id: int,
+    quote_id: int,
+    background: bool = Query(False, description="Vygenerovat PDF jako úlohu na pozadí a hned vrátit job_id"),
+    db: AsyncSession = Depends(get_db),
+    token=Depends(require_company_access),
+):
+    from .pdf_generator import generate_quote_pdf
+
+    if background:
+        await _get_quote(quote_id, company_id, db)  # 404 hned, ne až v úloze
+        job = await enqueue_job(db, company_id, int(token.get("sub")), "quote_pdf", {"quote_id": quote_id})
+        return job_accepted_response(job)
+
+    quote_data, company_data, safe_name = await _quote_pdf_input(quote_id, company_id, db)
+    pdf_bytes = await run_blocking(generate_quote_pdf, quote_data, company_data)
 
     return StreamingResponse(
         io.BytesIO(pdf_bytes),
@@ -385,6 +401,17 @@ async def export_quote_pdf(
     )
 
 
+async def _run_quote_pdf_job(ctx: JobContext, db: AsyncSession):
+    """Handler úlohy 'quote_pdf': reportlab běží ve sdíleném poolu (app.core.executor)."""
+    from .pdf_generator import generate_quote_pdf
+
+    quote_data, company_data, safe_name = await _quote_pdf_input(ctx.params["quote_id"], ctx.company_id, db)
+    pdf_bytes = await run_blocking(generate_quote_pdf, quote_data, company_data)
+    return JobFileResult(content=pdf_bytes, filename=f"{safe_name}.pdf", media_type="application/pdf")
+
+register_job_handler("quote_pdf", _run_quote_pdf_job)
+
+
 # ─── Quote Invoices ───────────────────────────────────────────────────────────
 
 @router.get("/{company_id}/quotes/{quote_id}/invoices", response_model=list[QuoteInvoiceOut])
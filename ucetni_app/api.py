@@ -1,18 +1,88 @@
+import base64
+import json
+import threading
+import time
 import requests
-from config import API_BASE_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import API_BASE_URL, HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_RETRY_BACKOFF
+
+# Access token obnovujeme s předstihem (s), aby nevypršel uprostřed práce
+TOKEN_REFRESH_MARGIN = 120
+
+def create_session():
+    """
+    Session s keep-alive spojeními, gzipem a opakováním chyb spojení.
+    502–504 se opakují jen u idempotentních metod (ne POST/PATCH).
+    """
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
 
 class ApiClient:
     def __init__(self):
         self.token = None
+        self.refresh_token = None
+        self.token_expires_at = 0.0
         self.company_id = None
+        self._auth_lock = threading.Lock()
+        self.session = create_session()
+        # Poslední odpovědi s ETagem pro podmíněný GET: (firma, endpoint, parametry) -> (ETag, tělo odpovědi);
+        # ukládají se bajty, aby volající, který výsledek upraví, nepoškodil cache
+        self.etag_cache = {}
+        # Lokální kopie skladu (id -> položka) a kurzor feedu /inventory/changes
+        self.inventory_cache = {}
+        self.inventory_cursor = None
 
-    def set_token(self, token):
+    def set_token(self, token, refresh_token=None):
         self.token = token
+        if refresh_token is not None:
+            self.refresh_token = refresh_token
+        self.token_expires_at = float(self.decode_token(token).get("exp", 0))
+
+    @staticmethod
+    def decode_token(token):
+        """Payload JWT bez ověření podpisu (ověřuje server)"""
+        part = token.split('.')[1]
+        part += '=' * (-len(part) % 4)
+        return json.loads(base64.urlsafe_b64decode(part))
 
     def set_company_id(self, company_id):
+        if company_id != self.company_id:
+            self.inventory_cache = {}
+            self.inventory_cursor = None
         self.company_id = company_id
 
+    def refresh_session(self):
+        """Obnoví access token refresh tokenem – bez hesla a bez bcryptu na serveru"""
+        with self._auth_lock:
+            if not self.refresh_token or time.time() < self.token_expires_at - TOKEN_REFRESH_MARGIN:
+                return
+            try:
+                r = self.session.post(f"{API_BASE_URL}/auth/refresh", json={"refresh_token": self.refresh_token}, timeout=5)
+            except Exception as e:
+                print(f"Refresh error: {e}")
+                return
+            if r.status_code != 200:
+                # Relace byla zneplatněna, další požadavky skončí 401
+                print(f"Refresh rejected: {r.status_code}")
+                self.refresh_token = None
+                return
+            data = r.json()
+            self.set_token(data['access_token'], data.get('refresh_token'))
+
     def _get_headers(self):
+        self.refresh_session()
         if not self.token:
             return {"Content-Type": "application/json"}
         return {
@@ -25,7 +95,7 @@ class ApiClient:
         try:
             # OAuth2 očekává form data, ale requests to zvládne i takto, 
             # pokud backend používá Form(...)
-            response = requests.post(url, data={"username": username, "password": password})
+            response = self.session.post(url, data={"username": username, "password": password})
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -35,10 +105,21 @@ class ApiClient:
     # --- GENERIC CRUD HELPERS ---
     def _get(self, endpoint, params=None):
         url = f"{API_BASE_URL}/companies/{self.company_id}/{endpoint}"
+        # Podmíněný GET: se známým ETagem server při beze změny vrátí jen 304
+        key = (self.company_id, endpoint, tuple(sorted((params or {}).items())))
+        cached = self.etag_cache.get(key)
+        headers = self._get_headers()
+        if cached:
+            headers["If-None-Match"] = cached[0]
         try:
-            r = requests.get(url, headers=self._get_headers(), params=params)
+            r = self.session.get(url, headers=headers, params=params)
+            if r.status_code == 304 and cached:
+                return json.loads(cached[1])
             r.raise_for_status()
-            return r.json()
+            data = r.json()
+            if r.headers.get("ETag"):
+                self.etag_cache[key] = (r.headers["ETag"], r.content)
+            return data
         except Exception as e:
             print(f"GET {endpoint} error: {e}")
             # Vracíme prázdný seznam nebo None podle kontextu, 
@@ -49,13 +130,13 @@ class ApiClient:
 
     def _post(self, endpoint, data):
         url = f"{API_BASE_URL}/companies/{self.company_id}/{endpoint}"
-        r = requests.post(url, headers=self._get_headers(), json=data)
+        r = self.session.post(url, headers=self._get_headers(), json=data)
         r.raise_for_status()
         return r.json()
 
     def _patch(self, endpoint, resource_id, data):
         url = f"{API_BASE_URL}/companies/{self.company_id}/{endpoint}/{resource_id}"
-        r = requests.patch(url, headers=self._get_headers(), json=data)
+        r = self.session.patch(url, headers=self._get_headers(), json=data)
         r.raise_for_status()
         return r.json()
 
@@ -66,7 +147,7 @@ class ApiClient:
         if resource_id is not None:
             url = f"{url}/{resource_id}"
             
-        r = requests.delete(url, headers=self._get_headers())
+        r = self.session.delete(url, headers=self._get_headers())
         r.raise_for_status()
         return True
 
@@ -94,7 +175,7 @@ class ApiClient:
         # Voláme přímo URL bez helperu _get, protože _get vrací json nebo raise
         # Ale použijeme logiku URL z helperu
         url = f"{API_BASE_URL}/companies/{self.company_id}/clients/{client_id}"
-        r = requests.get(url, headers=self._get_headers())
+        r = self.session.get(url, headers=self._get_headers())
         r.raise_for_status()
         return r.json()
 
@@ -139,7 +220,7 @@ class ApiClient:
         # Helper _delete očekává endpoint a ID, ale tady je ID kategorie až na konci
         # Takže to zavoláme takto:
         url = f"{API_BASE_URL}/companies/{self.company_id}/{url_part}"
-        r = requests.delete(url, headers=self._get_headers())
+        r = self.session.delete(url, headers=self._get_headers())
         r.raise_for_status()
         return True
 
@@ -147,10 +228,21 @@ class ApiClient:
     # SKLAD (INVENTORY)
     # ==========================================
     def get_inventory(self):
+        """Sklad z lokální kopie; ze serveru se stahují jen změny od minulého volání"""
         try:
-            return self._get("inventory")
+            params = {"since": self.inventory_cursor} if self.inventory_cursor else None
+            changes = self._get("inventory/changes", params=params)
         except:
-            return []
+            # Bez spojení vrátíme poslední známý stav
+            return sorted(self.inventory_cache.values(), key=lambda it: it['id'])
+        if changes['full']:
+            self.inventory_cache = {}
+        for item_id in changes.get('deleted_ids', []):
+            self.inventory_cache.pop(item_id, None)
+        for item in changes['items']:
+            self.inventory_cache[item['id']] = item
+        self.inventory_cursor = changes['cursor']
+        return sorted(self.inventory_cache.values(), key=lambda it: it['id'])
             
     def create_item(self, data):
         return self._post("inventory", data)
@@ -188,6 +280,6 @@ class ApiClient:
         if end_date: params['end_date'] = end_date
         
         url = f"{API_BASE_URL}/companies/{self.company_id}/work-orders/{work_order_id}/billing-report"
-        r = requests.get(url, headers=self._get_headers(), params=params)
+        r = self.session.get(url, headers=self._get_headers(), params=params)
         r.raise_for_status()
         return r.json()
\ No newline at end of file
@@ -1,4 +1,9 @@
 # config.py
 API_BASE_URL = "http://192.168.88.118:8001"
 ORGANIZATION_NAME = "LP Dvoracek spol s r.o."
-APP_NAME = "UcetniSystem"
\ No newline at end of file
+APP_NAME = "UcetniSystem"
+
+# HTTP spojení na API (sdílená requests.Session s keep-alive)
+HTTP_POOL_SIZE = 4
+HTTP_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.3
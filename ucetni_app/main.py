@@ -1,6 +1,4 @@
 import sys
-import json
-import base64
 from datetime import datetime
 
 from PyQt6.QtWidgets import (
@@ -616,11 +614,9 @@ class LoginWindow(QWidget):
         pwd = self.pwd.text()
         data = self.api.login(email, pwd)
         if data:
-            self.api.set_token(data['access_token'])
             try:
-                part = data['access_token'].split('.')[1]
-                part += '=' * (-len(part) % 4)
-                payload = json.loads(base64.urlsafe_b64decode(part))
+                self.api.set_token(data['access_token'], data.get('refresh_token'))
+                payload = self.api.decode_token(data['access_token'])
                 tenants = payload.get('tenants', [])
                 if tenants: self.api.set_company_id(tenants[0])
                 else: raise Exception("Žádná firma")